@@ -0,0 +1,194 @@
+"""
+Benchmark of the C++ kernels radial_c.radial, angle_c.angle and hbonds_c.hbonds of different git revisions.
+
+Every revision is exported with ``git archive``, its extensions are compiled into a temporary directory and timed in a
+separate Python process (the modules of all revisions have the same names). The kernels run on random water at a
+density of about 1 g/cm^3 and their results are compared between revisions with the same interface.
+
+The script is not part of the package and its modules are not installed.
+
+Usage:
+    python benchmarks/kernels.py 180a851^ 180a851
+
+Dependencies:
+    numpy, pybind11, git and a C++11 compiler
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+
+import numpy as np
+
+
+KERNELS = ['radial_c', 'angle_c', 'hbonds_c']
+HELPERS = ['pbc_c.cpp', 'calc_c.cpp', 'cell_c.cpp']
+
+
+########################################################################################################################
+# EXPORT AND COMPILE THE EXTENSIONS OF A REVISION
+########################################################################################################################
+# INPUT
+# str rev           git revision
+# str path          directory for sources and compiled modules
+# list flags        additional compiler flags
+########################################################################################################################
+def kernels_build(rev, path, flags):
+    """
+    Export the C++ sources of a git revision and compile the kernel extensions.
+
+    Args:
+        rev (str): git revision
+        path (str): directory for sources and compiled modules
+        flags (list[str]): additional compiler flags
+
+    The sources of each extension are the kernel itself and those of :data:`HELPERS` present in the revision.
+    """
+    root = subprocess.check_output(['git', 'rev-parse', '--show-toplevel'], text=True).strip()
+    archive = subprocess.run(['git', '-C', root, 'archive', rev, 'src'], check=True, stdout=subprocess.PIPE).stdout
+    subprocess.run(['tar', '-x', '-C', path], input=archive, check=True)
+    src = os.path.join(path, 'src')
+    import pybind11
+    includes = ['-I' + pybind11.get_include(), '-I' + sysconfig.get_paths()['include']]
+    helpers = [os.path.join(src, name) for name in HELPERS if os.path.exists(os.path.join(src, name))]
+    for name in KERNELS:
+        target = os.path.join(path, name + sysconfig.get_config_var('EXT_SUFFIX'))
+        subprocess.run([os.environ.get('CXX', 'c++'), '-O2', '-std=c++11', '-shared', '-fPIC', '-fvisibility=hidden'] +
+                       flags + includes + helpers + [os.path.join(src, name + '.cpp'), '-o', target], check=True)
+
+
+########################################################################################################################
+# CREATE RANDOM WATER
+########################################################################################################################
+# INPUT
+# int n             number of water molecules
+# int seed          seed of the random number generator
+#####
+# OUTPUT
+# ndarray oxygen    flat array of oxygen positions
+# ndarray hydrogen  flat array of hydrogen positions
+# ndarray cell      flat 3x3 unit cell
+########################################################################################################################
+def kernels_water(n, seed=0):
+    """
+    Create random water molecules at a density of about 1 g/cm^3.
+
+    Args:
+        n (int): number of water molecules
+        seed (int, optional): default 0 - seed of the random number generator
+
+    Returns:
+        tuple: flat arrays of oxygen and hydrogen positions and flat 3x3 unit cell (orthorhombic cube)
+
+    Each oxygen carries two hydrogen atoms at 0.96 Angstrom in random directions.
+    """
+    rng = np.random.default_rng(seed)
+    length = (n * 29.9) ** (1.0 / 3.0)
+    oxygen = rng.uniform(0.0, length, size=(n, 3))
+    bonds = rng.normal(size=(n, 2, 3))
+    bonds *= 0.96 / np.linalg.norm(bonds, axis=2)[:, :, None]
+    hydrogen = (oxygen[:, None, :] + bonds).reshape(-1, 3) % length
+    return oxygen.ravel(), hydrogen.ravel(), (np.eye(3) * length).ravel()
+
+
+########################################################################################################################
+# TIME THE KERNELS IN THE CURRENT PROCESS
+########################################################################################################################
+# INPUT
+# str path          directory of the compiled modules
+# list waters       numbers of water molecules
+# int repeat        number of repetitions, the best one is reported
+#####
+# OUTPUT
+# dict results      timings [s] and digests of the results per kernel and system size
+########################################################################################################################
+def kernels_run(path, waters, repeat):
+    """
+    Time the kernels compiled into a directory.
+
+    Args:
+        path (str): directory of the compiled modules
+        waters (list[int]): numbers of water molecules
+        repeat (int): number of repetitions, the best one is reported
+
+    Returns:
+        dict: for every kernel and system size the best time [s] and a digest of the result
+
+    Kernels binning into histograms (``nbins`` argument) get 200 bins and report their interface as 'histogram',
+    older kernels returning all distances or angles as 'values'. Only results of the same interface are compared.
+    """
+    sys.path.insert(0, path)
+    import radial_c
+    import angle_c
+    import hbonds_c
+
+    def call(func, *args, nbins=200):
+        try:
+            return func(*args, nbins), 'histogram'
+        except TypeError:
+            return func(*args), 'values'
+
+    results = {}
+    for n in waters:
+        oxygen, hydrogen, cell = kernels_water(n)
+        runs = {
+            'radial': lambda: call(radial_c.radial, oxygen, oxygen, 6.0, cell),
+            'angle': lambda: call(angle_c.angle, oxygen, oxygen, 3.5, cell),
+            'hbonds': lambda: (hbonds_c.hbonds(oxygen, hydrogen, oxygen, 3.5, 2.4, 30.0, cell), 'count'),
+        }
+        for kernel, run in runs.items():
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                value, kind = run()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            digest = hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()
+            results['%s %d' % (kernel, n)] = {'time': best, 'kind': kind, 'digest': digest}
+    return results
+
+
+########################################################################################################################
+# MAIN ROUTINE
+########################################################################################################################
+def main():
+    parser = argparse.ArgumentParser(description="Time the C++ kernels of git revisions and compare their results.")
+    parser.add_argument('revs', nargs='*', help="git revisions to compare")
+    parser.add_argument('--waters', nargs='+', type=int, default=[256, 4096], help="numbers of water molecules")
+    parser.add_argument('--repeat', type=int, default=5, help="repetitions per kernel, the best one is reported")
+    parser.add_argument('--flags', default='', help="additional compiler flags, e.g. --flags=-fopenmp")
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        json.dump(kernels_run(args.run, args.waters, args.repeat), sys.stdout)
+        return
+    if not args.revs:
+        parser.error("no revision given")
+    results = []
+    with tempfile.TemporaryDirectory(prefix='paw_structure_bench_') as tmp:
+        for k, rev in enumerate(args.revs):
+            path = os.path.join(tmp, str(k))
+            os.mkdir(path)
+            print("BUILDING KERNELS OF %s" % rev)
+            kernels_build(rev, path, args.flags.split())
+            out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--run', path, '--repeat',
+                                           str(args.repeat), '--waters'] + [str(n) for n in args.waters], text=True)
+            results.append(json.loads(out))
+    print("%-14s" % "KERNEL" + "".join("%16s" % rev for rev in args.revs) + "  RESULTS")
+    for key in results[0]:
+        entries = [result[key] for result in results]
+        checks = []
+        for kind in sorted({entry['kind'] for entry in entries}):
+            digests = [entry['digest'] for entry in entries if entry['kind'] == kind]
+            if len(digests) > 1:
+                checks.append("%s %s" % (kind.upper(), "IDENTICAL" if len(set(digests)) == 1 else "DIFFERENT"))
+        print("%-14s" % key + "".join("%14.6f s" % entry['time'] for entry in entries) + "  " + ", ".join(checks))
+
+if __name__ == '__main__':
+    main()
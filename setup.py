@@ -71,7 +71,7 @@ ext_modules = [
         'paw_structure.hbonds_c',
         # Sort input source files to ensure bit-for-bit reproducible builds
         # (https://github.com/pybind/python_example/pull/53)
-        sorted(['src/calc_c.cpp', 'src/pbc_c.cpp', 'src/hbonds_c.cpp']),
+        sorted(['src/cell_c.cpp', 'src/pbc_c.cpp', 'src/hbonds_c.cpp']),
         language='c++',
         include_dirs=[
             # Path to pybind11 headers
@@ -82,7 +82,7 @@ ext_modules = [
         'paw_structure.radial_c',
         # Sort input source files to ensure bit-for-bit reproducible builds
         # (https://github.com/pybind/python_example/pull/53)
-        sorted(['src/calc_c.cpp', 'src/pbc_c.cpp', 'src/radial_c.cpp']),
+        sorted(['src/cell_c.cpp', 'src/pbc_c.cpp', 'src/radial_c.cpp']),
         language='c++',
         include_dirs=[
             # Path to pybind11 headers
@@ -93,7 +93,18 @@ ext_modules = [
         'paw_structure.angle_c',
         # Sort input source files to ensure bit-for-bit reproducible builds
         # (https://github.com/pybind/python_example/pull/53)
-        sorted(['src/calc_c.cpp', 'src/pbc_c.cpp', 'src/angle_c.cpp']),
+        sorted(['src/cell_c.cpp', 'src/pbc_c.cpp', 'src/angle_c.cpp']),
+        language='c++',
+        include_dirs=[
+            # Path to pybind11 headers
+            get_pybind_include(),
+        ],
+    ),
+    Extension(
+        'paw_structure.neighbor_c',
+        # Sort input source files to ensure bit-for-bit reproducible builds
+        # (https://github.com/pybind/python_example/pull/53)
+        sorted(['src/cell_c.cpp', 'src/pbc_c.cpp', 'src/neighbor_c.cpp']),
         language='c++',
         include_dirs=[
             # Path to pybind11 headers
@@ -164,6 +175,12 @@ class BuildExt(build_ext):
             opts.append(cpp_flag(self.compiler))
             if has_flag(self.compiler, '-fvisibility=hidden'):
                 opts.append('-fvisibility=hidden')
+            # parallel C++ routines, serial build if OpenMP is not available
+            if has_flag(self.compiler, '-fopenmp'):
+                opts.append('-fopenmp')
+                link_opts.append('-fopenmp')
+        elif ct == 'msvc':
+            opts.append('/openmp')
 
         for ext in self.extensions:
             ext.define_macros = [('VERSION_INFO', '"{}"'.format(self.distribution.get_version()))]
@@ -3,6 +3,8 @@ from . import hbonds
 from . import ion
 from . import neighbor
 from . import pbc
+from . import pipeline
+from . import pool
 from . import radial
 from . import scntl
 from . import tra
@@ -13,6 +15,7 @@ from . import water
 from . import hbonds_c
 from . import radial_c
 from . import angle_c
+from . import neighbor_c
 
 from . import structure_fast
 from . import structure_ion
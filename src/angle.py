@@ -11,21 +11,23 @@ Utilizes C++ code connected by pybind11_ in :mod:`.angle_c`.
 
 Dependencies:
     :py:mod:`cycler`
-    :py:mod:`functools`
     :py:mod:`matplotlib`
-    :py:mod:`miniutils`
     :py:mod:`numpy`
     :py:mod:`pandas`
     :py:mod:`scipy`
     :py:mod:`seaborn`
     :py:mod:`sys`
+    :mod:`.tra`
     :mod:`.utility`
     :mod:`.angle_c`
 
 .. autosummary::
 
+    angle_block
     angle_calculate
+    angle_count
     angle_load
+    angle_normalize
     angle_peak
     angle_plot
     angle_save
@@ -33,8 +35,6 @@ Dependencies:
 """
 from cycler import cycler
 import numpy as np
-from functools import partial
-import miniutils.progress_bar as progress
 import matplotlib.pyplot as plt
 import matplotlib
 import scipy.signal as signal
@@ -43,53 +43,109 @@ import sys
 
 from . import utility
 from . import angle_c
+from . import tra
 
 
-def angle_single_c(snap, id1, id2, cut, names=None):
+def angle_single_c(snap, id1, id2, cut, nbins, names=None, sinus=False):
     """
-    Binding of C++ routines in :mod:`.angle_c` for angle calculation of a single snapshot.
+    Binding of C++ routines in :mod:`.angle_c` for the angle histogram of a single snapshot.
 
     Args:
         snap (:class:`.Snap`): single snapshot containing the atomic information
         id1 (str): identifier for atoms used as center (e.g. 'MN', 'O\_')
         id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
         cut (float): cutoff distance for angle calculation
+        nbins (int): number of degree intervals in [0, 180]
         names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+        sinus (bool, optional): default False - weight each angle with its sine
 
     Returns:
-        list[float]: list of angles found between atoms closer than :data:`cut`
+        ndarray[int]: number of angles in each degree interval; ndarray[float] with the summed weights if
+        :data:`sinus` is set
 
+    Histograms of several snapshots are merged by summation (see :func:`.angle_count`).
     """
+    # transform atomic coordinates into necessary shape
     if names is None:
-        # transform atomic coordinates into necessary shape
-        atoms1 = snap.atoms[snap.atoms['id'] == id1]['pos'].values
-        atoms1 = atoms1.reshape(len(atoms1) * 3)
-        atoms2 = snap.atoms[snap.atoms['id'] == id2]['pos'].values
-        atoms2 = atoms2.reshape(len(atoms2) * 3)
-        cell = snap.cell.reshape(9)
-        ang = angle_c.angle(atoms1, atoms2, cut, cell)
+        atoms1 = snap.select(id=id1).reshape(-1)
     else:
-        # transform atomic coordinates into necessary shape
-        atoms1 = snap.atoms[snap.atoms['name'].isin(names)]['pos'].values
-        atoms1 = atoms1.reshape(len(atoms1) * 3)
-        atoms2 = snap.atoms[snap.atoms['id'] == id2]['pos'].values
-        atoms2 = atoms2.reshape(len(atoms2) * 3)
-        cell = snap.cell.reshape(9)
-        ang = angle_c.angle(atoms1, atoms2, cut, cell)
-    return ang
+        atoms1 = snap.select(names=names).reshape(-1)
+    atoms2 = snap.select(id=id2).reshape(-1)
+    cell = snap.cell.reshape(9)
+    return angle_c.angle(atoms1, atoms2, cut, cell, nbins, sinus=sinus)
 
 
-def angle_calculate(snapshots, id1, id2, cut, nbins, names=None):
+def angle_block(topology, pos, cells, id1, id2, cut, nbins, names=None, sinus=False):
+    """
+    Histogram of angles of a block of snapshots (see :func:`.tra_blocks`).
+
+    Args:
+        topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+        pos (ndarray[float]): MxNx3 array of atomic positions
+        cells (ndarray[float]): Mx3x3 array of unit cells
+        id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
+        id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        cut (float): cutoff distance for possible neighbors in angle calculation
+        nbins (int): number of degree intervals in [0, 180]
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+        sinus (bool, optional): default False - weight each angle with its sine
+
+    Returns:
+        ndarray[int]: number of angles in each degree interval; ndarray[float] with the summed weights if
+        :data:`sinus` is set
+    """
+    if names is None:
+        rows1 = topology.select(id=id1)
+    else:
+        rows1 = topology.select(names=names)
+    return angle_c.angle_batch(pos, cells, rows1, topology.select(id=id2), cut, nbins, sinus=sinus)
+
+
+def angle_count(snapshots, id1, id2, cut, nbins, names=None, chunk=1000, sinus=False):
+    """
+    Sum the histograms of angles of all snapshots.
+
+    Args:
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
+        id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
+        id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        cut (float): cutoff distance for possible neighbors in angle calculation
+        nbins (int): number of degree intervals in [0, 180]
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_blocks`)
+        sinus (bool, optional): default False - weight each angle with its sine
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: number of angles in each degree interval; ndarray[float] with the summed weights if
+              :data:`sinus` is set
+            - int: number of snapshots
+
+    Each block of snapshots is passed to :func:`.angle_c.angle_batch` at once which returns only the histogram of its
+    angles. Memory does not grow with the number of snapshots.
+    """
+    count = np.zeros(nbins, dtype=np.float64 if sinus else np.int64)
+    n_snapshots = 0
+    for part, topology, pos, cells in tra.tra_blocks(snapshots, chunk):
+        count += angle_block(topology, pos, cells, id1, id2, cut, nbins, names=names, sinus=sinus)
+        n_snapshots += len(part)
+    return count, n_snapshots
+
+
+def angle_calculate(snapshots, id1, id2, cut, nbins, names=None, chunk=1000, sinus=False):
     """
     Calculate the angle distribution function (adf) including multiple snapshots.
 
     Args:
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the atomic information
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
         id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
         id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
         cut (float): cutoff distance for possible neighbors in angle calculation
         nbins (int): number of degree intervals; influences resolutions
-        names (list[str], optional): NOT IN USE; names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23'); replaces :data:`id1`
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_chunk`)
+        sinus (bool, optional): default False - weight each angle with its sine (compare :func:`.angle_plot`)
 
     Returns:
         (tuple): tuple containing:
@@ -97,27 +153,39 @@ def angle_calculate(snapshots, id1, id2, cut, nbins, names=None):
             - ndarray[float]: degree values corresponding to adf
             - ndarray[float]: value of adf corresponding to these degree values
 
+    The histograms of all snapshots are summed by :func:`.angle_count`.
+
     Todo:
-        Implement usage of :data:`names`.
         Make single snapshot possible.
     """
     print("ADF CALCULATION IN PROGRESS")
-    multi_one = partial(angle_single_c, id1=id1, id2=id2, cut=cut, names=names)
-    angles = progress.parallel_progbar(multi_one, snapshots)
-    # combine the list of lists into a flat array
-    angles = np.array([y for x in angles for y in x])
+    count, n_snapshots = angle_count(snapshots, id1, id2, cut, nbins, names=names, chunk=chunk, sinus=sinus)
+    degree, adf = angle_normalize(count, nbins)
+    print("ADF CALCULATION FINISHED")
+    return degree, adf
+
+
+def angle_normalize(count, nbins):
+    """
+    Normalize the summed histogram of angles to a probability density.
+
+    Args:
+        count (ndarray[int], ndarray[float]): histogram of angles obtained from :func:`.angle_count`
+        nbins (int): number of degree intervals in [0, 180]
+
+    Returns:
+        (tuple): tuple containing degree values and adf (see :func:`.angle_calculate`)
+    """
+    edges = np.linspace(0.0, 180.0, nbins + 1)
     # TODO: only works if N > 1
-    # sort data in a histogram
-    hist = np.histogram(angles, bins=nbins, range=(0.0, 180.0), density=True)
-    # extract radius and radial distribution function
-    adf = hist[0]
-    degree = hist[1][1:]
+    # normalize histogram to a probability density
+    adf = count / count.sum() / np.diff(edges)
+    degree = edges[1:]
     # account for multiple reference centers and multiple snapshots
     #if names is None:
     #    adf = adf / len(snapshots) / len(snapshots[0].atoms[snapshots[0].atoms['id'] == id1])
     #else:
     #    adf = adf / len(snapshots) / len(snapshots[0].atoms[snapshots[0].atoms['name'].isin(names)])
-    print("ADF CALCULATION FINISHED")
     return degree, adf
 
 
@@ -140,17 +208,21 @@ def angle_plot(args):
     else:
         matplotlib.rcParams.update({'font.size': 14})
         plt.figure()
+    weighted = args.sinus
     for name in args.angle:
         root = utility.argcheck([sys.argv[0], name], '.angle')
-        data = angle_load(root)
+        data, sinus = angle_load(root)
         if args.latex:
             #label = root.replace("_", "\_")
             label = root
         else:
             label = root
-        if args.sinus:
-            data[:, 1] = data[:, 1] * np.sin(data[:, 0] / 180. * np.pi)
+        if args.sinus or sinus:
+            # files calculated with SINUS TRUE are already weighted with the sine
+            if not sinus:
+                data[:, 1] = data[:, 1] * np.sin(data[:, 0] / 180. * np.pi)
             data[:, 1] = data[:, 1] / np.trapz(data[:, 1], x=data[:, 0])
+            weighted = True
             plt.plot(data[:, 0], data[:, 1] , label=label)
         else:
             plt.plot(data[:, 0], data[:, 1], label=label)
@@ -170,7 +242,7 @@ def angle_plot(args):
         plt.ylim(bottom=0.0)
     if args.latex:
         plt.xlabel(r'$\theta\;$[$^\circ$]')
-        if args.sinus:
+        if weighted:
             plt.ylabel(r'$P(\theta)\sin(\theta)$')
         else:
             plt.ylabel(r'$P(\theta)$')
@@ -221,7 +293,7 @@ def angle_peak(degree, adf):
     return peaks, results
 
 
-def angle_save(root, degree, adf, snapshots, id1, id2, cut, nbins, ext='.angle'):
+def angle_save(root, degree, adf, snapshots, id1, id2, cut, nbins, sinus=False, ext='.angle'):
     """
     Save results to file :ref:`Output_angle`.
 
@@ -229,11 +301,12 @@ def angle_save(root, degree, adf, snapshots, id1, id2, cut, nbins, ext='.angle')
         root (str): root name for saving file
         degree (ndarray[float]): degree used for adf calculation
         adf (ndarray[float]): value of adf corresponding to these degrees
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the water complexes
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots used for the calculation
         id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
         id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
         cut (float): cutoff distance for radial calculation
         nbins (int): number of radius intervals; influences resolutions together with :data:`cut`
+        sinus (bool, optional): default False - angles were weighted with their sine (see :func:`.angle_calculate`)
         ext (str, optional): default ".radial" - extension for the saved file: name = root + ext
     """
     # open file
@@ -252,8 +325,10 @@ def angle_save(root, degree, adf, snapshots, id1, id2, cut, nbins, ext='.angle')
     f.write("%-14s%14s\n" % ("ID2", id2))
     f.write("%-14s%14.8f\n" % ("CUT", cut))
     f.write("%-14s%14d\n" % ("NBINS", nbins))
+    f.write("%-14s%14s\n" % ("SINUS", sinus))
     f.write("%-14s\n" % "UNIT CELL")
     np.savetxt(f, snapshots[0].cell, fmt="%14.8f")
+    tra.tra_cells_write(f, snapshots)
     f.write("\n%14s%14s\n" % ("DEGREE", "ADF"))
     data = np.vstack((degree, adf))
     np.savetxt(f, data.T, fmt="%14.8f")
@@ -273,6 +348,7 @@ def angle_load(root, ext='.angle'):
         (tuple): tuple containing:
 
             - ndarray(float): 2D array containing degrees and corresponding values of adf
+            - bool: **True** if the angles were already weighted with their sine (**SINUS** in the header)
     """
     # open file
     path = root + ext
@@ -283,10 +359,14 @@ def angle_load(root, ext='.angle'):
     text = f.readlines()  # read text as lines
     for i in range(len(text)):
         text[i] = text[i].split()  # split each line into list with strings as elements
+    sinus = False
     for i in range(len(text)):
         if len(text[i]) > 1:
+            # sine weighting of the angles (missing in older files)
+            if text[i][0] == 'SINUS':
+                sinus = text[i][1].casefold() == 'true'
             # find beginning beginning of data
             if text[i] == ['DEGREE', 'ADF']:
                 data = np.array(text[i+1:], dtype=float)
                 break
-    return data
+    return data, sinus
@@ -1,81 +1,164 @@
 #include <iostream>
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
-#include <pybind11/stl.h>
 
+#include "batch_c.h"
 #include "calc_c.h"
+#include "cell_c.h"
+#include "hist_c.h"
 #include "pbc_c.h"
+#include "thread_c.h"
 
 
 using namespace std;
 namespace py = pybind11;
 
-py::array_t<double> angle(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell);
-vector<double> * angle_calculate(const double * array1, int len1, const double * array2, int len2, double cut, const double * cell);
+py::array angle(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell, int nbins,
+        bool sinus);
+py::array angle_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2, double cut, int nbins,
+        bool sinus);
+void angle_histogram(const double * array1, int len1, const double * array2, int len2, double cut, const double * cell,
+        const Histogram & hist, int64_t * count, double * weight);
+py::array angle_result(vector<int64_t> & count, vector<double> & weight, bool sinus);
 
 
-/* GET DISTANCES FOR ANGLE DISTRIBUTION FUNCTION CALCULATION */
-py::array_t<double> angle(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell){
+/* HISTOGRAM OF ANGLES FOR ANGLE DISTRIBUTION FUNCTION CALCULATION */
+py::array angle(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell, int nbins,
+        bool sinus){
     py::buffer_info buf1 = array1.request(), buf2 = array2.request(), buf3 = cell.request();
     // check if given numpy arrays have dimension 1 (are flat)
     if(buf1.ndim != 1 || buf2.ndim != 1 || buf3.ndim != 1)
         throw runtime_error("Number of dimensions must be 1.");
+    if(nbins < 1)
+        throw runtime_error("Number of bins must be positive.");
     // obtain pointer on arrays
     const double * ptr1 = (const double *)buf1.ptr;
     const double * ptr2 = (const double *)buf2.ptr;
     const double * ptr3 = (const double *)buf3.ptr;
-    // obtain distances in array
-    vector<double> * angles = angle_calculate(ptr1, buf1.size / 3, ptr2, buf2.size/3, cut, ptr3);
-    // cast to be compatible with Python
-    py::array_t<double> ang = py::cast(angles);
-    // clean memory
-    angles->clear();
-    return ang;
+    // sort angles into histogram
+    vector<int64_t> count(nbins, 0);
+    vector<double> weight(sinus ? nbins : 0, 0.0);
+    Histogram hist;
+    hist_init(hist, 0.0, 180.0, nbins);
+    {
+        py::gil_scoped_release release;
+        angle_histogram(ptr1, buf1.size / 3, ptr2, buf2.size / 3, cut, ptr3, hist, count.data(),
+                        sinus ? weight.data() : nullptr);
+    }
+    return angle_result(count, weight, sinus);
+}
+
+
+/* HISTOGRAM OF ANGLES FOR A BLOCK OF SNAPSHOTS */
+py::array angle_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2, double cut, int nbins,
+        bool sinus){
+    int n_atoms;
+    int n_frames = batch_frames(pos, cells, n_atoms);
+    batch_check_index(idx1, n_atoms);
+    batch_check_index(idx2, n_atoms);
+    if(nbins < 1)
+        throw runtime_error("Number of bins must be positive.");
+    int len1 = idx1.size(), len2 = idx2.size();
+    const double * ptr_pos = pos.data();
+    const double * ptr_cells = cells.data();
+    const int64_t * ptr1 = idx1.data();
+    const int64_t * ptr2 = idx2.data();
+    vector<int64_t> count(nbins, 0);
+    vector<double> weight(sinus ? nbins : 0, 0.0);
+    {
+        // loop through snapshots without the Python interpreter
+        py::gil_scoped_release release;
+        Histogram hist;
+        hist_init(hist, 0.0, 180.0, nbins);
+        ThreadError error;
+        // distribute snapshots over threads, a single snapshot is distributed over its center atoms instead
+        #pragma omp parallel if(n_frames > 1)
+        {
+            vector<double> array1, array2;
+            vector<int64_t> local_count(count.size(), 0);
+            vector<double> local_weight(weight.size(), 0.0);
+            #pragma omp for schedule(dynamic)
+            for(int f = 0; f < n_frames; f++){
+                error.run([&](){
+                    const double * frame = ptr_pos + 3 * (size_t)n_atoms * f;
+                    batch_gather(frame, ptr1, len1, array1);
+                    batch_gather(frame, ptr2, len2, array2);
+                    angle_histogram(array1.data(), len1, array2.data(), len2, cut, ptr_cells + 9 * f, hist,
+                                    local_count.data(), sinus ? local_weight.data() : nullptr);
+                });
+            }
+            thread_merge(local_count, count.data());
+            thread_merge(local_weight, weight.data());
+        }
+        error.rethrow();
+    }
+    return angle_result(count, weight, sinus);
 }
 
-// calculate angles
-vector<double> * angle_calculate(const double * array1, int len1, const double * array2, int len2,
-        double cut, const double * cell){
-    vector<double> * angles = new vector<double>;
-    // apply periodic boundary conditions to obtain 3x3 unit cell
-    double * pbc2 = pbc_apply3x3(array2, len2, cell);
-    double center[3], neighbor[3], ang, dist;
-    int counter;
-    // loop through center atoms
-    for(int i = 0; i < len1; i++){
-        counter = 0;
-        vector<double> next_list;
-        center[0] = array1[3 * i];
-        center[1] = array1[3 * i + 1];
-        center[2] = array1[3 * i + 2];
-        // for each center atoms loop through possible neighbor atoms
-        for(int j = 0; j < 27 * len2; j++){
-            neighbor[0] = pbc2[3 * j];
-            neighbor[1] = pbc2[3 * j + 1];
-            neighbor[2] = pbc2[3 * j + 2];
-            // calculate distance
-            double * v = calc_dist_vec(center, neighbor);
-            dist = calc_norm(v);
-            delete [] v;
-            // check if distance is within cutoff and avoid self-interaction
-            if(dist < cut && dist > 0.01){
-                counter += 1;
+
+// sort angles into histogram; sum sin(angle) instead of counting if weight is given
+void angle_histogram(const double * array1, int len1, const double * array2, int len2, double cut, const double * cell,
+        const Histogram & hist, int64_t * count, double * weight){
+    // sort neighbor atoms into cell list
+    CellList list;
+    cell_list_build(list, array2, len2, cell, cut);
+    // distribute center atoms over threads, each thread sorts into its own histogram
+    #pragma omp parallel if(!thread_active())
+    {
+        double center[3], ang;
+        // vectors from the center to its neighbors and their lengths
+        vector<double> next_list, next_norm;
+        vector<int64_t> local_count(weight == nullptr ? hist.nbins : 0, 0);
+        vector<double> local_weight(weight == nullptr ? 0 : hist.nbins, 0.0);
+        // loop through center atoms
+        #pragma omp for schedule(dynamic, 16)
+        for(int i = 0; i < len1; i++){
+            next_list.clear();
+            next_norm.clear();
+            center[0] = array1[3 * i];
+            center[1] = array1[3 * i + 1];
+            center[2] = array1[3 * i + 2];
+            // for each center atom collect neighbor atoms within cutoff and avoid self-interaction
+            cell_list_search(list, center, cut, 0.01, [&](int j, const double * neighbor, double dist){
                 for(int k = 0; k < 3; k++){
-                    next_list.push_back(neighbor[k]);
+                    next_list.push_back(neighbor[k] - center[k]);
+                }
+                next_norm.push_back(dist);
+            });
+            int counter = next_norm.size();
+            for(int m = 0; m < counter - 1; m++){
+                for(int n = m + 1; n < counter; n++){
+                    ang = calc_angle_vec(&next_list[3 * m], next_norm[m], &next_list[3 * n], next_norm[n]);
+                    int index = hist_index(hist, ang);
+                    if(index < 0){
+                        continue;
+                    }
+                    if(weight == nullptr){
+                        local_count[index]++;
+                    } else {
+                        local_weight[index] += sin(ang / 180.0 * M_PI);
+                    }
                 }
             }
         }
-        for(int m = 0; m < counter - 1; m++){
-            for(int n = m + 1; n < counter; n++){
-                ang = calc_angle(&next_list[3 * m], &center[0], &next_list[3 * n]);
-                angles->push_back(ang);
-            }
+        if(weight == nullptr){
+            thread_merge(local_count, count);
+        } else {
+            thread_merge(local_weight, weight);
         }
+    }
+}
 
+
+// copy histogram to numpy array; float weights for sin weighted histograms
+py::array angle_result(vector<int64_t> & count, vector<double> & weight, bool sinus){
+    if(sinus){
+        return py::array_t<double>(weight.size(), weight.data());
     }
-    return angles;
+    return py::array_t<int64_t>(count.size(), count.data());
 }
 
+
 PYBIND11_MODULE(angle_c, m){
 m.doc() = R"pbdoc(
         paw_structure.angle_c
@@ -99,37 +182,73 @@ m.doc() = R"pbdoc(
         Dependencies:
             :py:mod:`numpy`
             :py:mod:`pybind11`
-            :mod:`calc_c.cpp`
+            :mod:`batch_c.h`
+            :mod:`calc_c.h`
+            :mod:`cell_c.cpp`
+            :mod:`hist_c.h`
             :mod:`pbc_c.cpp`
+            :mod:`thread_c.h`
 
         .. autosummary::
 
             angle
-            angle_calculate
+            angle_batch
+            angle_histogram
             calc_angle_c
             calc_dist_vec_c
             calc_norm_c
-            pbc_apply3x3_c
+            threads
     )pbdoc"; // optional module docstring
 
     m.def("angle", &angle, py::return_value_policy::move, R"pbdoc(
-            Calculate angles from center atoms and neighbor atoms which are closer than a cutoff distance.
+            Histogram of angles from center atoms and neighbor atoms which are closer than a cutoff distance.
 
-            Mostly handles connection to Python code. Actual calculation is performed in :func:`.angle_c.angle_calculate`.
+            Mostly handles connection to Python code. Actual calculation is performed in :func:`.angle_c.angle_histogram`.
 
             Args:
                 array1 (ndarray[float]): atomic positions for central atoms
                 array2 (ndarray[float]): atomic positions for neighbor atoms
                 cut (float): cutoff for distance search
                 cell (ndarray[float]): unit cell of the system for periodic boundary conditions
+                nbins (int): number of degree intervals in [0, 180]
+                sinus (bool, optional): default False - sum sin(angle) of the angles in each interval instead of
+                    counting them
 
             Returns:
-                ndarray[float]: angles obtained for the calculation of the angle distribution function
-        )pbdoc", py::arg("array1"), py::arg("array2"), py::arg("cut"), py::arg("cell")
+                ndarray[int]: number of angles in each degree interval; ndarray[float] with the summed weights if
+                :data:`sinus` is set
+
+            Histograms of several snapshots are merged by summation.
+        )pbdoc", py::arg("array1"), py::arg("array2"), py::arg("cut"), py::arg("cell"), py::arg("nbins"),
+        py::arg("sinus") = false
     );
 
-    m.def("angle_calculate", &angle_calculate, R"pbdoc(
-            Actual calculation of angles.
+    m.def("angle_batch", &angle_batch, R"pbdoc(
+            Histogram of angles from center atoms and neighbor atoms which are closer than a cutoff distance summed
+            over a block of snapshots.
+
+            The snapshots are processed in parallel without holding the Python global interpreter lock.
+            Actual calculation is performed in :func:`.angle_c.angle_histogram`.
+
+            Args:
+                pos (ndarray[float]): atomic positions of all atoms with shape (n_frames, n_atoms, 3)
+                cells (ndarray[float]): unit cells of the snapshots with shape (n_frames, 3, 3)
+                idx1 (ndarray[int]): rows of the central atoms in pos
+                idx2 (ndarray[int]): rows of the neighbor atoms in pos
+                cut (float): cutoff for distance search
+                nbins (int): number of degree intervals in [0, 180]
+                sinus (bool, optional): default False - sum sin(angle) of the angles in each interval instead of
+                    counting them
+
+            Returns:
+                ndarray[int]: number of angles in each degree interval; ndarray[float] with the summed weights if
+                :data:`sinus` is set
+        )pbdoc", py::arg("pos"), py::arg("cells"), py::arg("idx1"), py::arg("idx2"), py::arg("cut"), py::arg("nbins"),
+        py::arg("sinus") = false
+    );
+
+    m.def("angle_histogram", &angle_histogram, R"pbdoc(
+            Sort the angles of a single snapshot into a histogram.
 
             Args:
                 array1 (double *): pointer on array with atomic positions for central atoms
@@ -138,31 +257,30 @@ m.doc() = R"pbdoc(
                 len2 (int): number of atoms in array2
                 cut (double): cutoff for distance search
                 cell (double *): pointer on array with unit cell of the system for periodic boundary conditions
-
-            Returns:
-                vector<double> *: pointer on double vector with angles obtained for the calculation of the angle distribution function
+                hist (Histogram): bins in [0, 180] (see :mod:`hist_c.h`)
+                count (int64_t *): pointer on array with nbins entries; number of angles is added
+                weight (double *): pointer on array with nbins entries; sin(angle) is added instead of counting if
+                    not nullptr
 
             Note:
                 C++ only
-        )pbdoc", py::arg("array1"), py::arg("len1"), py::arg("array2"), py::arg("len2"), py::arg("cut"), py::arg("cell")
+        )pbdoc", py::arg("array1"), py::arg("len1"), py::arg("array2"), py::arg("len2"), py::arg("cut"), py::arg("cell"),
+        py::arg("hist"), py::arg("count"), py::arg("weight")
     );
 
-    m.def("pbc_apply3x3_c", &pbc_apply3x3, R"pbdoc(
-            Apply periodic boundary conditions to obtain 3x3 unit cell.
+    m.def("threads", &thread_count, R"pbdoc(
+            Number of threads used by the parallel C++ routines.
 
             Args:
-                pos (double *): pointer on array with atomic positions
-                len (int): number of atoms in pos
-                cell (double *): pointer on array with unit cell of the system
+                n (int, optional): default 0 - set the number of threads first if positive; otherwise the environment
+                    variable OMP_NUM_THREADS or the number of cores decides
 
             Returns:
-                double *: pointer on array with atomic position of 3x3 unit cell
+                int: number of threads; 1 if the module was compiled without OpenMP
 
             Note:
-                C++ only.
-
-                Source code in file :mod:`pbc_c.cpp`.
-        )pbdoc", py::arg("pos"), py::arg("len"), py::arg("cell")
+                Source code in file :mod:`thread_c.h`.
+        )pbdoc", py::arg("n") = 0
     );
 
     m.def("calc_dist_vec_c", &calc_dist_vec, R"pbdoc(
@@ -171,15 +289,13 @@ m.doc() = R"pbdoc(
             Args:
                 pos1 (double *): pointer on array with position of atom 1
                 pos2 (double *): pointer on array with position of atom 2
-
-            Returns:
-                double *: pointer on array with vector between both positions
+                vec (double *): pointer on array with 3 entries which is filled with the vector from pos1 to pos2
 
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
-        )pbdoc", py::arg("pos1"), py::arg("pos2")
+                Source code in file :mod:`calc_c.h`.
+        )pbdoc", py::arg("pos1"), py::arg("pos2"), py::arg("vec")
     );
 
     m.def("calc_norm_c", &calc_norm, R"pbdoc(
@@ -194,7 +310,7 @@ m.doc() = R"pbdoc(
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
+                Source code in file :mod:`calc_c.h`.
         )pbdoc", py::arg("vec")
     );
 
@@ -212,7 +328,7 @@ m.doc() = R"pbdoc(
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
+                Source code in file :mod:`calc_c.h`.
         )pbdoc", py::arg("pos1"), py::arg("pos2"), py::arg("pos3")
     );
 
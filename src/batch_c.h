@@ -0,0 +1,73 @@
+#ifndef PAW_STRUCTURE_BATCH_C_H
+#define PAW_STRUCTURE_BATCH_C_H
+
+#include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
+#include <cstdint>
+#include <stdexcept>
+#include <vector>
+
+// helpers for entry points which process a whole block of snapshots in one call
+
+namespace py = pybind11;
+
+// positions (n_frames, n_atoms, 3) and unit cells (n_frames, 3, 3) of a block of snapshots
+typedef py::array_t<double, py::array::c_style | py::array::forcecast> batch_array;
+// rows of the selected atoms in the block
+typedef py::array_t<int64_t, py::array::c_style | py::array::forcecast> batch_index;
+
+// check shapes of a block of snapshots, return number of frames and store number of atoms in n_atoms
+inline int batch_frames(const batch_array & pos, const batch_array & cells, int & n_atoms){
+    if(pos.ndim() != 3 || pos.shape(2) != 3)
+        throw std::runtime_error("Positions must have shape (n_frames, n_atoms, 3).");
+    if(cells.ndim() != 3 || cells.shape(1) != 3 || cells.shape(2) != 3 || cells.shape(0) != pos.shape(0))
+        throw std::runtime_error("Unit cells must have shape (n_frames, 3, 3).");
+    n_atoms = (int)pos.shape(1);
+    return (int)pos.shape(0);
+}
+
+// check that the indices select existing atoms
+inline void batch_check_index(const batch_index & idx, int n_atoms){
+    if(idx.ndim() != 1)
+        throw std::runtime_error("Number of dimensions must be 1.");
+    const int64_t * ptr = idx.data();
+    for(py::ssize_t i = 0; i < idx.size(); i++){
+        if(ptr[i] < 0 || ptr[i] >= n_atoms)
+            throw std::runtime_error("Atom index out of range.");
+    }
+}
+
+// read optional type labels (0, 1, ...) of len selected atoms into out, return number of types
+// all atoms are of type 0 if types is None
+inline int batch_types(const py::object & types, py::ssize_t len, std::vector<int> & out){
+    out.assign(len, 0);
+    if(types.is_none()){
+        return 1;
+    }
+    batch_index labels = types.cast<batch_index>();
+    if(labels.ndim() != 1 || labels.size() != len)
+        throw std::runtime_error("Types must have one entry for each selected atom.");
+    const int64_t * ptr = labels.data();
+    int n_types = 1;
+    for(py::ssize_t i = 0; i < len; i++){
+        if(ptr[i] < 0 || ptr[i] > 1000000)
+            throw std::runtime_error("Types must be non-negative integers.");
+        out[i] = (int)ptr[i];
+        if(out[i] >= n_types){
+            n_types = out[i] + 1;
+        }
+    }
+    return n_types;
+}
+
+// copy positions of the selected atoms of one frame into a contiguous array
+inline void batch_gather(const double * pos, const int64_t * idx, int len, std::vector<double> & out){
+    out.resize(3 * len);
+    for(int i = 0; i < len; i++){
+        out[3 * i] = pos[3 * idx[i]];
+        out[3 * i + 1] = pos[3 * idx[i] + 1];
+        out[3 * i + 2] = pos[3 * idx[i] + 2];
+    }
+}
+
+#endif //PAW_STRUCTURE_BATCH_C_H
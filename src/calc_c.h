@@ -1,7 +1,56 @@
 #ifndef PAW_STRUCTURE_CALC_C_H
 #define PAW_STRUCTURE_CALC_C_H
-double* calc_dist_vec(double * pos1, double * pos2);
-double calc_skalar(double * v1, double * v2);
-double calc_norm(double * v1);
-double calc_angle(double * pos1, double * pos2, double * pos3);
+
+#include <cmath>
+
+// inline geometry on stack vectors for the innermost loops (no heap allocation)
+
+// calculate vector v from pos1 to pos2
+inline void calc_dist_vec(const double * pos1, const double * pos2, double * v){
+    for(int i = 0; i < 3; i++){
+        v[i] = pos2[i] - pos1[i];
+    }
+}
+
+// calculate skalar product between two vectors
+inline double calc_skalar(const double * v1, const double * v2){
+    double skalar = 0.0;
+    for(int i = 0; i < 3; i++){
+        skalar += v1[i] * v2[i];
+    }
+    return skalar;
+}
+
+// calculate squared norm of a vector
+inline double calc_norm2(const double * v1){
+    return calc_skalar(v1, v1);
+}
+
+// calculate norm of a vector
+inline double calc_norm(const double * v1){
+    return std::sqrt(calc_norm2(v1));
+}
+
+// calculate angle between two vectors with known norms in degree
+inline double calc_angle_vec(const double * v1, double norm1, const double * v2, double norm2){
+    double angle = calc_skalar(v1, v2) / (norm1 * norm2);
+    angle = std::acos(angle);
+    angle = angle / M_PI * 180.0;
+    return angle;
+}
+
+// calculate angle between three points (at pos2) in degree
+inline double calc_angle(const double * pos1, const double * pos2, const double * pos3){
+    double v1[3], v2[3];
+    calc_dist_vec(pos2, pos1, v1);
+    calc_dist_vec(pos2, pos3, v2);
+    return calc_angle_vec(v1, calc_norm(v1), v2, calc_norm(v2));
+}
+
+// squared cutoff for early rejection before taking the square root
+// slightly enlarged so that no pair with sqrt(dist2) < cut is rejected due to rounding
+inline double calc_cut2(double cut){
+    return cut * cut * (1.0 + 1e-12);
+}
+
 #endif //PAW_STRUCTURE_CALC_C_H
@@ -0,0 +1,84 @@
+#include "cell_c.h"
+#include "pbc_c.h"
+
+#include <algorithm>
+#include <cmath>
+#include <stdexcept>
+
+// sort atoms into bins which are at least cut wide so neighbors are found in the adjacent bins only
+// small cells are searched with the minimum image convention instead
+void cell_list_build(CellList & list, const double * pos, int len, const double * cell, double cut){
+    list.pos = pos;
+    list.len = len;
+    for(int i = 0; i < 9; i++){
+        list.cell[i] = cell[i];
+    }
+    if(pbc_inverse(cell, list.inv) == 0.0){
+        throw std::runtime_error("Unit cell is singular.");
+    }
+    double width[3];
+    pbc_width(list.inv, width);
+    // small margins keep floating point errors of the fractional coordinates away from the bin boundaries
+    long total = 1;
+    for(int i = 0; i < 3; i++){
+        double bins = std::floor(width[i] / cut * (1.0 - 1e-10));
+        list.bins[i] = (bins < 1.0) ? 1 : (bins > 1024.0 ? 1024 : (int)bins);
+        total *= list.bins[i];
+    }
+    // limit memory for tiny cutoffs in large cells
+    while(total > 2L * len + 27 && (list.bins[0] > 1 || list.bins[1] > 1 || list.bins[2] > 1)){
+        int i = 0;
+        for(int k = 1; k < 3; k++){
+            if(list.bins[k] > list.bins[i]){
+                i = k;
+            }
+        }
+        total /= list.bins[i];
+        list.bins[i] = list.bins[i] / 2;
+        total *= list.bins[i];
+    }
+    // cutoffs larger than the cell require images further away than the adjacent cells
+    double visited = 1.0;
+    for(int i = 0; i < 3; i++){
+        list.reach[i] = (int)std::ceil(cut * list.bins[i] / width[i] * (1.0 + 1e-10));
+        visited *= (2.0 * list.reach[i] + 1.0) / list.bins[i];
+    }
+    // small cells: the bins would visit atoms more than once, the minimum image visits each exactly once
+    double smallest = std::min(width[0], std::min(width[1], width[2]));
+    list.minimum = visited > 1.0 && cut < 0.5 * smallest * (1.0 - 1e-10);
+    if(list.minimum){
+        list.shift.clear();
+        list.start.clear();
+        list.atoms.clear();
+        return;
+    }
+    // counting sort of the atoms by bin
+    std::vector<int> bin(len);
+    list.shift.assign(3 * len, 0);
+    list.start.assign(total + 1, 0);
+    int b[3];
+    for(int j = 0; j < len; j++){
+        cell_list_locate(list, pos + 3 * j, b, &list.shift[3 * j]);
+        bin[j] = (b[0] * list.bins[1] + b[1]) * list.bins[2] + b[2];
+        list.start[bin[j] + 1]++;
+    }
+    for(long i = 0; i < total; i++){
+        list.start[i + 1] += list.start[i];
+    }
+    list.atoms.resize(len);
+    std::vector<int> next(list.start.begin(), list.start.end() - 1);
+    for(int j = 0; j < len; j++){
+        list.atoms[next[bin[j]]++] = j;
+    }
+}
+
+// find bin of a position and the lattice translation folding it into the unit cell
+void cell_list_locate(const CellList & list, const double * pos, int * bin, int * shift){
+    for(int i = 0; i < 3; i++){
+        double s = pos[0] * list.inv[i] + pos[1] * list.inv[3 + i] + pos[2] * list.inv[6 + i];
+        double f = std::floor(s);
+        shift[i] = (int)f;
+        int b = (int)((s - f) * list.bins[i]);
+        bin[i] = (b < list.bins[i]) ? b : list.bins[i] - 1;
+    }
+}
@@ -0,0 +1,91 @@
+#ifndef PAW_STRUCTURE_CELL_C_H
+#define PAW_STRUCTURE_CELL_C_H
+
+#include <cmath>
+#include <vector>
+
+#include "calc_c.h"
+#include "pbc_c.h"
+
+// atoms of one species sorted into bins along the lattice vectors of the unit cell
+struct CellList {
+    const double * pos;         // atomic positions (3 * len)
+    int len;                    // number of atoms
+    double cell[9];             // unit cell, rows are lattice vectors
+    double inv[9];              // inverse of the unit cell
+    int bins[3];                // number of bins along each lattice vector
+    int reach[3];               // number of neighboring bins searched along each lattice vector
+    bool minimum;               // search all atoms using the minimum image instead of the bins
+    std::vector<int> start;     // first entry of each bin in atoms (number of bins + 1)
+    std::vector<int> atoms;     // atom indices sorted by bin
+    std::vector<int> shift;     // lattice translation folding each atom into the unit cell (3 * len)
+};
+
+void cell_list_build(CellList & list, const double * pos, int len, const double * cell, double cut);
+void cell_list_locate(const CellList & list, const double * pos, int * bin, int * shift);
+
+// floor of a / b for b > 0
+inline int cell_floor_div(int a, int b){
+    return (a >= 0) ? a / b : -((-a + b - 1) / b);
+}
+
+// call found(index, neighbor, dist) for every periodic image of the atoms in list with min < dist < cut from center
+// the square root is only taken for pairs passing the squared cutoff
+// images are translated by whole lattice vectors so distances are identical to a search through the 3x3 supercell
+template <typename F>
+void cell_list_search(const CellList & list, const double * center, double cut, double min, F found){
+    int shift[3];
+    double neighbor[3], v[3], dist;
+    double cut2 = calc_cut2(cut);
+    if(list.minimum){
+        // only the minimum image of each atom can be closer than cut
+        for(int j = 0; j < list.len; j++){
+            pbc_minimum_image(center, list.pos + 3 * j, list.inv, shift);
+            pbc_image(list.pos + 3 * j, shift, list.cell, neighbor);
+            calc_dist_vec(center, neighbor, v);
+            double dist2 = calc_norm2(v);
+            if(dist2 >= cut2){
+                continue;
+            }
+            dist = std::sqrt(dist2);
+            if(dist < cut && dist > min){
+                found(j, neighbor, dist);
+            }
+        }
+        return;
+    }
+    int bin[3], center_shift[3];
+    cell_list_locate(list, center, bin, center_shift);
+    for(int a = bin[0] - list.reach[0]; a <= bin[0] + list.reach[0]; a++){
+        int sa = cell_floor_div(a, list.bins[0]);
+        int wa = a - sa * list.bins[0];
+        for(int b = bin[1] - list.reach[1]; b <= bin[1] + list.reach[1]; b++){
+            int sb = cell_floor_div(b, list.bins[1]);
+            int wb = b - sb * list.bins[1];
+            for(int c = bin[2] - list.reach[2]; c <= bin[2] + list.reach[2]; c++){
+                int sc = cell_floor_div(c, list.bins[2]);
+                int wc = c - sc * list.bins[2];
+                int index = (wa * list.bins[1] + wb) * list.bins[2] + wc;
+                for(int n = list.start[index]; n < list.start[index + 1]; n++){
+                    int j = list.atoms[n];
+                    // lattice translation from the stored position to the image next to center
+                    shift[0] = center_shift[0] + sa - list.shift[3 * j];
+                    shift[1] = center_shift[1] + sb - list.shift[3 * j + 1];
+                    shift[2] = center_shift[2] + sc - list.shift[3 * j + 2];
+                    pbc_image(list.pos + 3 * j, shift, list.cell, neighbor);
+                    calc_dist_vec(center, neighbor, v);
+                    double dist2 = calc_norm2(v);
+                    if(dist2 >= cut2){
+                        continue;
+                    }
+                    dist = std::sqrt(dist2);
+                    if(dist < cut && dist > min){
+                        found(j, neighbor, dist);
+                    }
+                }
+            }
+        }
+    }
+}
+
+#endif //PAW_STRUCTURE_CELL_C_H
@@ -11,39 +11,63 @@ Utilizes C++ code connected by pybind11_ in :mod:`.hbonds_c`.
 
 Dependencies:
     :py:mod:`cycler`
-    :py:mod:`functools`
     :py:mod:`matplotlib`
-    :py:mod:`miniutils`
     :py:mod:`numpy`
+    :py:mod:`os`
     :py:mod:`pandas`
     :py:mod:`seaborn`
     :py:mod:`sys`
+    :mod:`.tra`
     :mod:`.utility`
     :mod:`.hbonds_c`
 
 .. autosummary::
 
+    HbondsBin
+    HbondsCorrelation
+    HbondsCount
+    hbonds_block
+    hbonds_bonds_block
+    hbonds_centers_block
+    hbonds_centers_bonds
+    hbonds_contains
     hbonds_find_parallel
+    hbonds_load_bin
     hbonds_load_c
+    hbonds_normalize
     hbonds_plot_c
     hbonds_save_c
+    hbonds_save_centers
+    hbonds_save_corr
     hbonds_single_c
 """
 from cycler import cycler
-from functools import partial
 import matplotlib
 import matplotlib.pyplot as plt
-import miniutils.progress_bar as progress
 import numpy as np
+import os
 import seaborn as sns
 import sys
 
 from . import utility
 from . import hbonds_c
+from . import tra
 
 import pandas as pd
 
 
+HBONDS_MAGIC = b'PAWHBOND'  # identifier of the binary hydrogen bond file
+HBONDS_VERSION = 1
+# header of the binary hydrogen bond file: 'frames' is the byte offset of the table of snapshots at the end of the file
+# 'name' and 'id' give the length of the stored atom names and identifiers (see tra_bin_atoms())
+HBONDS_HEADER = np.dtype([('magic', 'S8'), ('version', '<i4'), ('n_atoms', '<i4'), ('count', '<i8'),
+                          ('n_bonds', '<i8'), ('frames', '<i8'), ('name', '<i4'), ('id', '<i4')])
+# one entry per snapshot: hydrogen bonds of the snapshot are the records offset:offset + count
+HBONDS_FRAME = np.dtype([('iter', '<i4'), ('time', '<f8'), ('offset', '<i8'), ('count', '<i8')])
+# one record per hydrogen bond: rows of donor, hydrogen and acceptor atom, oxygen - oxygen distance and angle
+HBONDS_BOND = np.dtype([('bond', '<i4', (3,)), ('dist', '<f4'), ('angle', '<f4')])
+
+
 def hbonds_single_c(snap, id1, id2, cut1, cut2, angle, names=False):
     """
     Binding of C++ routines in :mod:`.hbonds_c` for couting of hydrogen bonds in a single snapshot.
@@ -60,15 +84,11 @@ def hbonds_single_c(snap, id1, id2, cut1, cut2, angle, names=False):
     Returns:
         float: number of hydrogen bonds found for this snapshot
     """
-    atoms1 = snap.atoms[snap.atoms['id'] == id1]['pos'].values
-    atoms1 = atoms1.reshape(len(atoms1) * 3)
-    atoms2 = snap.atoms[snap.atoms['id'] == id2]['pos'].values
-    atoms2 = atoms2.reshape(len(atoms2) * 3)
+    atoms1 = snap.select(id=id1).reshape(-1)
+    atoms2 = snap.select(id=id2).reshape(-1)
     cell = snap.cell.reshape(9)
     if names:
-        center = snap.atoms.loc[snap.atoms['name'].isin(names)]
-        center = center['pos'].values
-        center = center.reshape(len(center) * 3)
+        center = snap.select(names=names).reshape(-1)
         number = hbonds_c.hbonds(atoms1, atoms2, center, cut1, cut2, angle, cell)
     else:
         number = hbonds_c.hbonds(atoms1, atoms2, atoms1, cut1, cut2, angle, cell)
@@ -146,7 +166,7 @@ def hbonds_save_c(root, time, n_hbonds, snapshots, id1, id2, cut1, cut2, angle,
         root (str): root name of the files
         time (ndarray[float]): simulation times of snapshots
         n_hbonds (ndarray[float]): number of average hydrogen bonds per oxygen atom of snapshots
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the atomic information
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
         id1 (str): identifier for oxygen atoms (e.g. 'O\_')
         id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
         cut1 (float): maximum distance between two oxygen atoms
@@ -178,6 +198,7 @@ def hbonds_save_c(root, time, n_hbonds, snapshots, id1, id2, cut1, cut2, angle,
         f.write("\n")
     f.write("%-14s\n" % "UNIT CELL")
     np.savetxt(f, snapshots[0].cell, fmt="%14.8f")
+    tra.tra_cells_write(f, snapshots)
     f.write("\n%14s%14s\n" % ("TIME", "HB / MOLECULE"))
     data = np.vstack((time, n_hbonds))
     np.savetxt(f, data.T, fmt="%14.8f")
@@ -212,36 +233,720 @@ def hbonds_load_c(root, ext='.hbonds_c'):
     return data
 
 
-def hbonds_find_parallel(root, snapshots, id1, id2, cut1, cut2, angle, names=False):
+def hbonds_save_corr(root, time, lags, intermittent, continuous, snapshots, id1, id2, cut1, cut2, angle,
+                     names=False, ext='.hbonds_corr'):
+    """
+    Save hydrogen bond time correlation functions to file :ref:`Output_hbonds_corr`.
+
+    Args:
+        root (str): root name of the files
+        time (ndarray[float]): simulation times of snapshots
+        lags (ndarray[int]): time lags in snapshots
+        intermittent (ndarray[float]): intermittent correlation function C(t)
+        continuous (ndarray[float]): continuous correlation function S(t)
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
+        cut1 (float): maximum distance between two oxygen atoms
+        cut2 (float): maximum distance between an oxygen and a hydrogen atom
+        angle (float): minimum O-H-O angle in degree
+        names (list[str], optional): names of oxygen atoms used as search centers
+        ext (str, optional): default ".hbonds_corr" - extension for the saved file: name = root + ext
+
+    Time lags are converted with the average time step of the snapshots.
+    """
+    path = root + ext
+    try:
+        f = open(path, 'w')
+    except IOError:
+        utility.err_file('hbonds_save_corr', path)
+    step = (time[-1] - time[0]) / (len(time) - 1) if len(time) > 1 else 0.0
+    f.write(utility.write_header())
+    f.write("HYDROGEN BOND TIME CORRELATION\n")
+    f.write("%-14s%14.8f\n" % ("T1", snapshots[0].time))
+    f.write("%-14s%14.8f\n" % ("T2", snapshots[-1].time))
+    f.write("%-14s%14d\n" % ("SNAPSHOTS", len(snapshots)))
+    f.write("%-14s%14s\n" % ("ID1", id1))
+    f.write("%-14s%14s\n" % ("ID2", id2))
+    f.write("%-14s%14s\n" % ("CUT1", cut1))
+    f.write("%-14s%14s\n" % ("CUT2", cut2))
+    f.write("%-14s%14s\n" % ("ANGLE", angle))
+    if names:
+        f.write("%-14s" % "NAMES")
+        for name in names:
+            f.write("%s " % name)
+        f.write("\n")
+    f.write("%-14s%14.8f\n" % ("TIME STEP", step))
+    f.write("%-14s\n" % "UNIT CELL")
+    np.savetxt(f, snapshots[0].cell, fmt="%14.8f")
+    tra.tra_cells_write(f, snapshots)
+    f.write("\n%14s%14s%14s\n" % ("TIME", "C(T)", "S(T)"))
+    data = np.vstack((lags * step, intermittent, continuous))
+    np.savetxt(f, data.T, fmt="%14.8f")
+    f.close()
+    return
+
+
+def hbonds_save_centers(root, n_snapshots, donor, acceptor, histogram, snapshots, id1, id2, cut1, cut2, angle,
+                        names=False, ext='.hbonds_centers'):
+    """
+    Save hydrogen bonds per search center to file :ref:`Output_hbonds_centers`.
+
+    Args:
+        root (str): root name of the files
+        n_snapshots (int): number of snapshots summed up
+        donor (ndarray[int]): donated hydrogen bonds of each search center summed over the snapshots
+        acceptor (ndarray[int]): accepted hydrogen bonds of each search center summed over the snapshots
+        histogram (ndarray[int]): 3x(nmax + 1) histograms of total, donated and accepted hydrogen bonds per search
+            center summed over the snapshots (see :func:`.hbonds_centers_block`)
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
+        cut1 (float): maximum distance between two oxygen atoms
+        cut2 (float): maximum distance between an oxygen and a hydrogen atom
+        angle (float): minimum O-H-O angle in degree
+        names (list[str], optional): names of oxygen atoms used as search centers
+        ext (str, optional): default ".hbonds_centers" - extension for the saved file: name = root + ext
+    """
+    path = root + ext
+    try:
+        f = open(path, 'w')
+    except IOError:
+        utility.err_file('hbonds_save_centers', path)
+    topology = snapshots[0].topology
+    center = topology.select(names=names) if names else topology.select(id=id1)
+    nmax = histogram.shape[1] - 1
+    f.write(utility.write_header())
+    f.write("HYDROGEN BONDS PER SEARCH CENTER\n")
+    f.write("%-14s%14.8f\n" % ("T1", snapshots[0].time))
+    f.write("%-14s%14.8f\n" % ("T2", snapshots[-1].time))
+    f.write("%-14s%14d\n" % ("SNAPSHOTS", n_snapshots))
+    f.write("%-14s%14s\n" % ("ID1", id1))
+    f.write("%-14s%14s\n" % ("ID2", id2))
+    f.write("%-14s%14s\n" % ("CUT1", cut1))
+    f.write("%-14s%14s\n" % ("CUT2", cut2))
+    f.write("%-14s%14s\n" % ("ANGLE", angle))
+    if names:
+        f.write("%-14s" % "NAMES")
+        for name in names:
+            f.write("%s " % name)
+        f.write("\n")
+    f.write("%-14s%14d\n" % ("CENTERS", len(center)))
+    f.write("%-14s\n" % "UNIT CELL")
+    np.savetxt(f, snapshots[0].cell, fmt="%14.8f")
+    tra.tra_cells_write(f, snapshots)
+    # fraction of search centers with 0, 1, ..., nmax or more hydrogen bonds
+    f.write("\n%14s%14s%14s%14s\n" % ("HB", "TOTAL", "DONOR", "ACCEPTOR"))
+    fraction = histogram / max(n_snapshots * len(center), 1)
+    for n in range(nmax + 1):
+        label = "%d+" % n if n == nmax else "%d" % n
+        f.write("%14s%14.8f%14.8f%14.8f\n" % (label, *fraction[:, n]))
+    # time averages of each search center
+    f.write("\n%14s%14s%14s%14s\n" % ("NAME", "DONOR", "ACCEPTOR", "TOTAL"))
+    donor = donor / max(n_snapshots, 1)
+    acceptor = acceptor / max(n_snapshots, 1)
+    for name, d, a in zip(topology.name[center], donor, acceptor):
+        f.write("%14s%14.8f%14.8f%14.8f\n" % (name, d, a, d + a))
+    f.close()
+    return
+
+
+def hbonds_block(topology, pos, cells, id1, id2, cut1, cut2, angle, names=False):
+    """
+    Count the hydrogen bonds in each snapshot of a block (see :func:`.tra_blocks`).
+
+    Args:
+        topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+        pos (ndarray[float]): MxNx3 array of atomic positions
+        cells (ndarray[float]): Mx3x3 array of unit cells
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
+        cut1 (float): maximum distance between two oxygen atoms
+        cut2 (float): maximum distance between an oxygen and a hydrogen atom
+        angle (float): minimum O-H-O angle in degree
+        names (list[str], optional): names of oxygen atoms used as search centers
+
+    Returns:
+        ndarray[int]: number of hydrogen bonds in each snapshot (C++ code)
+    """
+    idx1 = topology.select(id=id1)
+    if names:
+        center = topology.select(names=names)
+    else:
+        center = idx1
+    return hbonds_c.hbonds_batch(pos, cells, idx1, topology.select(id=id2), center, cut1, cut2, angle)
+
+
+def hbonds_bonds_block(topology, pos, cells, id1, id2, cut1, cut2, angle, names=False):
+    """
+    List the hydrogen bonds in each snapshot of a block (see :func:`.tra_blocks`).
+
+    Args:
+        topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+        pos (ndarray[float]): MxNx3 array of atomic positions
+        cells (ndarray[float]): Mx3x3 array of unit cells
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
+        cut1 (float): maximum distance between two oxygen atoms
+        cut2 (float): maximum distance between an oxygen and a hydrogen atom
+        angle (float): minimum O-H-O angle in degree
+        names (list[str], optional): names of oxygen atoms used as search centers
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: number of hydrogen bonds in each snapshot (same as :func:`.hbonds_block`)
+            - ndarray[int]: offsets with M + 1 entries; bonds of snapshot m are offsets[m]:offsets[m + 1]
+            - ndarray[int32]: rows of donor, hydrogen and acceptor atom of each bond
+            - ndarray[float32]: oxygen - oxygen distance of each bond
+            - ndarray[float32]: angle of each bond in degree
+
+    Each bond is listed once (see :func:`.hbonds_c.hbonds_list_batch`). It is counted once for each of its oxygen
+    atoms which is a search center, so both counts agree without a second call of the C++ code.
+    """
+    idx1 = topology.select(id=id1)
+    if names:
+        center = topology.select(names=names)
+    else:
+        center = idx1
+    offsets, bonds, dist, angles = hbonds_c.hbonds_list_batch(pos, cells, idx1, topology.select(id=id2), center,
+                                                              cut1, cut2, angle)
+    is_center = np.zeros(len(topology), dtype=np.int64)
+    is_center[center] = 1
+    total = np.concatenate(([0], np.cumsum(is_center[bonds[:, 0]] + is_center[bonds[:, 2]])))
+    return total[offsets[1:]] - total[offsets[:-1]], offsets, bonds, dist, angles
+
+
+def hbonds_centers_block(topology, pos, cells, id1, id2, cut1, cut2, angle, names=False, nmax=4):
+    """
+    Count the hydrogen bonds donated and accepted by each search center in a block of snapshots (see
+    :func:`.tra_blocks`).
+
+    Args:
+        topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+        pos (ndarray[float]): MxNx3 array of atomic positions
+        cells (ndarray[float]): Mx3x3 array of unit cells
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
+        cut1 (float): maximum distance between two oxygen atoms
+        cut2 (float): maximum distance between an oxygen and a hydrogen atom
+        angle (float): minimum O-H-O angle in degree
+        names (list[str], optional): names of oxygen atoms used as search centers
+        nmax (int, optional): default 4 - last bin of the histograms counts nmax or more hydrogen bonds
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: number of hydrogen bonds in each snapshot (same as :func:`.hbonds_block`)
+            - ndarray[int]: donated hydrogen bonds of each search center summed over the block
+            - ndarray[int]: accepted hydrogen bonds of each search center summed over the block
+            - ndarray[int]: 3x(nmax + 1) histograms of total, donated and accepted hydrogen bonds per search center
+              summed over the block
+
+    The sums of successive blocks can be added, memory only depends on the number of search centers (C++ code).
+    """
+    idx1 = topology.select(id=id1)
+    if names:
+        center = topology.select(names=names)
+    else:
+        center = idx1
+    return hbonds_c.hbonds_centers_batch(pos, cells, idx1, topology.select(id=id2), center, cut1, cut2, angle, nmax)
+
+
+def hbonds_centers_bonds(topology, offsets, bonds, id1, names=False, nmax=4):
+    """
+    Count the hydrogen bonds donated and accepted by each search center from the list of hydrogen bonds of a block of
+    snapshots (see :func:`.hbonds_bonds_block`).
+
+    Args:
+        topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+        offsets (ndarray[int]): offsets with M + 1 entries; bonds of snapshot m are offsets[m]:offsets[m + 1]
+        bonds (ndarray[int32]): rows of donor, hydrogen and acceptor atom of each bond
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        names (list[str], optional): names of oxygen atoms used as search centers
+        nmax (int, optional): default 4 - last bin of the histograms counts nmax or more hydrogen bonds
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: donated hydrogen bonds of each search center summed over the block
+            - ndarray[int]: accepted hydrogen bonds of each search center summed over the block
+            - ndarray[int]: 3x(nmax + 1) histograms of total, donated and accepted hydrogen bonds per search center
+              summed over the block
+
+    Same results as :func:`.hbonds_centers_block` without a second call of the C++ code if the bonds are listed
+    anyway.
+    """
+    if names:
+        center = topology.select(names=names)
+    else:
+        center = topology.select(id=id1)
+    n_frames = len(offsets) - 1
+    position = np.full(len(topology), -1, dtype=np.int64)
+    position[center] = np.arange(len(center))
+    frame = np.repeat(np.arange(n_frames), np.diff(offsets))
+    counts = []
+    for column in (0, 2):  # donor and acceptor atom
+        used = position[bonds[:, column]]
+        found = used >= 0
+        counts.append(np.bincount(frame[found] * len(center) + used[found],
+                                  minlength=n_frames * len(center)).reshape(n_frames, len(center)))
+    donor, acceptor = counts
+    histogram = np.array([np.bincount(np.minimum(count, nmax).ravel(), minlength=nmax + 1)
+                          for count in (donor + acceptor, donor, acceptor)])
+    return donor.sum(axis=0), acceptor.sum(axis=0), histogram
+
+def hbonds_normalize(n_hbonds, topology, id1, names=False):
+    """
+    Number of hydrogen bonds per molecule.
+
+    Args:
+        n_hbonds (ndarray[int]): number of hydrogen bonds in each snapshot
+        topology (:class:`.Topology`): atom identifiers of the snapshots
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        names (list[str], optional): names of oxygen atoms used as search centers
+
+    Returns:
+        ndarray[float]: average number of hydrogen bonds per search center in each snapshot
+    """
+    if names:
+        return n_hbonds / len(names)
+    return n_hbonds / len(topology.select(id=id1))
+
+
+########################################################################################################################
+# COUNTING OF HYDROGEN BONDS, BLOCK BY BLOCK
+########################################################################################################################
+# INPUT
+# str id1                       identifier for oxygen atoms
+# str id2                       identifier for hydrogen atoms
+# float cut1                    maximum distance between two oxygen atoms
+# float cut2                    maximum distance between an oxygen and a hydrogen atom
+# float angle                   minimum O-H-O angle in degree
+# list str names (optional)     names of oxygen atoms used as search centers
+# str bonds (optional)          root name of the file listing every hydrogen bond
+# int correlation (optional)    maximum time lag of the time correlation functions
+# bool centers (optional)       count hydrogen bonds of each search center
+########################################################################################################################
+class HbondsCount:
+    """
+    Counting of hydrogen bonds block by block (see :func:`.tra_blocks`) used by :func:`.hbonds_find_parallel` and
+    the :func:`.pipeline_run`.
+
+    Args:
+        id1 (str): identifier for oxygen atoms (e.g. 'O\_')
+        id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
+        cut1 (float): maximum distance between two oxygen atoms
+        cut2 (float): maximum distance between an oxygen and a hydrogen atom
+        angle (float): minimum O-H-O angle in degree
+        names (list[str], optional): names of oxygen atoms used as search centers
+        bonds (str, optional): default **None** - root name of the :ref:`Output_hbonds_bin` file listing every
+            hydrogen bond; **None** only counts them
+        correlation (int, optional): default **None** - maximum time lag in snapshots of the hydrogen bond time
+            correlation functions (see :class:`.HbondsCorrelation`)
+        centers (bool, optional): default **False** - count donated and accepted hydrogen bonds of each search center
+            (see :func:`.hbonds_centers_block`)
+
+    The C++ code is called once per block: bonds are only listed if :data:`bonds` or :data:`correlation` need them and
+    the counts of the search centers are then taken from this list (see :func:`.hbonds_centers_bonds`).
+    """
+    def __init__(self, id1, id2, cut1, cut2, angle, names=False, bonds=None, correlation=None, centers=False):
+        print("HYDROGEN BOND DETECTION IN PROGRESS")
+        self.args = (id1, id2, cut1, cut2, angle)
+        self.names = names
+        self.bonds = bonds
+        self.output = None
+        self.tmax = correlation
+        self.correlation = None
+        self.centers = centers
+        self.total = None
+        self.save = []
+        self.time = []
+        self.topology = None
+
+    def update(self, part, topology, pos, cells):
+        """
+        Count the hydrogen bonds of a block of snapshots.
+
+        Args:
+            part (list[:class:`.Snap`]): snapshots of the block
+            topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+            pos (ndarray[float]): MxNx3 array of atomic positions
+            cells (ndarray[float]): Mx3x3 array of unit cells
+        """
+        if self.bonds is not None or self.tmax:
+            number, *found = hbonds_bonds_block(topology, pos, cells, *self.args, names=self.names)
+            if self.centers:  # from the list of bonds instead of a second search
+                sums = hbonds_centers_bonds(topology, found[0], found[1], self.args[0], names=self.names)
+            if self.bonds is not None:
+                if self.output is None:
+                    self.output = HbondsBin(self.bonds, topology)
+                self.output.write(part, *found)
+            if self.tmax:
+                if self.correlation is None:
+                    self.correlation = HbondsCorrelation(len(topology), self.tmax)
+                self.correlation.update(found[0], found[1])
+        elif self.centers:
+            number, *sums = hbonds_centers_block(topology, pos, cells, *self.args, names=self.names)
+        else:
+            number = hbonds_block(topology, pos, cells, *self.args, names=self.names)
+        if self.centers:
+            self.total = sums if self.total is None else [x + y for x, y in zip(self.total, sums)]
+        self.save += number.tolist()
+        self.time += [snap.time for snap in part]
+        if self.topology is None:
+            self.topology = topology
+
+    def finish(self, root, snapshots):
+        """
+        Save the number of hydrogen bonds per molecule and the further results requested.
+
+        Args:
+            root (str): root name of the files
+            snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots used for the counting
+        """
+        if self.output is not None:
+            self.output.close()
+        save = hbonds_normalize(np.array(self.save), self.topology, self.args[0], names=self.names)
+        hbonds_save_c(root, np.array(self.time), save, snapshots, *self.args, names=self.names)
+        if self.correlation is not None:
+            hbonds_save_corr(root, np.array(self.time), *self.correlation.finish(), snapshots, *self.args,
+                             names=self.names)
+        if self.total is not None:
+            hbonds_save_centers(root, len(self.time), *self.total, snapshots, *self.args, names=self.names)
+        print("HYDROGEN BOND DETECTION FINISHED")
+
+
+def hbonds_find_parallel(root, snapshots, id1, id2, cut1, cut2, angle, names=False, chunk=1000, bonds=False,
+                         correlation=None, centers=False):
     """
     Calculate the average number of hydrogen bonds per oxygen atom for all snapshots.
 
     Args:
         root (str): root name of files
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the atomic information
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
         id1 (str): identifier for oxygen atoms (e.g. 'O\_')
         id2 (str): identifier for hydrogen atoms (e.g. 'H\_')
         cut1 (float): maximum distance between two oxygen atoms
         cut2 (float): maximum distance between an oxygen and a hydrogen atom
         angle (float): minimum O-H-O angle in degree
         names (list[str], optional): names of oxygen atoms used as search centers
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_chunk`)
+        bonds (bool, optional): default **False** - also save every hydrogen bond to :ref:`Output_hbonds_bin`
+        correlation (int, optional): default **None** - maximum time lag in snapshots of the hydrogen bond time
+            correlation functions saved to :ref:`Output_hbonds_corr` (see :class:`.HbondsCorrelation`)
+        centers (bool, optional): default **False** - also save donated and accepted hydrogen bonds of each search
+            center to :ref:`Output_hbonds_centers`
 
     Todo:
         Implement atom selection by name.
     """
-    print("HYDROGEN BOND DETECTION IN PROGRESS")
-    multi = partial(hbonds_single_c, id1=id1, id2=id2, cut1=cut1, cut2=cut2, angle=angle, names=names)
-    save = progress.parallel_progbar(multi, snapshots)
-    if names:
-        save = np.array(save) / len(names)
-    else:
-        save = np.array(save) / len(snapshots[0].atoms[snapshots[0].atoms['id'] == id1])
-    time = np.array([snap.time for snap in snapshots])
-    hbonds_save_c(root, time, save, snapshots, id1, id2, cut1, cut2, angle, names=names)
-    print("HYDROGEN BOND DETECTION FINISHED")
+    count = HbondsCount(id1, id2, cut1, cut2, angle, names=names, bonds=root if bonds else None,
+                        correlation=correlation, centers=centers)
+    for part, topology, pos, cells in tra.tra_blocks(snapshots, chunk):
+        count.update(part, topology, pos, cells)
+    count.finish(root, snapshots)
     return
 
 
+########################################################################################################################
+# HYDROGEN BOND TIME CORRELATION FUNCTIONS, ACCUMULATED SNAPSHOT BY SNAPSHOT
+########################################################################################################################
+# INPUT
+# int n_atoms                   number of atoms per snapshot
+# int tmax                      maximum time lag in snapshots
+# int rows (optional)           number of hydrogen bonds transformed at once
+########################################################################################################################
+class HbondsCorrelation:
+    """
+    Intermittent and continuous hydrogen bond time correlation functions C(t) and S(t).
+
+    Args:
+        n_atoms (int): number of atoms per snapshot
+        tmax (int): maximum time lag in snapshots
+        rows (int, optional): default 256 - number of hydrogen bonds transformed at once
+
+    Follows Luzar, Chandler: Nature 379, 55 (1996) and Rapaport: Mol. Phys. 50, 1151 (1983). A hydrogen bond is the
+    ordered pair of donor and acceptor oxygen atom (h(t) = 1 while any of the hydrogen atoms of the donor forms it)
+    encoded as 64 bit key. With <h> the fraction of snapshots with bond
+
+    - C(t) = <h(0) h(t)> / <h>: bond present at both times
+    - S(t) = <h(0) H(t)> / <h>: bond present during the whole time t
+
+    averaged over all time origins and normalized to C(0) = S(0) = 1.
+
+    C(t) is accumulated block by block: the sorted keys of the last 2 * (tmax + 1) snapshots are kept and the
+    correlation of the older half with both halves is calculated by FFT (O(T log tmax) per bond). S(t) follows from
+    the histogram of the lengths of uninterrupted periods of each bond. Memory does not depend on the number of
+    snapshots.
+    """
+    def __init__(self, n_atoms, tmax, rows=256):
+        self.n_atoms = n_atoms
+        self.length = tmax + 1  # time lags 0 ... tmax; also number of snapshots per block
+        self.rows = rows
+        self.previous = []  # keys of the snapshots of the previous block
+        self.current = []  # keys of the snapshots of the current block
+        self.intermittent = np.zeros(self.length)
+        self.runs = np.zeros(self.length, dtype=np.int64)  # histogram of periods shorter than self.length
+        self.long = np.zeros(2, dtype=np.int64)  # number and summed length of longer periods
+        self.active = np.zeros(0, dtype=np.int64)  # sorted keys of the bonds of the last snapshot
+        self.start = np.zeros(0, dtype=np.int64)  # first snapshot of their current period
+        self.frames = 0
+
+    def update(self, offsets, bonds):
+        """
+        Add the hydrogen bonds of a block of snapshots.
+
+        Args:
+            offsets (ndarray[int]): offsets of the bonds of each snapshot (see :func:`.hbonds_bonds_block`)
+            bonds (ndarray[int32]): rows of donor, hydrogen and acceptor atom of each bond
+        """
+        keys = bonds[:, 0].astype(np.int64) * self.n_atoms + bonds[:, 2]
+        for i in range(len(offsets) - 1):
+            frame = np.unique(keys[offsets[i]:offsets[i + 1]])
+            self._periods(frame)
+            self.current.append(frame)
+            self.frames += 1
+            if len(self.current) == self.length:
+                if self.previous:
+                    self._correlate(self.previous, self.previous + self.current)
+                self.previous = self.current
+                self.current = []
+
+    def finish(self):
+        """
+        Correlate the remaining snapshots and normalize both functions.
+
+        Returns:
+            (tuple): tuple containing:
+
+                - ndarray[int]: time lags in snapshots
+                - ndarray[float]: intermittent correlation function C(t)
+                - ndarray[float]: continuous correlation function S(t)
+        """
+        self._close(self.frames - self.start)
+        self.active = self.start = np.zeros(0, dtype=np.int64)
+        if self.previous:
+            self._correlate(self.previous, self.previous + self.current)
+        if self.current:
+            self._correlate(self.current, self.current)
+        self.previous = self.current = []
+        lags = np.arange(min(self.length, self.frames))
+        # sum over periods of length L of max(L - t, 0)
+        length = np.arange(self.length)
+        number = np.cumsum(self.runs[::-1])[::-1] + self.long[0]
+        total = np.cumsum((length * self.runs)[::-1])[::-1] + self.long[1]
+        continuous = (total - length * number)[lags].astype(float)
+        intermittent = self.intermittent[lags]
+        if len(lags) == 0 or intermittent[0] == 0:
+            return lags, np.zeros(len(lags)), np.zeros(len(lags))
+        # average over the time origins available for each lag
+        norm = self.frames / (intermittent[0] * (self.frames - lags))
+        return lags, intermittent * norm, continuous * norm
+
+    def _periods(self, frame):
+        """
+        Update the periods of uninterrupted bonds with the sorted keys of the next snapshot.
+        """
+        ended = ~hbonds_contains(frame, self.active)
+        self._close(self.frames - self.start[ended])
+        kept = hbonds_contains(self.active, frame)
+        start = np.full(len(frame), self.frames, dtype=np.int64)
+        start[kept] = self.start[np.searchsorted(self.active, frame[kept])]
+        self.active = frame
+        self.start = start
+
+    def _close(self, lengths):
+        """
+        Add finished periods to the histogram.
+        """
+        short = lengths < self.length
+        self.runs += np.bincount(lengths[short], minlength=self.length)
+        self.long += [np.count_nonzero(~short), np.sum(lengths[~short])]
+
+    def _correlate(self, origins, window):
+        """
+        Add sum_s |K(s) & K(s + t)| over the time origins s of the first len(origins) snapshots of window.
+        """
+        sizes = [len(frame) for frame in window]
+        if sum(sizes) == 0:
+            return
+        keys, inverse = np.unique(np.concatenate(window), return_inverse=True)
+        frame = np.repeat(np.arange(len(window)), sizes)
+        order = np.argsort(inverse, kind='stable')
+        inverse = inverse[order]
+        frame = frame[order]
+        # zero padding avoids wrap around for all lags < self.length
+        n_fft = 1 << int(np.ceil(np.log2(len(window) + self.length)))
+        spectrum = np.zeros(n_fft // 2 + 1, dtype=complex)
+        bounds = np.searchsorted(inverse, np.arange(0, len(keys) + self.rows, self.rows))
+        for i in range(len(bounds) - 1):
+            series = np.zeros((self.rows, len(window)))
+            series[inverse[bounds[i]:bounds[i + 1]] - i * self.rows, frame[bounds[i]:bounds[i + 1]]] = 1.0
+            spectrum += np.sum(np.conj(np.fft.rfft(series[:, :len(origins)], n_fft)) *
+                               np.fft.rfft(series, n_fft), axis=0)
+        self.intermittent += np.rint(np.fft.irfft(spectrum, n_fft)[:self.length])
+
+
+def hbonds_contains(keys, values):
+    """
+    Check which values are contained in an array of sorted keys.
+
+    Args:
+        keys (ndarray[int]): sorted keys
+        values (ndarray[int]): values to be checked
+
+    Returns:
+        ndarray[bool]: **True** for each value found in :data:`keys`
+    """
+    if len(keys) == 0:
+        return np.zeros(len(values), dtype=bool)
+    index = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+    return keys[index] == values
+
+
+########################################################################################################################
+# BINARY FILE LISTING EVERY HYDROGEN BOND, WRITTEN BLOCK BY BLOCK
+########################################################################################################################
+# INPUT
+# str root                      root name of the file
+# class Topology topology       atom identifiers of the snapshots
+# str ext (optional)            extension of the file
+########################################################################################################################
+class HbondsBin:
+    """
+    Binary file :ref:`Output_hbonds_bin` listing every hydrogen bond (see :func:`.hbonds_bonds_block`).
+
+    Args:
+        root (str): root name of the file
+        topology (:class:`.Topology`): atom identifiers of the snapshots
+        ext (str, optional): default ".hbonds_bin" - extension of the file: name = root + ext
+
+    The file consists of a header (:data:`HBONDS_HEADER`), the topology, one record per hydrogen bond
+    (:data:`HBONDS_BOND`) and a table of the snapshots (:data:`HBONDS_FRAME`). Bonds are written block by block with
+    :meth:`.write`, only the table of the snapshots is kept in memory. :meth:`.close` completes the header and replaces
+    an existing file.
+    """
+    def __init__(self, root, topology, ext='.hbonds_bin'):
+        self.path = root + ext
+        self.header = np.zeros(1, dtype=HBONDS_HEADER)
+        self.header['magic'] = HBONDS_MAGIC
+        self.header['version'] = HBONDS_VERSION
+        self.header['n_atoms'] = len(topology)
+        names = np.array(topology.name, dtype=bytes)
+        ids = np.array(topology.id, dtype=bytes)
+        self.header['name'] = names.dtype.itemsize
+        self.header['id'] = ids.dtype.itemsize
+        atoms = np.zeros(len(topology), dtype=tra.tra_bin_atoms(self.header[0]))
+        atoms['name'] = names
+        atoms['id'] = ids
+        atoms['index'] = topology.index
+        try:
+            self.file = open(self.path + '.tmp', 'wb')
+        except IOError:
+            utility.err_file('HbondsBin', self.path)
+        self.header.tofile(self.file)
+        atoms.tofile(self.file)
+        self.frames = []
+        self.n_bonds = 0
+
+    def write(self, part, offsets, bonds, dist, angles):
+        """
+        Append the hydrogen bonds of a block of snapshots.
+
+        Args:
+            part (list[:class:`.Snap`]): snapshots of the block
+            offsets (ndarray[int]): offsets of the bonds of each snapshot (see :func:`.hbonds_bonds_block`)
+            bonds (ndarray[int32]): rows of donor, hydrogen and acceptor atom of each bond
+            dist (ndarray[float32]): oxygen - oxygen distance of each bond
+            angles (ndarray[float32]): angle of each bond in degree
+        """
+        frames = np.zeros(len(part), dtype=HBONDS_FRAME)
+        frames['iter'] = [snap.iter for snap in part]
+        frames['time'] = [snap.time for snap in part]
+        frames['offset'] = self.n_bonds + offsets[:-1]
+        frames['count'] = np.diff(offsets)
+        records = np.zeros(len(bonds), dtype=HBONDS_BOND)
+        records['bond'] = bonds
+        records['dist'] = dist
+        records['angle'] = angles
+        records.tofile(self.file)
+        self.frames.append(frames)
+        self.n_bonds += len(bonds)
+
+    def close(self):
+        """
+        Write the table of the snapshots, complete the header and move the file to its final name.
+        """
+        frames = np.concatenate(self.frames) if self.frames else np.zeros(0, dtype=HBONDS_FRAME)
+        self.header['count'] = len(frames)
+        self.header['n_bonds'] = self.n_bonds
+        self.header['frames'] = self.file.tell()
+        frames.tofile(self.file)
+        self.file.seek(0)
+        self.header.tofile(self.file)
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)
+        print('SAVING OF %s SUCCESSFUL' % self.path)
+
+
+########################################################################################################################
+# LOAD root.hbonds_bin FILE PRODUCED BY HbondsBin
+########################################################################################################################
+# INPUT
+# str root                      root name of the file
+# str ext (optional)            extension of the file
+#####
+# OUTPUT
+# class Topology topology       atom identifiers of the snapshots
+# ndarray frames                table of the snapshots with structure HBONDS_FRAME
+# memmap bonds                  read-only records of all hydrogen bonds with structure HBONDS_BOND
+########################################################################################################################
+def hbonds_load_bin(root, ext='.hbonds_bin'):
+    """
+    Load the hydrogen bonds from the :ref:`Output_hbonds_bin` file written by :class:`.HbondsBin`.
+
+    Args:
+        root (str): root name of the file
+        ext (str, optional): default ".hbonds_bin" - extension of the file: name = root + ext
+
+    Returns:
+        (tuple): tuple containing:
+
+            - :class:`.Topology`: atom identifiers of the snapshots; the bonds refer to its rows
+            - ndarray: table of the snapshots with structure :data:`HBONDS_FRAME`
+            - :py:class:`numpy.memmap`: read-only records of all hydrogen bonds with structure :data:`HBONDS_BOND`
+
+    The bonds of snapshot i are bonds[frames['offset'][i]:frames['offset'][i] + frames['count'][i]]. They are
+    memory-mapped and only read when accessed.
+    """
+    path = root + ext
+    try:
+        header = np.fromfile(path, dtype=HBONDS_HEADER, count=1)
+    except IOError:
+        utility.err_file('hbonds_load_bin', path)
+    if len(header) == 0 or header['magic'][0] != HBONDS_MAGIC or header['version'][0] != HBONDS_VERSION:
+        utility.err('hbonds_load_bin', 0, [path])
+    header = header[0]
+    n_atoms = int(header['n_atoms'])
+    n_bonds = int(header['n_bonds'])
+    form = tra.tra_bin_atoms(header)
+    atoms = np.fromfile(path, dtype=form, count=n_atoms, offset=HBONDS_HEADER.itemsize)
+    offset = HBONDS_HEADER.itemsize + n_atoms * form.itemsize
+    if int(header['frames']) != offset + n_bonds * HBONDS_BOND.itemsize or \
+            os.path.getsize(path) < int(header['frames']) + int(header['count']) * HBONDS_FRAME.itemsize:
+        utility.err('hbonds_load_bin', 1, [path])
+    topology = tra.Topology(pd.DataFrame(data={'name': np.char.decode(atoms['name']),
+                                               'id': np.char.decode(atoms['id']),
+                                               'index': atoms['index']}))
+    frames = np.fromfile(path, dtype=HBONDS_FRAME, count=int(header['count']), offset=int(header['frames']))
+    if n_bonds == 0:  # empty files can not be mapped
+        bonds = np.zeros(0, dtype=HBONDS_BOND)
+    else:
+        bonds = np.memmap(path, dtype=HBONDS_BOND, mode='r', offset=offset, shape=(n_bonds,))
+    return topology, frames, bonds
+
+
 ##### THE FOLLOWING FUNCTIONS ARE EITHER PART OF AN OLD AND MORE COMPLICATE CRITERION OR A DIFFERENT APPROACH OF
 ##### SAVING THE NAMES OF ATOMS PARTICIPATING IN A HYDROGEN BOND
 ##### THIS APPROACH WAS REPLACED BY JUST COUNTING THEM IN A C++ ROUTINE INSTEAD OF KEEPING THE NAME INFORMATION
@@ -1,87 +1,199 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
+#include <algorithm>
+#include <cstdint>
 #include <iostream>
 #include <vector>
 
+#include "batch_c.h"
 #include "pbc_c.h"
 #include "calc_c.h"
+#include "cell_c.h"
+#include "thread_c.h"
 
 using namespace std;
 namespace py = pybind11;
 
 
-// void pbc_apply3x3(const double * pos, int len, double * pbc, double a);
+// hydrogen bond of the list returned by hbonds_list_batch (rows of the atoms in the snapshot)
+struct HbondsBond {
+    int32_t donor, hydrogen, acceptor;
+    float dist, angle;
+};
+
+template <typename F>
+void hbonds_hydrogen(const CellList & list1, const CellList & list3, const double * hydrogen, double cut1,
+        double cut2, double angle, vector<int> & centers, vector<int> & oxygens, F found);
 int hbonds_number(const double* array1, int len1, const double* array2, int len2, const double* array3, int len3,
         double cut1, double cut2, double angle, const double * cell);
+void hbonds_bonds(const double * array1, int len1, const double * array2, int len2, const double * array3, int len3,
+        double cut1, double cut2, double angle, const double * cell, const int64_t * rows1, const int64_t * rows2,
+        const int64_t * rows3, const vector<char> & is_center, vector<HbondsBond> & bonds);
 int hbonds(py::array_t<const double>& array1, py::array_t<const double>& array2, py::array_t<const double>& array3,
         double cut1, double cut2, double angle, py::array_t<const double>& cell);
-
+py::array_t<int64_t> hbonds_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2,
+        batch_index idx3, double cut1, double cut2, double angle);
+py::tuple hbonds_list_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2, batch_index idx3,
+        double cut1, double cut2, double angle);
+void hbonds_centers(const double * array1, int len1, const double * array2, int len2, const double * array3, int len3,
+        double cut1, double cut2, double angle, const double * cell, int64_t * donor, int64_t * acceptor);
+py::tuple hbonds_centers_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2,
+        batch_index idx3, double cut1, double cut2, double angle, int nmax);
+
+
+// follows Luzar, Chandler: J. Chem. Phys. 98, 8160 (1993), A. Luzar and D. Chandler, Nature London 379, 55 (1996)
+//         Dawson, Gygi: J. Chem. Phys. 148, 124501 (2018)
+// Review: Kumar et al.: J. Chem. Phys. 126, 204107 (2007)
+// both oxygen atoms of a hydrogen bond are closer than cut2 to its hydrogen atom
+// -> candidates (center, hydrogen, oxygen) are found around each hydrogen atom without an oxygen - oxygen search
+// call found(i, j, center_donor, dist11, angle121) for every hydrogen bond of center i (list3) and oxygen j (list1)
+// formed by the given hydrogen atom; center_donor is true if the hydrogen atom is closer to the center atom
+// both cell lists are built with a search radius slightly larger than cut2 (see hbonds_number)
+template <typename F>
+void hbonds_hydrogen(const CellList & list1, const CellList & list3, const double * hydrogen, double cut1,
+        double cut2, double angle, vector<int> & centers, vector<int> & oxygens, F found){
+    double neighbor1[3], neighbor2[3];
+    double v[3], v21[3], dist11, dist12, dist21, angle121;
+    int shift[3], shift1[3], shift2[3];
+    double cut12 = calc_cut2(cut1);
+    double cut22 = calc_cut2(cut2);
+    double reach = cut2 * (1.0 + 1e-9);
+    // center and oxygen atoms close to the hydrogen atom with their lattice translation (index, shift)
+    centers.clear();
+    cell_list_search(list3, hydrogen, reach, -1.0, [&](int i, const double * neighbor, double dist){
+        pbc_minimum_image(neighbor, list3.pos + 3 * i, list3.inv, shift);
+        centers.insert(centers.end(), {i, shift[0], shift[1], shift[2]});
+    });
+    if(centers.empty()){
+        return;
+    }
+    oxygens.clear();
+    cell_list_search(list1, hydrogen, reach, -1.0, [&](int j, const double * neighbor, double dist){
+        pbc_minimum_image(neighbor, list1.pos + 3 * j, list1.inv, shift);
+        oxygens.insert(oxygens.end(), {j, shift[0], shift[1], shift[2]});
+    });
+
+    for(size_t c = 0; c < centers.size(); c += 4){
+        const double * center = list3.pos + 3 * centers[c];
+        // hydrogen atom translated next to the untranslated center atom
+        shift2[0] = -centers[c + 1];
+        shift2[1] = -centers[c + 2];
+        shift2[2] = -centers[c + 3];
+        pbc_image(hydrogen, shift2, list3.cell, neighbor2);
+        calc_dist_vec(center, neighbor2, v);
+        dist12 = calc_norm2(v);
+        if(dist12 >= cut22){
+            continue;
+        }
+        dist12 = sqrt(dist12);
+        if(dist12 >= cut2){
+            continue;
+        }
+        for(size_t o = 0; o < oxygens.size(); o += 4){
+            // oxygen atom translated by the same lattice vectors
+            shift1[0] = oxygens[o + 1] + shift2[0];
+            shift1[1] = oxygens[o + 2] + shift2[1];
+            shift1[2] = oxygens[o + 3] + shift2[2];
+            pbc_image(list1.pos + 3 * oxygens[o], shift1, list1.cell, neighbor1);
+            calc_dist_vec(center, neighbor1, v);
+            dist11 = calc_norm2(v);
+            if(dist11 >= cut12){
+                continue;
+            }
+            dist11 = sqrt(dist11);
+            if(dist11 >= cut1 || dist11 <= 0.01){
+                continue;
+            }
+            calc_dist_vec(neighbor2, neighbor1, v21);
+            dist21 = calc_norm2(v21);
+            if(dist21 >= cut22){
+                continue;
+            }
+            dist21 = sqrt(dist21);
+            if(dist21 < cut2){
+                if(dist12 < dist21){
+                    angle121 = calc_angle(neighbor2, center, neighbor1);
+                } else {
+                    angle121 = calc_angle(neighbor2, neighbor1, center);
+                }
+                if(angle121 < angle){
+                    found(centers[c], oxygens[o], dist12 < dist21, dist11, angle121);
+                }
+            }
+        }
+    }
+}
 
 
 int hbonds_number(const double* array1, int len1, const double* array2, int len2, const double* array3, int len3,
         double cut1, double cut2, double angle, const double * cell){
-    // follows Luzar, Chandler: J. Chem. Phys. 98, 8160 (1993), A. Luzar and D. Chandler, Nature London 379, 55 (1996)
-    //         Dawson, Gygi: J. Chem. Phys. 148, 124501 (2018)
-    // Review: Kumar et al.: J. Chem. Phys. 126, 204107 (2007)
     int counter = 0;
-    double center[3], neighbor1[3], neighbor2[3];
+    // slightly larger search radius, candidates are checked again with the distances seen from the center atom
+    double reach = cut2 * (1.0 + 1e-9);
 
-    double * pbc1 = pbc_apply3x3(array1, len1, cell);
-    double * pbc2 = pbc_apply3x3(array2, len2, cell);
-    double dist11, dist12, dist21, angle121;
-    int center_count = 0;
+    // sort center and oxygen atoms into cell lists
+    CellList list1, list3;
+    cell_list_build(list1, array1, len1, cell, reach);
+    cell_list_build(list3, array3, len3, cell, reach);
 
-    for(int i = 0; i < len3; i++){
-        center[0] = array3[3 * i];
-        center[1] = array3[3 * i + 1];
-        center[2] = array3[3 * i + 2];
-
-        for(int j = 0; j < 27 * len1; j++){
-            neighbor1[0] = pbc1[3 * j];
-            neighbor1[1] = pbc1[3 * j + 1];
-            neighbor1[2] = pbc1[3 * j + 2];
-
-            double * v11 = calc_dist_vec(center, neighbor1);
-            dist11 = calc_norm(v11);
-            delete [] v11;
-
-            if(dist11 < cut1 && dist11 > 0.01) {
-                for(int k = 0; k < 27 * len2; k++){
-                    neighbor2[0] = pbc2[3 * k];
-                    neighbor2[1] = pbc2[3 * k + 1];
-                    neighbor2[2] = pbc2[3 * k + 2];
-
-                    double * v12 = calc_dist_vec(center, neighbor2);
-                    dist12 = calc_norm(v12);
-                    delete [] v12;
-                    if(dist12 < cut2){
-                        double * v21 = calc_dist_vec(neighbor2, neighbor1);
-                        dist21 = calc_norm(v21);
-                        delete [] v21;
-                        if(dist21 < cut2){
-                            if(dist12 < dist21){
-                                angle121 = calc_angle(neighbor2, center, neighbor1);
-                            } else {
-                                angle121 = calc_angle(neighbor2, neighbor1, center);
-                            }
-                            //angle121 = calc_angle(center, neighbor2, neighbor1);
-                            //cout << angle121 << "\n";
-                            //cout << center[0] << " " << center[1] << " " << center[2] << " "  << neighbor2[0] << " " << neighbor2[1] << " " << neighbor2[2] << " "  << neighbor1[0] << " " << neighbor1[1] << " " << neighbor1[2] << "\n";
-                            if(angle121 < angle){
-                                counter++;
-                            }
-                        }
-                    }
-                }
-            }
+    // distribute hydrogen atoms over threads, each thread counts on its own
+    #pragma omp parallel if(!thread_active()) reduction(+:counter)
+    {
+        vector<int> centers, oxygens;
+        #pragma omp for schedule(dynamic, 64)
+        for(int k = 0; k < len2; k++){
+            hbonds_hydrogen(list1, list3, array2 + 3 * k, cut1, cut2, angle, centers, oxygens,
+                            [&](int i, int j, bool center_donor, double dist, double angle121){
+                counter++;
+            });
         }
-        center_count++;
     }
-    delete [] pbc1;
-    delete [] pbc2;
     return counter;
 }
 
+
+// list of the hydrogen bonds (donor, hydrogen, acceptor) of a single snapshot, sorted by rows
+// a hydrogen bond between two center atoms is listed once although both of them count it in hbonds_number
+void hbonds_bonds(const double * array1, int len1, const double * array2, int len2, const double * array3, int len3,
+        double cut1, double cut2, double angle, const double * cell, const int64_t * rows1, const int64_t * rows2,
+        const int64_t * rows3, const vector<char> & is_center, vector<HbondsBond> & bonds){
+    double reach = cut2 * (1.0 + 1e-9);
+    CellList list1, list3;
+    cell_list_build(list1, array1, len1, cell, reach);
+    cell_list_build(list3, array3, len3, cell, reach);
+    bonds.clear();
+
+    #pragma omp parallel if(!thread_active())
+    {
+        vector<int> centers, oxygens;
+        vector<HbondsBond> local;
+        #pragma omp for schedule(dynamic, 64)
+        for(int k = 0; k < len2; k++){
+            hbonds_hydrogen(list1, list3, array2 + 3 * k, cut1, cut2, angle, centers, oxygens,
+                            [&](int i, int j, bool center_donor, double dist, double angle121){
+                if(center_donor){
+                    local.push_back({(int32_t)rows3[i], (int32_t)rows2[k], (int32_t)rows1[j], (float)dist,
+                                     (float)angle121});
+                } else if(!is_center[rows1[j]]){
+                    // found from the acceptor only, the donor is not searched as center
+                    local.push_back({(int32_t)rows1[j], (int32_t)rows2[k], (int32_t)rows3[i], (float)dist,
+                                     (float)angle121});
+                }
+            });
+        }
+        #pragma omp critical(hbonds_bonds)
+        bonds.insert(bonds.end(), local.begin(), local.end());
+    }
+    // order independent of the number of threads
+    sort(bonds.begin(), bonds.end(), [](const HbondsBond & a, const HbondsBond & b){
+        if(a.donor != b.donor) return a.donor < b.donor;
+        if(a.hydrogen != b.hydrogen) return a.hydrogen < b.hydrogen;
+        if(a.acceptor != b.acceptor) return a.acceptor < b.acceptor;
+        if(a.dist != b.dist) return a.dist < b.dist;
+        return a.angle < b.angle;
+    });
+}
+
 int hbonds(py::array_t<const double>& array1, py::array_t<const double>& array2, py::array_t<const double>& array3,
         double cut1, double cut2, double angle, py::array_t<const double>& cell){
     py::buffer_info buf1 = array1.request();
@@ -100,10 +212,206 @@ int hbonds(py::array_t<const double>& array1, py::array_t<const double>& array2,
     //for(int i = 0; i < buf1.size / 3; i++){
     //    cout << ptr1[3 * i] << " " << ptr1[3 * i + 1] << " " << ptr1[3 * i + 2] << "\n";
     //}
-    number = hbonds_number(ptr1, buf1.size / 3, ptr2, buf2.size / 3, ptr3, buf3.size / 3, cut1, cut2, angle, ptr4);
+    {
+        py::gil_scoped_release release;
+        number = hbonds_number(ptr1, buf1.size / 3, ptr2, buf2.size / 3, ptr3, buf3.size / 3, cut1, cut2, angle, ptr4);
+    }
     return number;
 }
 
+py::array_t<int64_t> hbonds_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2,
+        batch_index idx3, double cut1, double cut2, double angle){
+    int n_atoms;
+    int n_frames = batch_frames(pos, cells, n_atoms);
+    batch_check_index(idx1, n_atoms);
+    batch_check_index(idx2, n_atoms);
+    batch_check_index(idx3, n_atoms);
+    int len1 = idx1.size(), len2 = idx2.size(), len3 = idx3.size();
+    const double * ptr_pos = pos.data();
+    const double * ptr_cells = cells.data();
+    const int64_t * ptr1 = idx1.data();
+    const int64_t * ptr2 = idx2.data();
+    const int64_t * ptr3 = idx3.data();
+    vector<int64_t> number(n_frames, 0);
+    {
+        // loop through snapshots without the Python interpreter
+        py::gil_scoped_release release;
+        ThreadError error;
+        // distribute snapshots over threads, a single snapshot is distributed over its center atoms instead
+        #pragma omp parallel if(n_frames > 1)
+        {
+            vector<double> array1, array2, array3;
+            #pragma omp for schedule(dynamic)
+            for(int f = 0; f < n_frames; f++){
+                error.run([&](){
+                    const double * frame = ptr_pos + 3 * (size_t)n_atoms * f;
+                    batch_gather(frame, ptr1, len1, array1);
+                    batch_gather(frame, ptr2, len2, array2);
+                    batch_gather(frame, ptr3, len3, array3);
+                    number[f] = hbonds_number(array1.data(), len1, array2.data(), len2, array3.data(), len3, cut1,
+                                              cut2, angle, ptr_cells + 9 * f);
+                });
+            }
+        }
+        error.rethrow();
+    }
+    return py::array_t<int64_t>(n_frames, number.data());
+}
+
+py::tuple hbonds_list_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2, batch_index idx3,
+        double cut1, double cut2, double angle){
+    int n_atoms;
+    int n_frames = batch_frames(pos, cells, n_atoms);
+    batch_check_index(idx1, n_atoms);
+    batch_check_index(idx2, n_atoms);
+    batch_check_index(idx3, n_atoms);
+    int len1 = idx1.size(), len2 = idx2.size(), len3 = idx3.size();
+    const double * ptr_pos = pos.data();
+    const double * ptr_cells = cells.data();
+    const int64_t * ptr1 = idx1.data();
+    const int64_t * ptr2 = idx2.data();
+    const int64_t * ptr3 = idx3.data();
+    // rows of the center atoms decide which of two oxygen atoms reports a hydrogen bond
+    vector<char> is_center(n_atoms, 0);
+    for(int i = 0; i < len3; i++){
+        is_center[ptr3[i]] = 1;
+    }
+    vector<vector<HbondsBond>> frames(n_frames);
+    {
+        py::gil_scoped_release release;
+        ThreadError error;
+        #pragma omp parallel if(n_frames > 1)
+        {
+            vector<double> array1, array2, array3;
+            #pragma omp for schedule(dynamic)
+            for(int f = 0; f < n_frames; f++){
+                error.run([&](){
+                    const double * frame = ptr_pos + 3 * (size_t)n_atoms * f;
+                    batch_gather(frame, ptr1, len1, array1);
+                    batch_gather(frame, ptr2, len2, array2);
+                    batch_gather(frame, ptr3, len3, array3);
+                    hbonds_bonds(array1.data(), len1, array2.data(), len2, array3.data(), len3, cut1, cut2, angle,
+                                 ptr_cells + 9 * f, ptr1, ptr2, ptr3, is_center, frames[f]);
+                });
+            }
+        }
+        error.rethrow();
+    }
+    // compact arrays with an offset table: bonds of frame f are offsets[f]:offsets[f + 1]
+    py::array_t<int64_t> offsets(n_frames + 1);
+    int64_t * ptr_off = offsets.mutable_data();
+    ptr_off[0] = 0;
+    for(int f = 0; f < n_frames; f++){
+        ptr_off[f + 1] = ptr_off[f] + frames[f].size();
+    }
+    py::ssize_t n_bonds = ptr_off[n_frames];
+    py::array_t<int32_t> atoms({n_bonds, (py::ssize_t)3});
+    py::array_t<float> dist(n_bonds), angles(n_bonds);
+    int32_t * ptr_atoms = atoms.mutable_data();
+    float * ptr_dist = dist.mutable_data();
+    float * ptr_angle = angles.mutable_data();
+    for(int f = 0; f < n_frames; f++){
+        for(size_t b = 0; b < frames[f].size(); b++){
+            const HbondsBond & bond = frames[f][b];
+            int64_t n = ptr_off[f] + b;
+            ptr_atoms[3 * n] = bond.donor;
+            ptr_atoms[3 * n + 1] = bond.hydrogen;
+            ptr_atoms[3 * n + 2] = bond.acceptor;
+            ptr_dist[n] = bond.dist;
+            ptr_angle[n] = bond.angle;
+        }
+    }
+    return py::make_tuple(offsets, atoms, dist, angles);
+}
+
+// number of hydrogen bonds donated and accepted by each center atom of a single snapshot (added to donor, acceptor)
+void hbonds_centers(const double * array1, int len1, const double * array2, int len2, const double * array3, int len3,
+        double cut1, double cut2, double angle, const double * cell, int64_t * donor, int64_t * acceptor){
+    double reach = cut2 * (1.0 + 1e-9);
+    CellList list1, list3;
+    cell_list_build(list1, array1, len1, cell, reach);
+    cell_list_build(list3, array3, len3, cell, reach);
+
+    #pragma omp parallel if(!thread_active())
+    {
+        vector<int> centers, oxygens;
+        vector<int64_t> local_donor(len3, 0), local_acceptor(len3, 0);
+        #pragma omp for schedule(dynamic, 64)
+        for(int k = 0; k < len2; k++){
+            hbonds_hydrogen(list1, list3, array2 + 3 * k, cut1, cut2, angle, centers, oxygens,
+                            [&](int i, int j, bool center_donor, double dist, double angle121){
+                if(center_donor){
+                    local_donor[i]++;
+                } else {
+                    local_acceptor[i]++;
+                }
+            });
+        }
+        thread_merge(local_donor, donor);
+        thread_merge(local_acceptor, acceptor);
+    }
+}
+
+py::tuple hbonds_centers_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2,
+        batch_index idx3, double cut1, double cut2, double angle, int nmax){
+    int n_atoms;
+    int n_frames = batch_frames(pos, cells, n_atoms);
+    batch_check_index(idx1, n_atoms);
+    batch_check_index(idx2, n_atoms);
+    batch_check_index(idx3, n_atoms);
+    if(nmax < 1)
+        throw runtime_error("Maximum number of hydrogen bonds must be positive.");
+    int len1 = idx1.size(), len2 = idx2.size(), len3 = idx3.size();
+    const double * ptr_pos = pos.data();
+    const double * ptr_cells = cells.data();
+    const int64_t * ptr1 = idx1.data();
+    const int64_t * ptr2 = idx2.data();
+    const int64_t * ptr3 = idx3.data();
+    vector<int64_t> number(n_frames, 0);
+    // sums over the snapshots: per center atom and histograms of total, donated and accepted bonds
+    vector<int64_t> donor(len3, 0), acceptor(len3, 0), hist(3 * (nmax + 1), 0);
+    {
+        py::gil_scoped_release release;
+        ThreadError error;
+        #pragma omp parallel if(n_frames > 1)
+        {
+            vector<double> array1, array2, array3;
+            vector<int64_t> frame_donor(len3), frame_acceptor(len3);
+            vector<int64_t> local_donor(len3, 0), local_acceptor(len3, 0), local_hist(hist.size(), 0);
+            #pragma omp for schedule(dynamic)
+            for(int f = 0; f < n_frames; f++){
+                error.run([&](){
+                    const double * frame = ptr_pos + 3 * (size_t)n_atoms * f;
+                    batch_gather(frame, ptr1, len1, array1);
+                    batch_gather(frame, ptr2, len2, array2);
+                    batch_gather(frame, ptr3, len3, array3);
+                    fill(frame_donor.begin(), frame_donor.end(), 0);
+                    fill(frame_acceptor.begin(), frame_acceptor.end(), 0);
+                    hbonds_centers(array1.data(), len1, array2.data(), len2, array3.data(), len3, cut1, cut2, angle,
+                                   ptr_cells + 9 * f, frame_donor.data(), frame_acceptor.data());
+                    for(int i = 0; i < len3; i++){
+                        int64_t total = frame_donor[i] + frame_acceptor[i];
+                        number[f] += total;
+                        local_donor[i] += frame_donor[i];
+                        local_acceptor[i] += frame_acceptor[i];
+                        local_hist[min<int64_t>(total, nmax)]++;
+                        local_hist[nmax + 1 + min<int64_t>(frame_donor[i], nmax)]++;
+                        local_hist[2 * (nmax + 1) + min<int64_t>(frame_acceptor[i], nmax)]++;
+                    }
+                });
+            }
+            thread_merge(local_donor, donor.data());
+            thread_merge(local_acceptor, acceptor.data());
+            thread_merge(local_hist, hist.data());
+        }
+        error.rethrow();
+    }
+    py::array_t<int64_t> histogram({(py::ssize_t)3, (py::ssize_t)(nmax + 1)});
+    copy(hist.begin(), hist.end(), histogram.mutable_data());
+    return py::make_tuple(py::array_t<int64_t>(n_frames, number.data()), py::array_t<int64_t>(len3, donor.data()),
+                          py::array_t<int64_t>(len3, acceptor.data()), histogram);
+}
+
 PYBIND11_MODULE(hbonds_c, m){
     m.doc() = R"pbdoc(
         paw_structure.hbonds_c
@@ -128,8 +436,11 @@ PYBIND11_MODULE(hbonds_c, m){
         Dependencies:
             :py:mod:`numpy`
             :py:mod:`pybind11`
-            :mod:`calc_c.cpp`
+            :mod:`batch_c.h`
+            :mod:`calc_c.h`
+            :mod:`cell_c.cpp`
             :mod:`pbc_c.cpp`
+            :mod:`thread_c.h`
 
         .. autosummary::
 
@@ -137,8 +448,11 @@ PYBIND11_MODULE(hbonds_c, m){
             calc_dist_vec_c
             calc_norm_c
             hbonds
+            hbonds_batch
+            hbonds_centers_batch
+            hbonds_list_batch
             hbonds_number
-            pbc_apply3x3_c
+            threads
     )pbdoc"; // optional module docstring
 
     m.def("hbonds_number", &hbonds_number, R"pbdoc(
@@ -158,6 +472,11 @@ PYBIND11_MODULE(hbonds_c, m){
 
             Returns:
                 int: number of hydrogen bonds found
+
+            Both oxygen atoms of a hydrogen bond are closer than cut2 to its hydrogen atom. Candidates are therefore
+            found by searching the cell lists of center and oxygen atoms around each hydrogen atom instead of
+            searching all oxygen - oxygen pairs, which scales linearly with the system size. Distances and angles
+            are evaluated from the untranslated center atom.
         )pbdoc", py::arg("array1"), py::arg("len1"), py::arg("array2"), py::arg("len2"), py::arg("array3"), py::arg("len3"),
         py::arg("cut1"), py::arg("cut2"), py::arg("angle"), py::arg("cell")
     );
@@ -181,22 +500,100 @@ PYBIND11_MODULE(hbonds_c, m){
         )pbdoc", py::arg("array1"), py::arg("array2"), py::arg("array3"),py::arg("cut1"), py::arg("cut2"), py::arg("angle"), py::arg("cell")
     );
 
-    m.def("pbc_apply3x3_c", &pbc_apply3x3, R"pbdoc(
-            Apply periodic boundary conditions to obtain 3x3 unit cell.
+    m.def("hbonds_batch", &hbonds_batch, R"pbdoc(
+            Count hydrogen bonds for a block of snapshots.
+
+            The snapshots are processed in parallel without holding the Python global interpreter lock.
+            Actual calculation is performed in :func:`.hbonds_c.hbonds_number`.
 
             Args:
-                pos (double *): pointer on array with atomic positions
-                len (int): number of atoms in pos
-                cell (double *): pointer on array with unit cell of the system
+                pos (ndarray[float]): atomic positions of all atoms with shape (n_frames, n_atoms, 3)
+                cells (ndarray[float]): unit cells of the snapshots with shape (n_frames, 3, 3)
+                idx1 (ndarray[int]): rows of the oxygen atoms in pos
+                idx2 (ndarray[int]): rows of the hydrogen atoms in pos
+                idx3 (ndarray[int]): rows of the center oxygen atoms in pos
+                cut1 (float): maximum oxygen - oxygen distance
+                cut2 (float): maximum oxygen - hydrogen distance
+                angle (float): minimum angle criterion
 
             Returns:
-                double *: pointer on array with atomic position of 3x3 unit cell
+                ndarray[int]: number of hydrogen bonds found in each snapshot
+        )pbdoc", py::arg("pos"), py::arg("cells"), py::arg("idx1"), py::arg("idx2"), py::arg("idx3"), py::arg("cut1"),
+        py::arg("cut2"), py::arg("angle")
+    );
 
-            Note:
-                C++ only.
+    m.def("hbonds_centers_batch", &hbonds_centers_batch, R"pbdoc(
+            Count the hydrogen bonds donated and accepted by each center atom summed over a block of snapshots.
+
+            Same criterion as :func:`.hbonds_c.hbonds_batch`; the center atom donates the hydrogen bond if the
+            hydrogen atom is closer to it than to the other oxygen atom. Memory only depends on the number of center
+            atoms.
 
-                Source code in file :mod:`pbc_c.cpp`.
-        )pbdoc", py::arg("pos"), py::arg("len"), py::arg("cell")
+            Args:
+                pos (ndarray[float]): atomic positions of all atoms with shape (n_frames, n_atoms, 3)
+                cells (ndarray[float]): unit cells of the snapshots with shape (n_frames, 3, 3)
+                idx1 (ndarray[int]): rows of the oxygen atoms in pos
+                idx2 (ndarray[int]): rows of the hydrogen atoms in pos
+                idx3 (ndarray[int]): rows of the center oxygen atoms in pos
+                cut1 (float): maximum oxygen - oxygen distance
+                cut2 (float): maximum oxygen - hydrogen distance
+                angle (float): minimum angle criterion
+                nmax (int, optional): default 4 - last bin of the histograms counts nmax or more hydrogen bonds
+
+            Returns:
+                (tuple): tuple containing:
+
+                    - ndarray[int]: number of hydrogen bonds in each snapshot (same as :func:`.hbonds_c.hbonds_batch`)
+                    - ndarray[int]: donated hydrogen bonds of each center atom summed over the snapshots
+                    - ndarray[int]: accepted hydrogen bonds of each center atom summed over the snapshots
+                    - ndarray[int]: histograms with shape (3, nmax + 1) counting center atoms with 0, 1, ... total,
+                      donated and accepted hydrogen bonds summed over the snapshots
+        )pbdoc", py::arg("pos"), py::arg("cells"), py::arg("idx1"), py::arg("idx2"), py::arg("idx3"), py::arg("cut1"),
+        py::arg("cut2"), py::arg("angle"), py::arg("nmax") = 4
+    );
+
+    m.def("hbonds_list_batch", &hbonds_list_batch, R"pbdoc(
+            List the hydrogen bonds of a block of snapshots.
+
+            Same criterion as :func:`.hbonds_c.hbonds_batch`. The oxygen atom closer to the hydrogen atom is the
+            donor. A hydrogen bond between two center atoms is listed once although :func:`.hbonds_c.hbonds_batch`
+            counts it for both of them.
+
+            Args:
+                pos (ndarray[float]): atomic positions of all atoms with shape (n_frames, n_atoms, 3)
+                cells (ndarray[float]): unit cells of the snapshots with shape (n_frames, 3, 3)
+                idx1 (ndarray[int]): rows of the oxygen atoms in pos
+                idx2 (ndarray[int]): rows of the hydrogen atoms in pos
+                idx3 (ndarray[int]): rows of the center oxygen atoms in pos
+                cut1 (float): maximum oxygen - oxygen distance
+                cut2 (float): maximum oxygen - hydrogen distance
+                angle (float): minimum angle criterion
+
+            Returns:
+                (tuple): tuple containing:
+
+                    - ndarray[int]: offsets with n_frames + 1 entries; bonds of frame f are offsets[f]:offsets[f + 1]
+                    - ndarray[int32]: rows of (donor, hydrogen, acceptor) of each bond with shape (n_bonds, 3),
+                      sorted by rows within each frame
+                    - ndarray[float32]: oxygen - oxygen distance of each bond
+                    - ndarray[float32]: angle of each bond in degree
+        )pbdoc", py::arg("pos"), py::arg("cells"), py::arg("idx1"), py::arg("idx2"), py::arg("idx3"), py::arg("cut1"),
+        py::arg("cut2"), py::arg("angle")
+    );
+
+    m.def("threads", &thread_count, R"pbdoc(
+            Number of threads used by the parallel C++ routines.
+
+            Args:
+                n (int, optional): default 0 - set the number of threads first if positive; otherwise the environment
+                    variable OMP_NUM_THREADS or the number of cores decides
+
+            Returns:
+                int: number of threads; 1 if the module was compiled without OpenMP
+
+            Note:
+                Source code in file :mod:`thread_c.h`.
+        )pbdoc", py::arg("n") = 0
     );
 
     m.def("calc_dist_vec_c", &calc_dist_vec, R"pbdoc(
@@ -205,15 +602,13 @@ PYBIND11_MODULE(hbonds_c, m){
             Args:
                 pos1 (double *): pointer on array with position of atom 1
                 pos2 (double *): pointer on array with position of atom 2
-
-            Returns:
-                double *: pointer on array with vector between both positions
+                vec (double *): pointer on array with 3 entries which is filled with the vector from pos1 to pos2
 
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
-        )pbdoc", py::arg("pos1"), py::arg("pos2")
+                Source code in file :mod:`calc_c.h`.
+        )pbdoc", py::arg("pos1"), py::arg("pos2"), py::arg("vec")
     );
 
     m.def("calc_norm_c", &calc_norm, R"pbdoc(
@@ -228,7 +623,7 @@ PYBIND11_MODULE(hbonds_c, m){
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
+                Source code in file :mod:`calc_c.h`.
         )pbdoc", py::arg("vec")
     );
 
@@ -246,7 +641,7 @@ PYBIND11_MODULE(hbonds_c, m){
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
+                Source code in file :mod:`calc_c.h`.
         )pbdoc", py::arg("pos1"), py::arg("pos2"), py::arg("pos3")
     );
 
@@ -0,0 +1,47 @@
+#ifndef PAW_STRUCTURE_HIST_C_H
+#define PAW_STRUCTURE_HIST_C_H
+
+#include <vector>
+
+// histogram with equal bins in [lo, hi]
+// values are sorted into the same bins as by numpy.histogram(values, bins=nbins, range=(lo, hi))
+struct Histogram {
+    double lo;                  // lower edge of first bin
+    double hi;                  // upper edge of last bin (included)
+    double norm;                // number of bins per unit
+    int nbins;                  // number of bins
+    std::vector<double> edges;  // bin edges like numpy.linspace(lo, hi, nbins + 1)
+};
+
+inline void hist_init(Histogram & hist, double lo, double hi, int nbins){
+    hist.lo = lo;
+    hist.hi = hi;
+    hist.nbins = nbins;
+    hist.norm = nbins / (hi - lo);
+    double step = (hi - lo) / nbins;
+    hist.edges.resize(nbins + 1);
+    for(int i = 0; i < nbins; i++){
+        hist.edges[i] = i * step + lo;
+    }
+    hist.edges[nbins] = hi;
+}
+
+// bin of value x, -1 if x is outside of [lo, hi]
+inline int hist_index(const Histogram & hist, double x){
+    if(!(x >= hist.lo && x <= hist.hi)){
+        return -1;
+    }
+    int i = (int)((x - hist.lo) * hist.norm);
+    if(i >= hist.nbins){
+        i = hist.nbins - 1;
+    }
+    // correct rounding errors of the scaling with the exact bin edges
+    if(x < hist.edges[i]){
+        i--;
+    } else if(i != hist.nbins - 1 && x >= hist.edges[i + 1]){
+        i++;
+    }
+    return i;
+}
+
+#endif //PAW_STRUCTURE_HIST_C_H
@@ -6,30 +6,33 @@ Ion complex detection using geometric :ref:`algorithm<Control_ION_algorithm>`.
 Main routine is :func:`.ion_find_parallel`.
 
 Dependencies:
-    :py:mod:`functools`
-    :py:mod:`miniutils`
     :py:mod:`numpy`
     :py:mod:`pandas`
     :mod:`.neighbor`
+    :mod:`.pool`
     :mod:`.utility`
     :class:`.Snap`
+    :func:`.tra_cell_read`
+    :func:`.tra_cell_write`
 
 .. autosummary::
 
       ion_find_parallel
       ion_load
+      ion_rows
       ion_save
       ion_single
 """
 
 import numpy as np
 import pandas as pd
-from functools import partial
-import miniutils.progress_bar as progress
 # MODULES WITHIN PROJECT
 from . import neighbor
+from . import pool
 from . import utility
 from .tra import Snap
+from .tra import tra_cell_read
+from .tra import tra_cell_write
 
 
 
@@ -62,30 +65,42 @@ def ion_single(snap, id1, id2, id3, cut1, cut2):
     Returns:
         :class:`.Snap`: snapshot containing an ion complex
 
+    The atoms of the complex are found by :func:`.ion_rows`.
+    """
+    return snap.take(ion_rows(snap, id1, id2, id3, cut1, cut2))
+
+
+def ion_rows(snap, id1, id2, id3, cut1, cut2):
+    """
+    Find the atoms of the ion complex of a single snapshot of atomic positions.
+
+    Args:
+        snap (:class:`.Snap`): single snapshot containing the atomic information
+        id1 (str): identifier for atom used as center (e.g. 'MN')
+        id2 (str): identifier for atoms as possible first neighbors (e.g. 'O\_')
+        id3 (str): identifier for atoms as possible neighbors of first neighbors (e.g. 'H\_')
+        cut1 (float): cutoff distance for first neighbor search
+        cut2 (float): cutoff distance for second neighbor search
+
+    Returns:
+        ndarray[int]: row numbers of the atoms of the ion complex in :data:`snap`
+
     Todo:
         Implement possibility for more atoms of type id1 or allow selection by name.
     """
     # check if only one atom is selected as ion
-    if len(snap.atoms[snap.atoms['id'] == id1]) != 1:
-        utility.err('ion_single', 0, [len(snap.atoms[snap.atoms['id'] == id1])])
+    if len(snap.topology.select(id=id1)) != 1:
+        utility.err('ion_single', 0, [len(snap.topology.select(id=id1))])
     # check if all three are different species
     if id1 == id2 or id2 == id3 or id1 == id3:
         utility.err('ion_single', 1, [id1, id2, id3])
     # search first neighbors
-    next1 = neighbor.neighbor_name(snap, id1, id2, cut1)
-    # extract name lists
-    id1_list = [atom[0] for atom in next1]
-    id2_list = [y for x in [atom[1:] for atom in next1] for y in x]
+    rows1, _, next1 = neighbor.neighbor_rows(snap, id1, id2, cut1)
+    rows2 = np.unique(next1)
     # search second neighbors
-    next2 = neighbor.neighbor_name(snap, id2, id3, cut2, names=id2_list)
-    # extract name list
-    id3_list = [y for x in [atom[1:] for atom in next2] for y in x]
-    # extract correct atom information
-    id1_list = snap.atoms.loc[snap.atoms['name'].isin(id1_list)]
-    id2_list = snap.atoms.loc[snap.atoms['name'].isin(id2_list)]
-    id3_list = snap.atoms.loc[snap.atoms['name'].isin(id3_list)]
-    comp = pd.concat([id1_list, id2_list, id3_list])
-    return Snap(snap.iter, snap.time, snap.cell, None, None, dataframe=comp)
+    _, _, next2 = neighbor.neighbor_rows(snap, id2, id3, cut2, rows=rows2)
+    rows3 = np.unique(next2)
+    return np.concatenate([rows1, rows2, rows3])
 
 
 ########################################################################################################################
@@ -142,7 +157,8 @@ def ion_save(root, snapshots, id1, id2, id3, cut1, cut2, ext='.ion'):
     for i in range(len(snapshots)):
         f.write("-" * 84 + "\n")
         f.write("%-14s%-14.8f%-14s%-14d%-14s%-14d\n" %
-                ("TIME", snapshots[i].time, "ITERATION", snapshots[i].iter, "ATOMS", len(snapshots[i].atoms)))
+                ("TIME", snapshots[i].time, "ITERATION", snapshots[i].iter, "ATOMS", len(snapshots[i])))
+        tra_cell_write(f, snapshots[i].cell)
         f.write("%-14s%-14s%-14s%14s%14s%14s\n" % ('NAME', 'ID', 'INDEX', 'X', 'Y', 'Z'))
         np.savetxt(f, snapshots[i].atoms, fmt="%-14s%-14s%-14d%14.8f%14.8f%14.8f")
     f.close()
@@ -191,7 +207,8 @@ def ion_load(root, ext='.ion'):
                 iter = int(text[i][3])
                 time = float(text[i][1])
                 n_atoms = int(text[i][5])
-                test = np.array(text[i + 2:i + 2 + n_atoms])
+                cell, start = tra_cell_read(text, i, cell)
+                test = np.array(text[start:start + n_atoms])
                 atoms = {}
                 atoms['name'] = test[:, 0]
                 atoms['id'] = test[:, 1]
@@ -247,32 +264,38 @@ def ion_load(root, ext='.ion'):
 # OUTPUT
 # list class Snap ion_comp      list of ion complexes found
 ########################################################################################################################
-def ion_find_parallel(root, snapshots, id1, id2, id3, cut1, cut2):
+def ion_find_parallel(root, snapshots, id1, id2, id3, cut1, cut2, chunk=1000, workers=None, task=None):
     """
     Find ion complexes for multiple snapshots of atomic configurations.
 
     Args:
         root (str): root name of the files
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the atomic information
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
         id1 (str): identifier for atom used as center (e.g. 'MN')
         id2 (str): identifier for atoms as possible first neighbors (e.g. 'O\_')
         id3 (str): identifier for atoms as possible neighbors of first neighbors (e.g. 'H\_')
         cut1 (float): cutoff distance for first neighbor search
         cut2 (float): cutoff distance for second neighbor search
+        chunk (int, optional): default 1000 - number of snapshots processed at once
+        workers (int, optional): default **None** - number of worker processes; **None** uses all cores
+        task (int, optional): default **None** - number of snapshots per task (see :func:`.pool_map`)
 
     Returns:
         list[:class:`.Snap`]: list of snapshots containing an ion complex
 
-    Parallelization based on :py:mod:`multiprocessing`.
+    Parallelization based on :func:`.pool_map`: the workers share the atomic positions and only return the rows of
+    the complex (see :func:`.ion_rows`).
+    Snapshots are read and processed in blocks of :data:`chunk` (see :func:`.pool_blocks`).
 
     Note:
         Only one atom of type :data:`id1` allowed to be in a snapshot at the moment.
     """
     print("ION COMPLEX DETECTION IN PROGRESS")
-    # set other arguments (necessary for parallel computing)
-    multi_one = partial(ion_single, id1=id1, id2=id2, id3=id3, cut1=cut1, cut2=cut2)
-    # run data extraction
-    ion_comp = progress.parallel_progbar(multi_one, snapshots)
+    # run data extraction chunk by chunk
+    ion_comp = []
+    for part, rows in pool.pool_blocks(ion_rows, snapshots, chunk=chunk, workers=workers, task=task, id1=id1, id2=id2,
+                                       id3=id3, cut1=cut1, cut2=cut2):
+        ion_comp += [snap.take(r) for snap, r in zip(part, rows)]
     # create output file
     ion_save(root, ion_comp, id1, id2, id3, cut1, cut2)
     print("ION COMPLEX DETECTION FINISHED")
@@ -3,21 +3,35 @@ paw_structure.neighbor
 ----------------------
 Helper functions for atomic neighbor search.
 
+Neighbor lists can be shared between analyses of the same snapshot by enabling the :class:`.NeighborCache` with
+:func:`.neighbor_cache`.
+
 Dependencies:
+    :py:mod:`collections`
     :py:mod:`numpy`
-    :mod:`.pbc`
+    :py:mod:`pandas`
+    :mod:`.neighbor_c`
 
 .. autosummary::
 
+      NeighborCache
+      neighbor_cache
       neighbor_find
       neighbor_find_single
       neighbor_name
       neighbor_name_single
+      neighbor_rows
+      neighbor_search
 """
 
 import numpy as np
+import pandas as pd
+from collections import OrderedDict
 # MODULES WITHIN PROJECT
-from . import pbc
+from . import neighbor_c
+
+# neighbor lists shared by all analyses of this process (see neighbor_cache())
+cache = None
 
 ########################################################################################################################
 # RETURN NAMES OF ATOMS CLOSER THAN cut FROM center ATOM
@@ -44,13 +58,11 @@ def neighbor_name_single(center, pbc_atoms, cut):
         list[str]: names of neighboring atoms
     """
     dist = np.linalg.norm(center['pos'] - pbc_atoms['pos'], axis=1)  # calculate distance to center
-    neighbors = pbc_atoms[[a and not b for a, b in zip(dist < cut, np.isclose(dist, 0.0))]]  # select fitting atoms
+    neighbors = pbc_atoms[(dist < cut) & ~np.isclose(dist, 0.0)]  # select fitting atoms
     return neighbors['name'].values  # return their names as a list
 
 
 ########################################################################################################################
-# TODO: get rid of neighbor_name in whole code, might be very inefficient
-#  (output names and then search snapshots from names)
 # FIND NAMES OF NEIGHBOR ATOMS
 ########################################################################################################################
 # INPUT
@@ -77,23 +89,13 @@ def neighbor_name(snap, id1, id2, cut, names=None):
     Returns:
         list[list[str]]: list of lists with names according to [center neighbor1 neighbor2]
 
-    .. Todo::
-        Very inefficient approach! Still in use in :func:`.ion_single` and :func:`.water_single`.
-        Should be replaced by more efficient search approach.
-    """
-    pbc_atoms = pbc.pbc_apply3x3(snap, id=[id2])  # create 3x3 unit cell of atom species id2
-    neighbors = []  # initialize dictionary for storage of neighbor names
-    if names is None:
-        for index, row in snap.atoms.iterrows():  # iterate through all atoms of species id1
-            if row['id'] == id1:
-                next = neighbor_name_single(row, pbc_atoms, cut)
-                neighbors.append(np.insert(next, 0, row['name']))
-    else:
-        for index, row in snap.atoms.iterrows():  # iterate through all atoms with name contained in names
-            if row['name'] in names:
-                next = neighbor_name_single(row, pbc_atoms, cut)
-                neighbors.append(np.insert(next, 0, row['name']))
-    return [x.tolist() for x in neighbors]  # return list of lists with each first element being the center
+    Thin adapter on :func:`.neighbor_search`; use :func:`.neighbor_rows` to avoid searching the names again.
+    """
+    rows1, rows2, offsets, indices, images = neighbor_search(snap, id1, id2, cut, names=names)
+    center = snap.topology.name[rows1]
+    name = snap.topology.name[rows2[indices]]
+    # return list of lists with each first element being the center
+    return [[center[i]] + name[offsets[i]:offsets[i + 1]].tolist() for i in range(len(rows1))]
 
 ########################################################################################################################
 # RETURN ATOMS CLOSER THAN cut FROM center ATOM
@@ -120,7 +122,7 @@ def neighbor_find_single(center, pbc_atoms, cut):
 
     """
     dist = np.linalg.norm(center['pos'] - pbc_atoms['pos'], axis=1)  # calculate distance to center
-    neighbors = pbc_atoms[[a and not b for a, b in zip(dist < cut, np.isclose(dist, 0.0))]]  # select fitting atoms
+    neighbors = pbc_atoms[(dist < cut) & ~np.isclose(dist, 0.0)]  # select fitting atoms
     return neighbors  # return dataframe
 
 
@@ -151,16 +153,251 @@ def neighbor_find(snap, id1, id2, cut, names=None):
     Returns:
         dict: name as center atoms are used as keys; pandas DataFrame containing its neighbors is the entry
     """
-    pbc_atoms = pbc.pbc_apply3x3(snap, id=[id2])  # create 3x3 unit cell of atom species id2
-    neighbors = {}  # initialize dictionary for storage of neighbor names
-    if names is None:
-        for index, row in snap.atoms.iterrows():  # iterate through all atoms of species id1
-            if row['id'] == id1:
-                next = neighbor_find_single(row, pbc_atoms, cut)
-                neighbors[row['name']] = next
-    else:
-        for index, row in snap.atoms.iterrows():  # iterate through all atoms of species id1
-            if row['name'] in names:
-                next = neighbor_find_single(row, pbc_atoms, cut)
-                neighbors[row['name']] = next
+    rows1, rows2, offsets, indices, images = neighbor_search(snap, id1, id2, cut, names=names)
+    atoms = snap.topology.take(rows2[indices]).frame  # atomic information of the neighbors
+    atoms = pd.concat([atoms, pd.DataFrame(images, columns=['pos', 'pos', 'pos'])], axis=1, sort=False)
+    neighbors = {}  # initialize dictionary for storage of neighbors
+    for i, name in enumerate(snap.topology.name[rows1]):
+        neighbors[name] = atoms.iloc[offsets[i]:offsets[i + 1]]
     return neighbors  # return dictionary
+
+
+########################################################################################################################
+# FIND ROWS OF NEIGHBOR ATOMS
+########################################################################################################################
+# INPUT
+# class Snap snap           snapshot with all information
+# str id1                   identifier for atoms used as center (e.g. 'H_' or 'O_')
+# str id2                   identifier for atoms used as potential neighbors
+# float cut                 cutoff distance for search
+# list str names (optional) use names (e.g. 'O_43', 'H_23') of atoms as center instead of identifiers
+# ndarray int rows (opt.)   use rows of atoms in snap as center instead of identifiers or names
+#####
+# OUTPUT
+# ndarray int rows1         rows of the center atoms in snap
+# ndarray int offsets       neighbors of center i are neighbors[offsets[i]:offsets[i + 1]]
+# ndarray int neighbors     rows of the neighbor atoms in snap
+########################################################################################################################
+def neighbor_rows(snap, id1, id2, cut, names=None, rows=None):
+    """
+    Find rows of neighbor atoms for a given selection of central atoms.
+
+    Args:
+        snap (:class:`.Snap`): snapshot containing the atomic information
+        id1 (str): identifier for atom used as center (e.g. 'O\_')
+        id2 (str): identifier for atoms as possible neighbors (e.g. 'H\_')
+        cut (float): cutoff distance for search
+        names (list[str], optional): list of names of atoms used as center; replaces :data:`id1`
+        rows (ndarray[int], optional): rows of atoms in :data:`snap` used as center; replaces :data:`id1` and
+            :data:`names`
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: rows of the center atoms
+            - ndarray[int]: offsets; neighbors of the i-th center are neighbors[offsets[i]:offsets[i + 1]]
+            - ndarray[int]: rows of the neighbor atoms in :data:`snap`
+
+    Compressed sparse row form of :func:`.neighbor_search`. A neighbor appears once for every periodic image closer
+    than :data:`cut`.
+    """
+    rows1, rows2, offsets, indices, images = neighbor_search(snap, id1, id2, cut, names=names, rows=rows)
+    return rows1, offsets, rows2[indices]
+
+
+########################################################################################################################
+# FIND NEIGHBOR ATOMS USING THE CELL LIST OF neighbor_c
+########################################################################################################################
+# INPUT
+# class Snap snap           snapshot with all information
+# str id1                   identifier for atoms used as center (e.g. 'H_' or 'O_')
+# str id2                   identifier for atoms used as potential neighbors
+# float cut                 cutoff distance for search
+# list str names (optional) use names (e.g. 'O_43', 'H_23') of atoms as center instead of identifiers
+# ndarray int rows (opt.)   use rows of atoms in snap as center instead of identifiers or names
+#####
+# OUTPUT
+# ndarray int rows1         rows of the center atoms in snap
+# ndarray int rows2         rows of the possible neighbor atoms in snap
+# ndarray int offsets       neighbors of center i are indices[offsets[i]:offsets[i + 1]]
+# ndarray int indices       neighbors as positions in rows2
+# ndarray float images      positions of the periodic images of the neighbors
+########################################################################################################################
+def neighbor_search(snap, id1, id2, cut, names=None, rows=None):
+    """
+    Find neighbor atoms including periodic images for a given selection of central atoms.
+
+    Args:
+        snap (:class:`.Snap`): snapshot containing the atomic information
+        id1 (str): identifier for atom used as center (e.g. 'O\_')
+        id2 (str): identifier for atoms as possible neighbors (e.g. 'H\_')
+        cut (float): cutoff distance for search
+        names (list[str], optional): list of names of atoms used as center; replaces :data:`id1`
+        rows (ndarray[int], optional): rows of atoms in :data:`snap` used as center; replaces :data:`id1` and
+            :data:`names`
+
+    Returns:
+        (tuple): tuple containing rows of center atoms, rows of possible neighbors, offsets, indices and images
+
+    Neighbors of the i-th center are rows2[indices[offsets[i]:offsets[i + 1]]] with the positions of their periodic
+    images in images[offsets[i]:offsets[i + 1]]. Searched by :func:`.neighbor_c.neighbor_list` using a cell list.
+    Atoms closer than 1e-8 to the center are ignored.
+
+    If the :class:`.NeighborCache` is enabled (see :func:`.neighbor_cache`), the neighbor list of all atoms of species
+    :data:`id1` is taken from the cache and reduced to the selected centers.
+    """
+    if rows is not None:
+        rows1 = np.asarray(rows, dtype=np.int64)
+    elif names is not None:
+        rows1 = snap.topology.select(names=names)
+    else:
+        rows1 = snap.topology.select(id=id1)
+    if cache is not None and np.isin(rows1, snap.topology.select(id=id1)).all():
+        return cache.search(snap, id1, id2, cut, rows=rows1)
+    rows2 = snap.topology.select(id=id2)
+    offsets, indices, images = neighbor_c.neighbor_list(snap.pos[rows1].flatten(), snap.pos[rows2].flatten(), cut,
+                                                        np.asarray(snap.cell, dtype=np.float64).flatten(), 1e-8)
+    return rows1, rows2, offsets, indices, images
+
+
+########################################################################################################################
+# LEAST RECENTLY USED CACHE OF NEIGHBOR LISTS
+########################################################################################################################
+# INPUT
+# int size (optional)       maximum number of neighbor lists kept in memory
+########################################################################################################################
+class NeighborCache:
+    """
+    Least recently used cache of neighbor lists.
+
+    Args:
+        size (int, optional): default 64 - maximum number of neighbor lists kept in memory
+
+    One neighbor list is stored for every snapshot (iteration, time and number of atoms) and pair of species. It is
+    built at the largest cutoff requested so far; smaller cutoffs and subsets of the centers are answered by filtering
+    the stored list. The least recently used list is removed once :data:`size` is exceeded. Counts of :attr:`hits` and
+    :attr:`misses` are kept for :meth:`report`.
+
+    Note:
+        Each process holds its own cache. Worker processes of :mod:`.pool` do not share their neighbor lists, but
+        their hits and misses are added to the cache of the main process (see :meth:`count`).
+    """
+    def __init__(self, size=64):
+        self.size = size
+        self.lists = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def search(self, snap, id1, id2, cut, rows=None):
+        """
+        Find neighbor atoms like :func:`.neighbor_search` using the cached neighbor lists.
+
+        Args:
+            snap (:class:`.Snap`): snapshot containing the atomic information
+            id1 (str): identifier for atoms used as center (e.g. 'O\_')
+            id2 (str): identifier for atoms as possible neighbors (e.g. 'H\_')
+            cut (float): cutoff distance for search
+            rows (ndarray[int], optional): rows of atoms of species :data:`id1` used as center; all if **None**
+
+        Returns:
+            (tuple): tuple containing rows of center atoms, rows of possible neighbors, offsets, indices and images
+        """
+        key = (snap.iter, snap.time, len(snap.topology), id1, id2)
+        entry = self.lists.get(key)
+        # positions are compared so that different snapshots with equal iteration do not collide
+        if entry is not None and entry['cut'] >= cut and np.array_equal(entry['pos'], snap.pos):
+            self.hits += 1
+            self.lists.move_to_end(key)
+        else:
+            self.misses += 1
+            rows1 = snap.topology.select(id=id1)
+            rows2 = snap.topology.select(id=id2)
+            offsets, indices, images = neighbor_c.neighbor_list(snap.pos[rows1].flatten(), snap.pos[rows2].flatten(),
+                                                                cut, np.asarray(snap.cell, dtype=np.float64).flatten(),
+                                                                1e-8)
+            center = np.repeat(rows1, np.diff(offsets))
+            dist = np.sqrt(np.sum((images - snap.pos[center]) ** 2, axis=1))
+            entry = {'cut': cut, 'pos': snap.pos.copy(), 'rows1': rows1, 'rows2': rows2, 'offsets': offsets,
+                     'indices': indices, 'images': images, 'dist': dist}
+            self.lists[key] = entry
+            self.lists.move_to_end(key)
+            while len(self.lists) > self.size:
+                self.lists.popitem(last=False)  # remove least recently used
+        return self.select(entry, cut, rows=rows)
+
+    @staticmethod
+    def select(entry, cut, rows=None):
+        """
+        Reduce a stored neighbor list to a smaller cutoff and a subset of the centers.
+
+        Args:
+            entry (dict): neighbor list stored by :meth:`search`
+            cut (float): cutoff distance; not larger than the one of :data:`entry`
+            rows (ndarray[int], optional): rows of the selected centers; all if **None**
+
+        Returns:
+            (tuple): tuple containing rows of center atoms, rows of possible neighbors, offsets, indices and images
+        """
+        offsets = entry['offsets']
+        if rows is None:
+            centers = np.arange(len(entry['rows1']))
+        else:
+            centers = np.searchsorted(entry['rows1'], rows)
+        counts = np.diff(offsets)[centers]
+        # positions of the neighbors of the selected centers in the stored list
+        select = np.repeat(offsets[centers] - np.cumsum(counts) + counts, counts) + np.arange(np.sum(counts))
+        owner = np.repeat(np.arange(len(centers)), counts)
+        keep = entry['dist'][select] < cut
+        select = select[keep]
+        offsets = np.zeros(len(centers) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owner[keep], minlength=len(centers)), out=offsets[1:])
+        return entry['rows1'][centers], entry['rows2'], offsets, entry['indices'][select], entry['images'][select]
+
+    def clear(self):
+        """
+        Remove all stored neighbor lists and reset the counters.
+        """
+        self.lists.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, hits, misses):
+        """
+        Add hits and misses counted by the cache of a worker process.
+
+        Args:
+            hits (int): number of hits
+            misses (int): number of misses
+        """
+        self.hits += hits
+        self.misses += misses
+
+    def report(self):
+        """
+        Print number of hits and misses of the cache including those of the worker processes of :mod:`.pool`.
+        """
+        print("NEIGHBOR CACHE: %d HITS, %d MISSES" % (self.hits, self.misses))
+
+
+########################################################################################################################
+# ENABLE OR DISABLE CACHE OF NEIGHBOR LISTS
+########################################################################################################################
+# INPUT
+# int size                  maximum number of neighbor lists kept in memory; 0 disables the cache
+#####
+# OUTPUT
+# class NeighborCache cache cache used by neighbor_search() (None if disabled)
+########################################################################################################################
+def neighbor_cache(size=64):
+    """
+    Enable or disable the :class:`.NeighborCache` used by :func:`.neighbor_search`.
+
+    Args:
+        size (int, optional): default 64 - maximum number of neighbor lists kept in memory; 0 disables the cache
+
+    Returns:
+        :class:`.NeighborCache`: cache used for all following neighbor searches; **None** if disabled
+    """
+    global cache
+    cache = NeighborCache(size) if size else None
+    return cache
@@ -0,0 +1,130 @@
+#include <algorithm>
+#include <cstdint>
+#include <numeric>
+#include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
+#include <vector>
+
+#include "calc_c.h"
+#include "cell_c.h"
+#include "pbc_c.h"
+
+
+using namespace std;
+namespace py = pybind11;
+
+py::tuple neighbor_list(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell,
+        double min);
+void neighbor_calculate(const double * array1, int len1, const double * array2, int len2, double cut,
+        const double * cell, double min, vector<int64_t> & offsets, vector<int64_t> & indices, vector<double> & images);
+
+
+/* GET NEIGHBORS OF CENTER ATOMS FOR NEIGHBOR SEARCH */
+py::tuple neighbor_list(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell,
+        double min){
+    py::buffer_info buf1 = array1.request(), buf2 = array2.request(), buf3 = cell.request();
+    // check if given numpy arrays have dimension 1 (are flat)
+    if(buf1.ndim != 1 || buf2.ndim != 1 || buf3.ndim != 1)
+        throw runtime_error("Number of dimensions must be 1.");
+    // obtain pointer on arrays
+    const double * ptr1 = (const double *)buf1.ptr;
+    const double * ptr2 = (const double *)buf2.ptr;
+    const double * ptr3 = (const double *)buf3.ptr;
+    vector<int64_t> offsets, indices;
+    vector<double> images;
+    neighbor_calculate(ptr1, buf1.size / 3, ptr2, buf2.size / 3, cut, ptr3, min, offsets, indices, images);
+    // copy to be compatible with Python
+    py::array_t<int64_t> off(offsets.size(), offsets.data());
+    py::array_t<int64_t> ind(indices.size(), indices.data());
+    py::array_t<double> img({(py::ssize_t)indices.size(), (py::ssize_t)3}, images.data());
+    return py::make_tuple(off, ind, img);
+}
+
+
+// find neighbors of each center atom, sorted by their index in array2
+void neighbor_calculate(const double * array1, int len1, const double * array2, int len2, double cut,
+        const double * cell, double min, vector<int64_t> & offsets, vector<int64_t> & indices, vector<double> & images){
+    // sort neighbor atoms into cell list
+    CellList list;
+    cell_list_build(list, array2, len2, cell, cut);
+    vector<int64_t> next_index;
+    vector<double> next_image;
+    vector<int> order;
+    offsets.push_back(0);
+    // loop through center atoms
+    for(int i = 0; i < len1; i++){
+        next_index.clear();
+        next_image.clear();
+        cell_list_search(list, array1 + 3 * i, cut, min, [&](int j, const double * neighbor, double dist){
+            next_index.push_back(j);
+            next_image.insert(next_image.end(), neighbor, neighbor + 3);
+        });
+        order.resize(next_index.size());
+        iota(order.begin(), order.end(), 0);
+        stable_sort(order.begin(), order.end(), [&](int a, int b){ return next_index[a] < next_index[b]; });
+        for(int n : order){
+            indices.push_back(next_index[n]);
+            images.insert(images.end(), next_image.begin() + 3 * n, next_image.begin() + 3 * n + 3);
+        }
+        offsets.push_back(indices.size());
+    }
+}
+
+
+PYBIND11_MODULE(neighbor_c, m){
+    m.doc() = R"pbdoc(
+        paw_structure.neighbor_c
+        ------------------------
+
+        .. currentmodule:: paw_structure.neighbor_c
+
+        .. _pybind11: https://pybind11.readthedocs.io/en/stable/
+
+        C++ code which is connected to the program using pybind11_.
+
+        Speed up the search for atomic neighbors in :mod:`.neighbor` using the cell list of :mod:`cell_c.cpp`.
+
+        .. _Sphinx: https://www.sphinx-doc.org/en/master/
+
+        Note:
+            Documentation especially for internal C++ routines might be incomplete or show wrong argument types.
+
+            This is because Sphinx_ constructs the documentation from the installed Python module.
+
+        Dependencies:
+            :py:mod:`numpy`
+            :py:mod:`pybind11`
+            :mod:`calc_c.h`
+            :mod:`cell_c.cpp`
+            :mod:`pbc_c.cpp`
+
+        .. autosummary::
+
+            neighbor_list
+    )pbdoc"; // optional module docstring
+
+    m.def("neighbor_list", &neighbor_list, R"pbdoc(
+            Find all periodic images of the neighbor atoms which are closer than a cutoff distance to the center atoms.
+
+            Args:
+                array1 (ndarray[float]): atomic positions for central atoms
+                array2 (ndarray[float]): atomic positions for neighbor atoms
+                cut (float): cutoff for distance search
+                cell (ndarray[float]): unit cell of the system for periodic boundary conditions
+                min (float): neighbors closer than min are ignored (avoid self-interaction)
+
+            Returns:
+                (tuple): tuple containing offsets (ndarray[int]), indices (ndarray[int]) and images (ndarray[float])
+
+            Neighbors of center atom i are indices[offsets[i]:offsets[i + 1]] (rows of array2 sorted ascending) with the
+            positions of the periodic images images[offsets[i]:offsets[i + 1]].
+        )pbdoc", py::arg("array1"), py::arg("array2"), py::arg("cut"), py::arg("cell"), py::arg("min")
+    );
+
+
+#ifdef VERSION_INFO
+m.attr("__version__") = VERSION_INFO;
+#else
+m.attr("__version__") = "dev";
+#endif
+}
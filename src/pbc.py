@@ -5,35 +5,67 @@ Functions for application of periodic boundary conditions.
 
 Dependencies:
     :py:mod:`copy`
-    :py:mod:`miniutils`
     :py:mod:`numpy`
     :mod:`.utility`
 
 .. autosummary::
 
       pbc_apply3x3
+      pbc_fold
       pbc_folding
       pbc_folding_parallel
+      pbc_folding_single
       pbc_general
 """
 
 import numpy as np
 from copy import deepcopy
-import miniutils.progress_bar as progress
 # MODULES WITHIN PROJECT
 from . import utility
 
 
 ########################################################################################################################
-# FOLD ATOM POSITIONS INTO CUBIC UNIT CELL STARTING AT ORIGIN
+# FOLD ATOM POSITIONS OF A BLOCK OF SNAPSHOTS INTO THEIR UNIT CELLS
+########################################################################################################################
+# INPUT
+# ndarray float pos             (n_frames, n_atoms, 3) or (n_atoms, 3) atomic positions (altered in place)
+# ndarray float cells           (n_frames, 3, 3) or (3, 3) unit cells (lattice vectors as rows)
+#####
+# OUTPUT
+# ndarray float pos             same array as the input
+########################################################################################################################
+def pbc_fold(pos, cells):
+    r"""
+    Fold atomic positions into the unit cell for a whole block of snapshots at once.
+
+    Args:
+        pos (ndarray[float]): (n_frames, n_atoms, 3) array of atomic positions or (n_atoms, 3) for a single snapshot;
+            altered in place
+        cells (ndarray[float]): (n_frames, 3, 3) array of unit cells or (3, 3) for a single snapshot; lattice vectors
+            are the rows
+
+    Returns:
+        ndarray[float]: :data:`pos` with folded atomic positions
+
+    The fractional coordinates :math:`s = r C^{-1}` of every atom are shifted into [0, 1) by subtracting
+    :math:`\lfloor s \rfloor C`. Works for arbitrary triclinic unit cells.
+    """
+    cells = np.asarray(cells, dtype=np.float64)
+    if pos.ndim == 2:
+        cells = cells.reshape(3, 3)
+    else:
+        cells = cells.reshape(-1, 3, 3)
+    pos -= np.floor(pos @ np.linalg.inv(cells)) @ cells
+    return pos
+
+
+########################################################################################################################
+# FOLD ATOM POSITIONS INTO UNIT CELL STARTING AT ORIGIN
 # NECESSARY IF ATOMS ARE FAR APART neighbor DETECTION WORKS WITH 3x3 UNIT CELL -> COULD FAIL
 ########################################################################################################################
 # INPUT
 # list class Snap snapshots     data for every snapshot (alteration stays outside the function so no return)
 ########################################################################################################################
-# ax  0  0
-#  0 ay  0
-#  0  0 az
 def pbc_folding(snapshots):
     """
     Folding of atoms into a single unit cell.
@@ -48,28 +80,29 @@ def pbc_folding(snapshots):
     The origin is at (0,0,0).
 
     Note:
-        Currently not in use, replaced by :func:`.pbc_folding_parallel`.
-        Only works for cubic unit cells.
-        Directly operates and alters the atomic positions.
-
-    Todo:
-        Implement for other unit cells.
+        Directly operates and alters the atomic positions (see :func:`.pbc_fold`).
     """
-    print("PROJECTION OF ATOMS INTO CUBIC UNIT CELL")
+    print("PROJECTION OF ATOMS INTO UNIT CELL")
     for snap in snapshots:  # loop through list
-        lattice = [i.max() for i in snap.cell]  # get unit cell
-        multiplier = []
-        # calculate number of lattice translations needed for each individual atom to get into unit cell
-        for i in range(3):
-            multiplier.append([int(r/lattice[i]) if r > 0.0 else int(r/lattice[i] - 1)
-                               for r in snap.atoms['pos'].values[:,i]])
-        multiplier = np.array(multiplier).T
-        snap.atoms['pos'] -= multiplier * np.array(lattice)
+        pbc_folding_single(snap)
+
+
+def pbc_folding_single(snap):
+    """
+    Folding of the atoms of a single snapshot into the unit cell (see :func:`.pbc_fold`).
+
+    Args:
+        snap (:class:`.Snap`): snapshot of which the atomic positions should be adjusted
+
+    Note:
+        Directly operates and alters the atomic positions.
+    """
+    pbc_fold(snap.pos, snap.cell)
 
 
 def pbc_folding_parallel(snapshots):
     """
-    Folding of atoms into a single unit cell. Parallel version.
+    Folding of atoms into a single unit cell.
 
     Args:
         snapshots (list[:class:`.Snap`]): list of snapshots of which the atomic positions should be adjusted
@@ -83,24 +116,9 @@ def pbc_folding_parallel(snapshots):
     The origin is at (0,0,0).
 
     Note:
-        Only works for cubic unit cells.
-
-    Todo:
-        Implement for other unit cells.
+        Kept for compatibility. Folding is vectorized by :func:`.pbc_fold` and no longer needs worker processes.
     """
-    print("PROJECTION OF ATOMS INTO CUBIC UNIT CELL")
-    def wrapper(snap):
-        lattice = [i.max() for i in snap.cell]
-        multiplier = []
-        # calculate number of lattice translations needed for each individual atom to get into unit cell
-        for i in range(3):
-            multiplier.append([int(r/lattice[i]) if r > 0.0 else int(r/lattice[i] - 1)
-                               for r in snap.atoms['pos'].values[:,i]])
-        multiplier = np.array(multiplier).T
-        snap.atoms['pos'] -= multiplier * np.array(lattice)
-        return snap
-
-    snapshots = progress.parallel_progbar(wrapper, snapshots)
+    pbc_folding(snapshots)
     return snapshots
 
 
@@ -139,9 +157,9 @@ def pbc_apply3x3(snap, id=None, names=None):
         Make :data:`id` optional so it could be applied to a whole system.
     """
     if id is not None and names is None:
-        snap_pbc = snap.atoms[snap.atoms['id'].isin(id)]  # filter for atoms of correct type
+        snap_pbc = snap.take(snap.topology.select(id=id)).atoms  # filter for atoms of correct type
     elif id is None and names is not None:
-        snap_pbc = snap.atoms[snap.atoms['name'].isin(names)]  # filter atoms for correct names
+        snap_pbc = snap.take(snap.topology.select(names=names)).atoms  # filter atoms for correct names
     elif id is None and names is None:
         snap_pbc = snap.atoms  # take all atoms
     else:
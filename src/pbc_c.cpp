@@ -1,19 +1,31 @@
 #include "pbc_c.h"
 
-double * pbc_apply3x3(const double * pos, int len, const double * cell){
-    double * pbc = new double[27 * len * 3];
-    int index = 0;
-    for(int i = -1; i < 2; i++){
-        for(int j = -1; j < 2; j++){
-            for(int k = -1; k < 2; k++){
-                for(int l = 0; l < len; l++){
-                    pbc[3 * (len * index + l) + 0] = pos[3 * l + 0] + i * cell[0] + j * cell[3] + k * cell[6];
-                    pbc[3 * (len * index + l) + 1] = pos[3 * l + 1] + i * cell[1] + j * cell[4] + k * cell[7];
-                    pbc[3 * (len * index + l) + 2] = pos[3 * l + 2] + i * cell[2] + j * cell[5] + k * cell[8];
-                }
-                index++;
-            }
-        }
+#include <cmath>
+
+// calculate inverse of the unit cell (rows are lattice vectors) and return its determinant
+// fractional coordinates of a position r follow from s = r * inv
+double pbc_inverse(const double * cell, double * inv){
+    double det = cell[0] * (cell[4] * cell[8] - cell[5] * cell[7])
+               - cell[1] * (cell[3] * cell[8] - cell[5] * cell[6])
+               + cell[2] * (cell[3] * cell[7] - cell[4] * cell[6]);
+    if(det == 0.0){
+        return det;
+    }
+    inv[0] = (cell[4] * cell[8] - cell[5] * cell[7]) / det;
+    inv[1] = (cell[2] * cell[7] - cell[1] * cell[8]) / det;
+    inv[2] = (cell[1] * cell[5] - cell[2] * cell[4]) / det;
+    inv[3] = (cell[5] * cell[6] - cell[3] * cell[8]) / det;
+    inv[4] = (cell[0] * cell[8] - cell[2] * cell[6]) / det;
+    inv[5] = (cell[2] * cell[3] - cell[0] * cell[5]) / det;
+    inv[6] = (cell[3] * cell[7] - cell[4] * cell[6]) / det;
+    inv[7] = (cell[1] * cell[6] - cell[0] * cell[7]) / det;
+    inv[8] = (cell[0] * cell[4] - cell[1] * cell[3]) / det;
+    return det;
+}
+
+// calculate distances between opposite faces of the unit cell from its inverse
+void pbc_width(const double * inv, double * width){
+    for(int i = 0; i < 3; i++){
+        width[i] = 1.0 / sqrt(inv[i] * inv[i] + inv[3 + i] * inv[3 + i] + inv[6 + i] * inv[6 + i]);
     }
-    return pbc;
 }
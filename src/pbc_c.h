@@ -1,6 +1,26 @@
 #ifndef PAW_STRUCTURE_PBC_C_H
 #define PAW_STRUCTURE_PBC_C_H
 
-double * pbc_apply3x3(const double * pos, int len, const double * cell);
+#include <cmath>
+
+double pbc_inverse(const double * cell, double * inv);
+void pbc_width(const double * inv, double * width);
+
+// lattice translation moving pos2 to its minimum image with respect to pos1
+// works in fractional coordinates (inv from pbc_inverse) for general triclinic cells
+// the image is the closest one if it is closer than half of the smallest width of the unit cell
+inline void pbc_minimum_image(const double * pos1, const double * pos2, const double * inv, int * shift){
+    double d[3] = {pos2[0] - pos1[0], pos2[1] - pos1[1], pos2[2] - pos1[2]};
+    for(int i = 0; i < 3; i++){
+        shift[i] = -(int)std::floor(d[0] * inv[i] + d[1] * inv[3 + i] + d[2] * inv[6 + i] + 0.5);
+    }
+}
+
+// position of pos translated by shift lattice vectors
+inline void pbc_image(const double * pos, const int * shift, const double * cell, double * image){
+    image[0] = pos[0] + shift[0] * cell[0] + shift[1] * cell[3] + shift[2] * cell[6];
+    image[1] = pos[1] + shift[0] * cell[1] + shift[1] * cell[4] + shift[2] * cell[7];
+    image[2] = pos[2] + shift[0] * cell[2] + shift[1] * cell[5] + shift[2] * cell[8];
+}
 
 #endif //PAW_STRUCTURE_PBC_C_H
@@ -0,0 +1,431 @@
+"""
+paw_structure.pipeline
+----------------------
+Single pass over the snapshots for all analyses requested in the :ref:`control file ".scntl" <Control>`.
+
+The frame selections of all analyses are planned up front and merged (see :func:`.tra_iter_union`) so that every
+snapshot is read only once. Each block of snapshots (see :func:`.tra_blocks`) is handed to all analyses using it
+before the next block is read. Ion and water complexes of a snapshot are detected in the same worker process which
+shares the neighbor lists between them if the :class:`.NeighborCache` is enabled (**NEIGHBOR_CACHE** in
+:ref:`Control_SCNTL`).
+
+Main routine is :func:`.pipeline_run`.
+
+Dependencies:
+    :py:mod:`numpy`
+    :mod:`.angle`
+    :mod:`.angle_c`
+    :mod:`.hbonds`
+    :mod:`.hbonds_c`
+    :mod:`.ion`
+    :mod:`.pool`
+    :mod:`.radial`
+    :mod:`.radial_c`
+    :mod:`.tra`
+    :mod:`.water`
+
+.. autosummary::
+
+    AngleStage
+    ComplexStage
+    RadialStage
+    SaveStage
+    pipeline_plan
+    pipeline_rows
+    pipeline_run
+    pipeline_subset
+    pipeline_threads
+"""
+import numpy as np
+# MODULES WITHIN PROJECT
+from . import angle
+from . import angle_c
+from . import hbonds
+from . import hbonds_c
+from . import ion
+from . import pool
+from . import radial
+from . import radial_c
+from . import tra
+from . import water
+
+
+########################################################################################################################
+# ION AND WATER COMPLEX DETECTION AS PART OF THE PIPELINE
+########################################################################################################################
+# INPUT
+# int workers (optional)        number of worker processes; None for number of cores
+# int task (optional)           number of snapshots per task (see WorkerPool.map())
+########################################################################################################################
+class ComplexStage:
+    """
+    Detection of ion and water complexes within the :func:`.pipeline_run`.
+
+    Args:
+        workers (int, optional): default **None** - number of worker processes; **None** uses all cores
+        task (int, optional): default **None** - number of snapshots per task (see :meth:`.WorkerPool.map`)
+
+    All complexes of a snapshot are found by a single call of :func:`.pipeline_rows` in one worker process. The
+    :class:`.WorkerPool` is started with the first block and kept until :meth:`finish`.
+    """
+    def __init__(self, workers=None, task=None):
+        self.workers = workers
+        self.task = task
+        self.pool = None
+        self.tasks = []
+        self.saves = []
+        self.complexes = []
+
+    def add(self, label, rows, kwargs, save, args):
+        """
+        Add a complex detection.
+
+        Args:
+            label (str): name printed to the console (e.g. "ION COMPLEX DETECTION")
+            rows (function): returns the rows of the complex of a snapshot (e.g. :func:`.ion_rows`)
+            kwargs (dict): further arguments of :data:`rows`
+            save (function): saves the complexes (e.g. :func:`.ion_save`)
+            args (tuple): further arguments of :data:`save`
+        """
+        print("%s IN PROGRESS" % label)
+        self.tasks.append((rows, kwargs))
+        self.saves.append((label, save, args))
+        self.complexes.append([])
+
+    def update(self, part, topology, pos, cells):
+        """
+        Detect the complexes of a block of snapshots.
+
+        Args:
+            part (list[:class:`.Snap`]): snapshots of the block
+            topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+            pos (ndarray[float]): MxNx3 array of atomic positions
+            cells (ndarray[float]): Mx3x3 array of unit cells
+        """
+        if self.pool is None:
+            self.pool = pool.WorkerPool(self.workers)
+        rows = self.pool.map(pipeline_rows, part, topology, pos, task=self.task, tasks=self.tasks)
+        for k, complexes in enumerate(self.complexes):
+            complexes += [snap.take(r[k]) for snap, r in zip(part, rows)]
+
+    def finish(self, root, snapshots):
+        """
+        Stop the worker processes and save the complexes.
+
+        Args:
+            root (str): root name of the files
+            snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots used for the detection
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        for (label, save, args), complexes in zip(self.saves, self.complexes):
+            save(root, complexes, *args)
+            print("%s FINISHED" % label)
+
+
+########################################################################################################################
+# RADIAL DISTRIBUTION FUNCTION AS PART OF THE PIPELINE
+########################################################################################################################
+class RadialStage:
+    """
+    Radial distribution function within the :func:`.pipeline_run` (see :func:`.radial_calculate`).
+
+    Args:
+        id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
+        id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        cut (float): cutoff distance for radial calculation
+        nbins (int): number of radius intervals
+    """
+    def __init__(self, id1, id2, cut, nbins):
+        print("RDF CALCULATION IN PROGRESS")
+        self.args = (id1, id2, cut, nbins)
+        self.count = np.zeros(nbins, dtype=np.int64)
+        self.n_snapshots = 0
+        self.inv_volume = 0.0
+        self.topology = None
+
+    def update(self, part, topology, pos, cells):
+        """
+        Sum the histogram of distances of a block of snapshots (see :meth:`.ComplexStage.update`).
+        """
+        hist, volume = radial.radial_block(topology, pos, cells, *self.args)
+        self.count += hist
+        self.n_snapshots += len(part)
+        self.inv_volume += volume
+        if self.topology is None:
+            self.topology = topology
+
+    def finish(self, root, snapshots):
+        """
+        Normalize and save the radial distribution function (see :meth:`.ComplexStage.finish`).
+        """
+        radius, rdf, coord, rho = radial.radial_normalize(self.count, self.n_snapshots, self.inv_volume,
+                                                          self.topology, *self.args)
+        radial.radial_save(root, radius, rdf, coord, snapshots, *self.args, rho)
+        print("RDF CALCULATION FINISHED")
+
+
+########################################################################################################################
+# ANGLE DISTRIBUTION FUNCTION AS PART OF THE PIPELINE
+########################################################################################################################
+class AngleStage:
+    """
+    Angle distribution function within the :func:`.pipeline_run` (see :func:`.angle_calculate`).
+
+    Args:
+        id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
+        id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        cut (float): cutoff distance for possible neighbors in angle calculation
+        nbins (int): number of degree intervals
+        sinus (bool, optional): default False - weight each angle with its sine
+    """
+    def __init__(self, id1, id2, cut, nbins, sinus=False):
+        print("ADF CALCULATION IN PROGRESS")
+        self.args = (id1, id2, cut, nbins)
+        self.sinus = sinus
+        self.count = np.zeros(nbins, dtype=np.float64 if sinus else np.int64)
+
+    def update(self, part, topology, pos, cells):
+        """
+        Sum the histogram of angles of a block of snapshots (see :meth:`.ComplexStage.update`).
+        """
+        self.count += angle.angle_block(topology, pos, cells, *self.args, sinus=self.sinus)
+
+    def finish(self, root, snapshots):
+        """
+        Normalize and save the angle distribution function (see :meth:`.ComplexStage.finish`).
+        """
+        degree, adf = angle.angle_normalize(self.count, self.args[3])
+        angle.angle_save(root, degree, adf, snapshots, *self.args, sinus=self.sinus)
+        print("ADF CALCULATION FINISHED")
+
+
+########################################################################################################################
+# SAVING OF THE SELECTED SNAPSHOTS AS PART OF THE PIPELINE
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# str fmt (optional)            'binary' (cache) or 'text' (export)
+########################################################################################################################
+class SaveStage:
+    """
+    Saving of the selected snapshots within the :func:`.pipeline_run` (see :func:`.tra_save`).
+
+    Args:
+        root (str): root name for file
+        fmt (str, optional): default "binary" - "binary" for :class:`.TraBin` or "text" for :class:`.TraText`
+
+    Every block is appended to the file while it is read for the analyses, so saving does not need a pass of its own.
+    """
+    def __init__(self, root, fmt='binary'):
+        self.output = tra.TraText(root) if fmt == 'text' else tra.TraBin(root)
+
+    def update(self, part, topology, pos, cells):
+        """
+        Append a block of snapshots to the file (see :meth:`.ComplexStage.update`).
+        """
+        self.output.write(part, topology, pos, cells)
+
+    def finish(self, root, snapshots):
+        """
+        Complete the file (see :meth:`.ComplexStage.finish`).
+        """
+        self.output.close()
+
+
+########################################################################################################################
+# ROWS OF ALL COMPLEXES OF A SINGLE SNAPSHOT
+########################################################################################################################
+# INPUT
+# class Snap snap               single snapshot
+# list tuple tasks              (function, kwargs) of each complex detection (e.g. ion_rows())
+#####
+# OUTPUT
+# list ndarray int              rows of each complex
+########################################################################################################################
+def pipeline_rows(snap, tasks):
+    """
+    Find the rows of all complexes of a single snapshot (see :class:`.ComplexStage`).
+
+    Args:
+        snap (:class:`.Snap`): single snapshot containing the atomic information
+        tasks (list[tuple]): function (e.g. :func:`.ion_rows`) and its further arguments for each complex
+
+    Returns:
+        list[ndarray[int]]: rows of each complex in :data:`snap`
+    """
+    return [rows(snap, **kwargs) for rows, kwargs in tasks]
+
+
+########################################################################################################################
+# SUBSET OF SNAPSHOTS USED BY AN ANALYSIS
+########################################################################################################################
+def pipeline_subset(snapshots, mask):
+    """
+    Select the snapshots used by an analysis without reading them.
+
+    Args:
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots read by the pipeline
+        mask (ndarray[bool]): snapshots used by the analysis
+
+    Returns:
+        list[:class:`.Snap`], :class:`.TraStream`: selected snapshots
+    """
+    if mask.all():
+        return snapshots
+    if isinstance(snapshots, tra.TraStream):
+        return snapshots.subset(mask)
+    return [snap for snap, used in zip(snapshots, mask) if used]
+
+
+########################################################################################################################
+# PLAN ALL ANALYSES OF THE CONTROL FILE
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# dict scntl                    content of the control file (see scntl_read())
+# list class Snap snapshots     snapshots loaded from file; None to read them from the trajectory file
+#####
+# OUTPUT
+# list tuple                    (snapshots, masks, stages) for each source of snapshots
+########################################################################################################################
+def pipeline_plan(root, scntl, snapshots=None):
+    """
+    Plan all analyses requested in the control file.
+
+    Args:
+        root (str): root name of the files
+        scntl (dict): content of the control file obtained from :func:`.scntl_read`
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`, optional): snapshots loaded from file (see
+            :ref:`Control_TRA`); **None** to read the selection of :ref:`Control_TRA` from the trajectory file
+
+    Returns:
+        list[tuple]: for each source of snapshots a tuple containing the snapshots, a list of masks selecting the
+        snapshots of each frame selection and a list of (selection, stage) tuples
+
+    All frame selections of the trajectory file (:ref:`Control_TRA` and **TRA_EXTRACT** of :ref:`Control_RADIAL`
+    and :ref:`Control_ANGLE`) are merged into a single :class:`.TraStream`. Loaded snapshots form a source of their
+    own.
+    """
+    general = scntl['GENERAL']
+    main = []  # stages using the snapshots of !TRA
+    extract = []  # stages with their own selection of the trajectory file
+    complexes = ComplexStage(workers=general['WORKERS'], task=general['TASK'])
+    # water first: its neighbor list (O-H) usually covers the second neighbor search of the ion complex
+    if '!WATER' in scntl.keys():
+        control = scntl['!WATER']
+        complexes.add("WATER COMPLEX DETECTION", water.water_rows,
+                      dict(id1=control['ID1'], id2=control['ID2'], cut=control['CUT']),
+                      water.water_save, (control['ID1'], control['ID2'], control['CUT']))
+    if '!ION' in scntl.keys():
+        control = scntl['!ION']
+        args = (control['ID1'], control['ID2'], control['ID3'], control['CUT1'], control['CUT2'])
+        complexes.add("ION COMPLEX DETECTION", ion.ion_rows, dict(zip(('id1', 'id2', 'id3', 'cut1', 'cut2'), args)),
+                      ion.ion_save, args)
+    if complexes.tasks:
+        main.append(complexes)
+    if '!TRA' in scntl.keys() and scntl['!TRA']['SAVE']:
+        main.append(SaveStage(root, fmt=scntl['!TRA']['FORMAT']))
+    if '!HBONDS' in scntl.keys():
+        control = scntl['!HBONDS']
+        main.append(hbonds.HbondsCount(control['ID1'], control['ID2'], control['CUT1'], control['CUT2'], control['ANGLE'],
+                                       names=control.get('NAMES', False),
+                                       bonds=root if control.get('BONDS', False) else None,
+                                       correlation=control.get('CORRELATION'), centers=control.get('CENTERS', False)))
+    if '!RADIAL' in scntl.keys():
+        control = scntl['!RADIAL']
+        stage = RadialStage(control['ID1'], control['ID2'], control['CUT'], control['NBINS'])
+        if control['TRA_EXTRACT']:
+            extract.append(((control['T1'], control['T2'], control['N'], None), stage))
+        else:
+            main.append(stage)
+    if '!ANGLE' in scntl.keys():
+        control = scntl['!ANGLE']
+        stage = AngleStage(control['ID1'], control['ID2'], control['CUT'], control['NBINS'], sinus=control['SINUS'])
+        if control['TRA_EXTRACT']:
+            extract.append(((control['T1'], control['T2'], control['N'], None), stage))
+        else:
+            main.append(stage)
+    sources = []
+    selections = []
+    stages = []
+    if snapshots is not None:
+        if main:
+            sources.append((snapshots, [np.ones(len(snapshots), dtype=bool)], [(0, stage) for stage in main]))
+    elif main:
+        selections.append((scntl['!TRA']['T1'], scntl['!TRA']['T2'], scntl['!TRA']['N'], scntl['!TRA']['STRIDE']))
+        stages += [(0, stage) for stage in main]
+    for selection, stage in extract:
+        stages.append((len(selections), stage))
+        selections.append(selection)
+    if selections:
+        stream, masks = tra.tra_iter_union(root, selections, fold=general['PBC_FOLDING'])
+        sources.append((stream, masks, stages))
+    return sources
+
+
+########################################################################################################################
+# RUN ALL ANALYSES OF THE CONTROL FILE IN A SINGLE PASS OVER THE SNAPSHOTS
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# dict scntl                    content of the control file (see scntl_read())
+# list class Snap snapshots     snapshots loaded from file; None to read them from the trajectory file
+# int chunk (optional)          maximum number of snapshots per block
+########################################################################################################################
+def pipeline_run(root, scntl, snapshots=None, chunk=1000):
+    """
+    Run all analyses requested in the control file in a single pass over the snapshots.
+
+    Args:
+        root (str): root name of the files
+        scntl (dict): content of the control file obtained from :func:`.scntl_read`
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`, optional): snapshots loaded from file; **None** to read
+            them from the trajectory file
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_blocks`)
+
+    Every snapshot is read once and handed to all analyses (see :func:`.pipeline_plan`). The output files are the same
+    as those of :func:`.ion_find_parallel`, :func:`.water_find_parallel`, :func:`.hbonds_find_parallel`,
+    :func:`.radial_calculate` and :func:`.angle_calculate`. Reading therefore does not grow with the number of
+    analyses, neither do the neighbor searches if the :class:`.NeighborCache` is enabled (see :func:`.neighbor_cache`).
+    """
+    sources = pipeline_plan(root, scntl, snapshots=snapshots)
+    for source, masks, stages in sources:
+        print("ANALYSIS OF %d SNAPSHOTS IN A SINGLE PASS" % len(source))
+        start = 0
+        for part, topology, pos, cells in tra.tra_blocks(source, chunk):
+            stop = start + len(part)
+            for selection, stage in stages:
+                used = masks[selection][start:stop]
+                if used.all():
+                    stage.update(part, topology, pos, cells)
+                elif used.any():
+                    stage.update([snap for snap, u in zip(part, used) if u], topology, pos[used], cells[used])
+            start = stop
+        for selection, stage in stages:
+            stage.finish(root, pipeline_subset(source, masks[selection]))
+
+
+########################################################################################################################
+# NUMBER OF THREADS OF THE C++ ROUTINES
+########################################################################################################################
+# INPUT
+# int n (optional)              number of threads; 0 keeps OMP_NUM_THREADS or the number of cores
+#####
+# OUTPUT
+# list int                      number of threads used by angle_c, hbonds_c and radial_c
+########################################################################################################################
+def pipeline_threads(n=0):
+    """
+    Set the number of threads used by the C++ routines in :mod:`.angle_c`, :mod:`.hbonds_c` and :mod:`.radial_c`.
+
+    Args:
+        n (int, optional): default 0 - number of threads; 0 keeps the environment variable OMP_NUM_THREADS or the
+            number of cores
+
+    Returns:
+        list[int]: number of threads used by :mod:`.angle_c`, :mod:`.hbonds_c` and :mod:`.radial_c`; 1 for a module
+        compiled without OpenMP
+    """
+    return [module.threads(n) for module in (angle_c, hbonds_c, radial_c)]
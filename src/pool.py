@@ -0,0 +1,368 @@
+"""
+paw_structure.pool
+------------------
+Process pool for the analysis of single snapshots.
+
+The atomic positions of a block of snapshots (see :func:`.tra_blocks`) are written once into a memory mapped temporary
+file which is shared by all worker processes. A task only contains a range of snapshot indices of this block. The
+workers build the snapshots as views on the shared positions and return compact results (e.g. row numbers of atoms)
+instead of whole snapshots.
+
+Main routine is :func:`.pool_map`.
+
+Dependencies:
+    :py:mod:`miniutils`
+    :py:mod:`multiprocessing`
+    :py:mod:`numpy`
+    :py:mod:`os`
+    :py:mod:`pandas`
+    :py:mod:`tempfile`
+    :py:mod:`time`
+    :mod:`.neighbor`
+    :mod:`.tra`
+
+.. autosummary::
+
+    WorkerPool
+    pool_benchmark
+    pool_blocks
+    pool_call
+    pool_map
+    pool_tasks
+    pool_worker
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import miniutils.progress_bar as progress
+# MODULES WITHIN PROJECT
+from . import neighbor
+from . import tra
+
+
+########################################################################################################################
+# POOL OF WORKER PROCESSES KEPT OPEN FOR ALL BLOCKS OF SNAPSHOTS
+########################################################################################################################
+# INPUT
+# int workers (optional)        number of worker processes; None for number of cores
+########################################################################################################################
+class WorkerPool:
+    """
+    Pool of worker processes which share the atomic positions of one block of snapshots at a time.
+
+    Args:
+        workers (int, optional): default **None** - number of worker processes; **None** uses all cores
+
+    The processes are started once and used for all blocks passed to :meth:`map`, so the worker processes and their
+    :class:`.NeighborCache` persist between blocks. :meth:`close` stops them; can be used as context manager. With a
+    single worker no process is started and functions are applied in the current process.
+    """
+    def __init__(self, workers=None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.executor = multiprocessing.Pool(self.workers) if self.workers > 1 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def map(self, func, part, topology, pos, task=None, write=False, **kwargs):
+        """
+        Apply a function to every snapshot of a block (see :func:`.tra_blocks`).
+
+        Args:
+            func (function): function called as func(snap, \*\*kwargs) for each :class:`.Snap`; has to be defined on
+                module level and should return compact results (e.g. row numbers instead of snapshots)
+            part (list[:class:`.Snap`]): snapshots of the block
+            topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+            pos (ndarray[float]): MxNx3 array of atomic positions of the block
+            task (int, optional): default **None** - number of snapshots per task; **None** distributes the block
+                evenly over the workers
+            write (bool, optional): default **False** - copy atomic positions altered by :data:`func` back into the
+                snapshots
+            **kwargs: further arguments passed to :data:`func`
+
+        Returns:
+            list: results of :data:`func` in the order of the snapshots
+
+        Only the positions are copied into the memory mapped file (see :func:`.pool_tasks`). Snapshots are never
+        pickled.
+        """
+        if self.executor is None:
+            return [func(snap, **kwargs) for snap in part]
+        results = []
+        with tempfile.NamedTemporaryFile(prefix='paw_structure_', suffix='.pos') as f:
+            shared = np.memmap(f.name, dtype=np.float64, mode='w+', shape=pos.shape)
+            shared[:] = pos
+            shared.flush()
+            tasks = pool_tasks(func, kwargs, f.name, part, topology, self.workers, task)
+            for result, hits, misses in progress.progbar(self.executor.imap(pool_worker, tasks), total=len(tasks)):
+                results += result
+                # neighbor lists searched by the worker processes (see NeighborCache.count())
+                if neighbor.cache is not None:
+                    neighbor.cache.count(hits, misses)
+            if write:
+                for snap, snap_pos in zip(part, shared):
+                    snap.pos[:] = snap_pos
+            del shared
+        return results
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.close()
+            self.executor.join()
+            self.executor = None
+
+
+########################################################################################################################
+# APPLY FUNCTION TO EVERY SNAPSHOT BLOCK BY BLOCK USING A POOL OF PROCESSES WITH SHARED ATOMIC POSITIONS
+########################################################################################################################
+# INPUT
+# function func                 function applied to each snapshot (func(snap, **kwargs)); defined on module level
+# list class Snap snapshots     snapshots (or TraStream)
+# int chunk (optional)          maximum number of snapshots per block (see tra_blocks())
+# int workers (optional)        number of worker processes; None for number of cores
+# int task (optional)           number of snapshots per task; None distributes each block evenly over the workers
+# bool write (optional)         copy atomic positions changed by func back into the snapshots
+# dict kwargs                   further arguments of func
+#####
+# OUTPUT
+# generator                     tuples (snapshots, results of func) of each block
+########################################################################################################################
+def pool_blocks(func, snapshots, chunk=1000, workers=None, task=None, write=False, **kwargs):
+    """
+    Apply a function to every snapshot block by block using a single :class:`.WorkerPool`.
+
+    Args:
+        func (function): function called as func(snap, \*\*kwargs) for each :class:`.Snap`; has to be defined on module
+            level and should return compact results (e.g. row numbers instead of snapshots)
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_blocks`)
+        workers (int, optional): default **None** - number of worker processes; **None** uses all cores
+        task (int, optional): default **None** - number of snapshots per task; **None** distributes each block evenly
+            over the workers
+        write (bool, optional): default **False** - copy atomic positions altered by :data:`func` back into the
+            snapshots
+        **kwargs: further arguments passed to :data:`func`
+
+    Returns:
+        generator: tuples containing the list of :class:`.Snap` objects of a block and the results of :data:`func`
+        for them
+    """
+    with WorkerPool(workers) as executor:
+        for part, topology, pos, cells in tra.tra_blocks(snapshots, chunk):
+            yield part, executor.map(func, part, topology, pos, task=task, write=write, **kwargs)
+
+
+########################################################################################################################
+# APPLY FUNCTION TO EVERY SNAPSHOT USING A POOL OF PROCESSES WITH SHARED ATOMIC POSITIONS
+########################################################################################################################
+# INPUT
+# function func                 function applied to each snapshot (func(snap, **kwargs)); defined on module level
+# list class Snap snapshots     snapshots (or TraStream)
+# int chunk (optional)          maximum number of snapshots per block (see tra_blocks())
+# int workers (optional)        number of worker processes; None for number of cores
+# int task (optional)           number of snapshots per task; None distributes each block evenly over the workers
+# bool write (optional)         copy atomic positions changed by func back into the snapshots
+# dict kwargs                   further arguments of func
+#####
+# OUTPUT
+# list                          results of func for each snapshot
+########################################################################################################################
+def pool_map(func, snapshots, chunk=1000, workers=None, task=None, write=False, **kwargs):
+    """
+    Apply a function to every snapshot using a pool of processes which share the atomic positions.
+
+    Args:
+        func (function): function called as func(snap, \*\*kwargs) for each :class:`.Snap`; has to be defined on module
+            level and should return compact results (e.g. row numbers instead of snapshots)
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_blocks`)
+        workers (int, optional): default **None** - number of worker processes; **None** uses all cores
+        task (int, optional): default **None** - number of snapshots per task; **None** distributes each block evenly
+            over the workers
+        write (bool, optional): default **False** - copy atomic positions altered by :data:`func` back into the
+            snapshots
+        **kwargs: further arguments passed to :data:`func`
+
+    Returns:
+        list: results of :data:`func` in the order of the snapshots
+
+    The worker processes are started once for all blocks (see :func:`.pool_blocks`). Only the positions of each block
+    are copied into the memory mapped file (see :func:`.pool_tasks`). Snapshots are never pickled. With a single
+    worker :data:`func` is applied in the current process.
+    """
+    results = []
+    for part, result in pool_blocks(func, snapshots, chunk=chunk, workers=workers, task=task, write=write, **kwargs):
+        results += result
+    return results
+
+
+########################################################################################################################
+# SPLIT A BLOCK OF SNAPSHOTS INTO TASKS FOR THE WORKER PROCESSES
+########################################################################################################################
+# INPUT
+# function func                 function applied to each snapshot
+# dict kwargs                   further arguments of func
+# str path                      memory mapped file with the atomic positions of the block
+# list class Snap part          snapshots of the block
+# class Topology topology       atom identifiers shared by the snapshots of the block
+# int workers                   number of worker processes
+# int task                      number of snapshots per task; None distributes the block evenly over the workers
+#####
+# OUTPUT
+# list tuple                    arguments of pool_worker() for each task
+########################################################################################################################
+def pool_tasks(func, kwargs, path, part, topology, workers, task=None):
+    """
+    Split a block of snapshots into tasks for :func:`.pool_worker`.
+
+    Args:
+        func (function): function applied to each snapshot
+        kwargs (dict): further arguments of :data:`func`
+        path (str): memory mapped file with the atomic positions of the block
+        part (list[:class:`.Snap`]): snapshots of the block
+        topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+        workers (int): number of worker processes
+        task (int, optional): default **None** - number of snapshots per task; **None** distributes the block evenly
+            over the workers
+
+    Returns:
+        list[tuple]: arguments of :func:`.pool_worker` for each task
+
+    Besides the index range a task only carries iterations, times and unit cells of its snapshots and the topology.
+    """
+    if task is None:
+        task = -(-len(part) // workers)
+    shape = (len(part), len(topology), 3)
+    tasks = []
+    for start in range(0, len(part), task):
+        stop = min(start + task, len(part))
+        snap = part[start:stop]
+        tasks.append((func, kwargs, path, shape, topology, start, [s.iter for s in snap], [s.time for s in snap],
+                      [s.cell for s in snap]))
+    return tasks
+
+
+########################################################################################################################
+# WORKER PROCESSING A RANGE OF SNAPSHOTS FROM THE SHARED ATOMIC POSITIONS
+########################################################################################################################
+# INPUT
+# tuple args                    task created by pool_tasks()
+#####
+# OUTPUT
+# list                          results of func for each snapshot of the task
+# int hits                      hits of the NeighborCache of the worker process during the task
+# int misses                    misses of the NeighborCache of the worker process during the task
+########################################################################################################################
+def pool_worker(args):
+    """
+    Apply a function to a range of snapshots of the shared atomic positions.
+
+    Args:
+        args (tuple): task created by :func:`.pool_tasks`
+
+    Returns:
+        (tuple): tuple containing the results of the function for each snapshot of the task and the hits and misses of
+        the :class:`.NeighborCache` of the worker process during the task (0 if disabled)
+    """
+    func, kwargs, path, shape, topology, start, iters, times, cells = args
+    cache = neighbor.cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    shared = np.memmap(path, dtype=np.float64, mode='r+', shape=shape)
+    results = []
+    for i in range(len(times)):
+        snap = tra.Snap(iters[i], times[i], cells[i], shared[start + i], topology)
+        results.append(func(snap, **kwargs))
+    shared.flush()
+    if cache is None:
+        return results, 0, 0
+    return results, cache.hits - hits, cache.misses - misses
+
+
+########################################################################################################################
+# COMPARE POOL WITH SHARED ATOMIC POSITIONS TO PICKLING OF SNAPSHOTS
+########################################################################################################################
+# INPUT
+# function func                 function applied to each snapshot by pool_map() (e.g. water_rows())
+# function reference            function applied to each pickled snapshot (e.g. water_single())
+# int n_snapshots (optional)    number of snapshots
+# int n_atoms (optional)        number of atoms per snapshot
+# int workers (optional)        number of worker processes
+# dict kwargs                   further arguments of func and reference
+#####
+# OUTPUT
+# tuple float                   time [s] with pickled snapshots and with shared atomic positions
+########################################################################################################################
+def pool_benchmark(func, reference, n_snapshots=1000, n_atoms=1000, workers=None, **kwargs):
+    """
+    Compare :func:`.pool_map` with a process pool receiving and returning pickled snapshots.
+
+    Args:
+        func (function): function applied to each snapshot by :func:`.pool_map` (e.g. :func:`.water_rows`)
+        reference (function): function applied to each pickled snapshot (e.g. :func:`.water_single`)
+        n_snapshots (int, optional): default 1000 - number of snapshots
+        n_atoms (int, optional): default 1000 - number of atoms per snapshot; rounded down to whole water molecules
+        workers (int, optional): default **None** - number of worker processes; **None** uses all cores
+        **kwargs: further arguments passed to :data:`func` and :data:`reference` (e.g. id1='O\_', id2='H\_')
+
+    Returns:
+        (tuple): tuple containing:
+
+            - float: time [s] if whole snapshots are sent to the workers (like :py:mod:`miniutils`)
+            - float: time [s] of :func:`.pool_map`
+
+    The snapshots contain water molecules ('O\_', 'H\_') on a cubic grid with the density of water.
+
+    Example::
+
+        pool.pool_benchmark(water.water_rows, water.water_single, id1='O_', id2='H_', cut=1.4)
+    """
+    rng = np.random.default_rng(0)
+    n_water = n_atoms // 3
+    names = [name % i for i in range(n_water) for name in ('O_%d', 'H_%da', 'H_%db')]
+    ids = ['O_', 'H_', 'H_'] * n_water
+    topology = tra.Topology(pd.DataFrame({'name': names, 'id': ids, 'index': np.arange(3 * n_water)}))
+    # oxygen atoms on a cubic grid with the density of water, hydrogen atoms 0.96 A apart in random directions
+    side = int(np.ceil(n_water ** (1.0 / 3.0)))
+    cell = np.eye(3) * side * 3.1
+    grid = np.array(list(np.ndindex(side, side, side)))[:n_water] * 3.1
+    pos = np.empty((n_snapshots, n_water, 3, 3))
+    pos[:, :, 0] = grid + rng.normal(0.0, 0.1, size=(n_snapshots, n_water, 3))
+    for k in (1, 2):
+        direction = rng.normal(size=(n_snapshots, n_water, 3))
+        direction /= np.linalg.norm(direction, axis=2)[:, :, None]
+        pos[:, :, k] = pos[:, :, 0] + 0.96 * direction
+    pos = pos.reshape(n_snapshots, 3 * n_water, 3)
+    snapshots = [tra.Snap(i, 0.01 * i, cell, pos[i], topology) for i in range(n_snapshots)]
+    print("POOL BENCHMARK: %d SNAPSHOTS, %d ATOMS" % (n_snapshots, n_atoms))
+    time1 = time.time()
+    with multiprocessing.Pool(workers) as executor:
+        executor.map(pool_call, [(reference, snap, kwargs) for snap in snapshots])
+    time2 = time.time()
+    pool_map(func, snapshots, workers=workers, **kwargs)
+    time3 = time.time()
+    print("%-24s%12.4f s" % ("PICKLED SNAPSHOTS:", time2 - time1))
+    print("%-24s%12.4f s" % ("SHARED POSITIONS:", time3 - time2))
+    return time2 - time1, time3 - time2
+
+
+def pool_call(args):
+    """
+    Call a function with a single pickled snapshot (reference for :func:`.pool_benchmark`).
+
+    Args:
+        args (tuple): function, :class:`.Snap` and further arguments of the function
+
+    Returns:
+        result of the function
+    """
+    func, snap, kwargs = args
+    return func(snap, **kwargs)
@@ -11,32 +11,33 @@ Utilizes C++ code connected by pybind11_ in :mod:`.radial_c`.
 
 Dependencies:
     :py:mod:`cycler`
-    :py:mod:`functools`
     :py:mod:`matplotlib`
-    :py:mod:`miniutils`
     :py:mod:`numpy`
     :py:mod:`pandas`
     :py:mod:`scipy`
     :py:mod:`seaborn`
     :py:mod:`sys`
     :mod:`.pbc`
+    :mod:`.tra`
     :mod:`.utility`
     :mod:`.radial_c`
 
 .. autosummary::
 
+    radial_block
     radial_calculate
+    radial_count
     radial_integrate
     radial_load
+    radial_normalize
     radial_peak
     radial_plot
+    radial_rows
     radial_save
     radial_single_c
 """
 
 from cycler import cycler
-from functools import partial
-import miniutils.progress_bar as progress
 import matplotlib.pyplot as plt
 import matplotlib
 import numpy as np
@@ -48,6 +49,7 @@ import sys
 from . import utility
 from . import pbc
 from . import radial_c
+from . import tra
 
 
 ########################################################################################################################
@@ -134,38 +136,169 @@ def radial_single(snap, id1, id2, cut, names=None):
     return distances
 
 
-def radial_single_c(snap, id1, id2, cut, names=None):
+def radial_single_c(snap, id1, id2, cut, nbins, names=None):
     """
-    Binding of C++ routines in :mod:`.radial_c` for distance calculation of a single snapshot.
+    Binding of C++ routines in :mod:`.radial_c` for the distance histogram of a single snapshot.
 
     Args:
         snap (:class:`.Snap`): single snapshot containing the atomic information
         id1 (str): identifier for atoms used as center (e.g. 'MN', 'O\_')
-        id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        id2 (str, list[str]): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_'); a list of identifiers
+            gives one partial histogram for each of them
         cut (float): cutoff distance for radial calculation
+        nbins (int): number of radius intervals in [0, :data:`cut`]
         names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
 
     Returns:
-        list[float]: list of distances found which are smaller than :data:`cut`
+        ndarray[int]: number of distances in each radius interval; shape (len(:data:`id2`), nbins) for partial
+        histograms
 
+    Histograms of several snapshots are merged by summation (see :func:`.radial_count`).
+    """
+    rows1, rows2, types2 = radial_rows(snap.topology, id1, id2, names)
+    count = radial_c.radial(snap.pos[rows1].reshape(-1), snap.pos[rows2].reshape(-1), cut, snap.cell.reshape(9), nbins,
+                            types2=types2)
+    return count if types2 is None else count[0]
+
+
+########################################################################################################################
+# ROWS OF CENTER AND NEIGHBOR ATOMS FOR THE C++ ROUTINES
+########################################################################################################################
+# INPUT
+# class Topology topology   atom identifiers of the snapshots
+# str id1                   identifier for atoms used as center (e.g. 'MN', 'H_' or 'O_')
+# str/list str id2          identifier(s) for atoms used as potential neighbors
+# list str names            use names of atoms as center instead of identifiers (replaces id1); None for id1
+#####
+# OUTPUT
+# ndarray int rows1         rows of center atoms
+# ndarray int rows2         rows of neighbor atoms
+# ndarray int types2        index of the identifier in id2 for each neighbor; None if id2 is a single identifier
+########################################################################################################################
+def radial_rows(topology, id1, id2, names=None):
+    """
+    Select center and neighbor atoms for :func:`.radial_c.radial` and :func:`.radial_c.radial_batch`.
+
+    Args:
+        topology (:class:`.Topology`): atom identifiers of the snapshots
+        id1 (str): identifier for atoms used as center (e.g. 'MN', 'O\_')
+        id2 (str, list[str]): identifier(s) for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+
+    Returns:
+        (tuple): tuple containing rows of the center atoms, rows of the neighbor atoms and the position of their
+        identifier in :data:`id2` (**None** if :data:`id2` is a single identifier)
     """
     if names is None:
-        # transform atomic coordinates into necessary shape
-        atoms1 = snap.atoms[snap.atoms['id'] == id1]['pos'].values
-        atoms1 = atoms1.reshape(len(atoms1) * 3)
-        atoms2 = snap.atoms[snap.atoms['id'] == id2]['pos'].values
-        atoms2 = atoms2.reshape(len(atoms2) * 3)
-        cell = snap.cell.reshape(9)
-        dist = radial_c.radial(atoms1, atoms2, cut, cell)
+        rows1 = topology.select(id=id1)
     else:
-        # transform atomic coordinates into necessary shape
-        atoms1 = snap.atoms[snap.atoms['name'].isin(names)]['pos'].values
-        atoms1 = atoms1.reshape(len(atoms1) * 3)
-        atoms2 = snap.atoms[snap.atoms['id'] == id2]['pos'].values
-        atoms2 = atoms2.reshape(len(atoms2) * 3)
-        cell = snap.cell.reshape(9)
-        dist = radial_c.radial(atoms1, atoms2, cut, cell)
-    return dist
+        rows1 = topology.select(names=names)
+    if isinstance(id2, str):
+        return rows1, topology.select(id=id2), None
+    rows2 = [topology.select(id=id) for id in id2]
+    types2 = np.repeat(np.arange(len(id2)), [len(rows) for rows in rows2])
+    return rows1, np.concatenate(rows2).astype(np.int64), types2
+
+
+########################################################################################################################
+# HISTOGRAM OF DISTANCES OF A BLOCK OF SNAPSHOTS
+########################################################################################################################
+# INPUT
+# class Topology topology       atom identifiers shared by the snapshots of the block
+# ndarray float pos             MxNx3 atomic positions
+# ndarray float cells           Mx3x3 unit cells
+# str id1                       identifier for atoms used as center (e.g. 'MN', 'H_' or 'O_')
+# str/list str id2              identifier(s) for atoms used as potential neighbors
+# float cut                     cutoff distance for search
+# int nbins                     number of bins used to sort the data into a histogram
+# list str names (optional)     use names (e.g. 'O_43', 'H_23') of atoms as center instead of identifiers (replaces id1)
+#####
+# OUTPUT
+# ndarray int count             number of distances in each bin
+# float inv_volume              sum of the inverse volumes of the unit cells
+########################################################################################################################
+def radial_block(topology, pos, cells, id1, id2, cut, nbins, names=None):
+    """
+    Histogram of distances of a block of snapshots (see :func:`.tra_blocks`).
+
+    Args:
+        topology (:class:`.Topology`): atom identifiers shared by the snapshots of the block
+        pos (ndarray[float]): MxNx3 array of atomic positions
+        cells (ndarray[float]): Mx3x3 array of unit cells
+        id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
+        id2 (str, list[str]): identifier(s) for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        cut (float): cutoff distance for radial calculation
+        nbins (int): number of radius intervals in [0, :data:`cut`]
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: number of distances in each radius interval (see :func:`.radial_count`)
+            - float: sum of the inverse volumes of the unit cells
+    """
+    rows1, rows2, types2 = radial_rows(topology, id1, id2, names)
+    hist = radial_c.radial_batch(pos, cells, rows1, rows2, cut, nbins, types2=types2)
+    # volume of unit cell of each snapshot (changes for variable cell simulations)
+    return (hist if types2 is None else hist[0]), np.sum(1.0 / np.abs(np.linalg.det(cells)))
+
+
+########################################################################################################################
+# HISTOGRAM OF DISTANCES SUMMED OVER ALL SNAPSHOTS
+########################################################################################################################
+# INPUT
+# list class Snap snapshots     list with all information about atoms
+# str id1                       identifier for atoms used as center (e.g. 'MN', 'H_' or 'O_')
+# str/list str id2              identifier(s) for atoms used as potential neighbors
+# float cut                     cutoff distance for search
+# int nbins                     number of bins used to sort the data into a histogram
+# list str names (optional)     use names (e.g. 'O_43', 'H_23') of atoms as center instead of identifiers (replaces id1)
+# int chunk (optional)          number of snapshots processed at once
+#####
+# OUTPUT
+# ndarray int count             number of distances in each bin
+# int n_snapshots               number of snapshots
+# float inv_volume              sum of the inverse volumes of the unit cells
+# class Topology topology       atom identifiers of the first snapshot
+########################################################################################################################
+def radial_count(snapshots, id1, id2, cut, nbins, names=None, chunk=1000):
+    """
+    Sum the histograms of distances of all snapshots.
+
+    Args:
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
+        id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
+        id2 (str, list[str]): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_'); a list of identifiers
+            gives one partial histogram for each of them
+        cut (float): cutoff distance for radial calculation
+        nbins (int): number of radius intervals in [0, :data:`cut`]
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_blocks`)
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: number of distances in each radius interval; shape (len(:data:`id2`), nbins) for partial
+              histograms
+            - int: number of snapshots
+            - float: sum of the inverse volumes of the unit cells
+            - :class:`.Topology`: atom identifiers of the first snapshot
+
+    Each block of snapshots is passed to :func:`.radial_c.radial_batch` at once which returns only the histogram
+    of its distances. Memory does not grow with the number of snapshots.
+    """
+    count = np.zeros(nbins if isinstance(id2, str) else (len(id2), nbins), dtype=np.int64)
+    n_snapshots = 0
+    inv_volume = 0.0
+    first = None
+    for part, topology, pos, cells in tra.tra_blocks(snapshots, chunk):
+        hist, volume = radial_block(topology, pos, cells, id1, id2, cut, nbins, names=names)
+        count += hist
+        n_snapshots += len(part)
+        inv_volume += volume
+        if first is None:
+            first = topology
+    return count, n_snapshots, inv_volume, first
 
 
 ########################################################################################################################
@@ -175,7 +308,7 @@ def radial_single_c(snap, id1, id2, cut, names=None):
 # INPUT
 # list class Snap snapshots     list with all information about atoms
 # str id1                       identifier for atoms used as center (e.g. 'MN', 'H_' or 'O_')
-# str id2                       identifier for atoms used as potential neighbors
+# str/list str id2              identifier(s) for atoms used as potential neighbors
 # float cut                     cutoff distance for search
 # int nbins                     number of bins used to sort the data into a histogram
 # list str names (optional)     use names (e.g. 'O_43', 'H_23') of atoms as center instead of identifiers (replaces id1)
@@ -183,65 +316,105 @@ def radial_single_c(snap, id1, id2, cut, names=None):
 # OUTPUT
 # ndarray float radius          different radii from radial distribution function calculation
 # ndarray float rdf             radial distribution function corresponding to radii
-# float rho                     overall density of atom type id2 (needed for later integration)
+# float/ndarray float rho       overall density of atom type(s) id2 (needed for later integration)
 ########################################################################################################################
-def radial_calculate(snapshots, id1, id2, cut, nbins, names=None):
+def radial_calculate(snapshots, id1, id2, cut, nbins, names=None, chunk=1000):
     """
     Calculate the radial distribution function (rdf) including multiple snapshots.
 
     Args:
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the atomic information
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
         id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
-        id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        id2 (str, list[str]): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_'); a list of identifiers
+            gives one partial rdf for each of them
         cut (float): cutoff distance for radial calculation
         nbins (int): number of radius intervals; influences resolutions together with :data:`cut`
-        names (list[str], optional): NOT IN USE; names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23') instead of all atoms
+            of type :data:`id1`
+        chunk (int, optional): default 1000 - number of snapshots processed at once (see :func:`.tra_chunk`)
 
     Returns:
         (tuple): tuple containing:
 
             - ndarray[float]: radii used for rdf calculation
-            - ndarray[float]: value of rdf corresponding to these radii
-            - ndarray[float]: value of coordination number corresponding to these radii
-            - float: average atom density of type :data:`id2`
+            - ndarray[float]: value of rdf corresponding to these radii; shape (len(:data:`id2`), nbins) for partial
+              rdfs
+            - ndarray[float]: value of coordination number corresponding to these radii; same shape as the rdf
+            - float: average atom density of type :data:`id2`; ndarray[float] with shape (len(:data:`id2`), 1) holding
+              the density of each identifier for partial rdfs
+
+    The density is averaged over the unit cells of all snapshots. Each partial rdf is normalized with the density of
+    its own identifier.
+    The histograms of all snapshots are summed by :func:`.radial_count`.
 
     Todo:
-        Implement usage of :data:`names`.
         Make single snapshot possible.
     """
     print("RDF CALCULATION IN PROGRESS")
+    count, n_snapshots, inv_volume, first = radial_count(snapshots, id1, id2, cut, nbins, names=names, chunk=chunk)
+    radius, rdf, coord, rho = radial_normalize(count, n_snapshots, inv_volume, first, id1, id2, cut, nbins,
+                                               names=names)
+    print("RDF CALCULATION FINISHED")
+    return radius, rdf, coord, rho
 
-    # calculate distances
 
-    # Python code
-    # multi_one = partial(radial_single, id1=id1, id2=id2, cut=cut, names=names)
-    # C++ code
-    multi_one = partial(radial_single_c, id1=id1, id2=id2, cut=cut, names=names)
-    radial_dist = progress.parallel_progbar(multi_one, snapshots)
+########################################################################################################################
+# NORMALIZE HISTOGRAM OF DISTANCES TO RADIAL DISTRIBUTION FUNCTION
+########################################################################################################################
+# INPUT
+# ndarray int count             number of distances in each bin summed over all snapshots
+# int n_snapshots               number of snapshots
+# float inv_volume              sum of the inverse volumes of the unit cells
+# class Topology first          atom identifiers of the first snapshot
+# str id1                       identifier for atoms used as center (e.g. 'MN', 'H_' or 'O_')
+# str/list str id2              identifier(s) for atoms used as potential neighbors
+# float cut                     cutoff distance for search
+# int nbins                     number of bins used to sort the data into a histogram
+# list str names (optional)     use names (e.g. 'O_43', 'H_23') of atoms as center instead of identifiers (replaces id1)
+#####
+# OUTPUT
+# ndarray float radius          different radii from radial distribution function calculation
+# ndarray float rdf             radial distribution function corresponding to radii
+# ndarray float coord           coordination number corresponding to radii
+# float/ndarray float rho       overall density of atom type(s) id2 (needed for later integration)
+########################################################################################################################
+def radial_normalize(count, n_snapshots, inv_volume, first, id1, id2, cut, nbins, names=None):
+    """
+    Normalize the summed histogram of distances to the radial distribution function (rdf).
+
+    Args:
+        count (ndarray[int]): number of distances in each radius interval obtained from :func:`.radial_count`
+        n_snapshots (int): number of snapshots
+        inv_volume (float): sum of the inverse volumes of the unit cells
+        first (:class:`.Topology`): atom identifiers of the first snapshot
+        id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
+        id2 (str, list[str]): identifier(s) for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        cut (float): cutoff distance for radial calculation
+        nbins (int): number of radius intervals
+        names (list[str], optional): names of atoms to use as centers (e.g. 'O\_43', 'H\_23')
 
-    # combine the list of lists into a flat array
-    radial_dist = np.array([y for x in radial_dist for y in x])
-    # TODO: only works if N > 1
-    # sort data in a histogram
-    hist = np.histogram(radial_dist, bins=nbins, range=(0.0, cut), normed=False)
+    Returns:
+        (tuple): tuple containing radii, rdf, coordination number and average atom density of type :data:`id2` (see
+        :func:`.radial_calculate`); for a list of identifiers the densities have shape (len(:data:`id2`), 1)
+    """
     # extract radius and radial distribution function
-    rdf = hist[0]
-    radius = hist[1][1:]
+    rdf = count
+    radius = np.linspace(0.0, cut, nbins + 1)[1:]
     # account for multiple reference centers and multiple snapshots
     if names is None:
-        rdf = rdf / len(snapshots) / len(snapshots[0].atoms[snapshots[0].atoms['id'] == id1])
+        rdf = rdf / n_snapshots / len(first.select(id=id1))
+    else:
+        rdf = rdf / n_snapshots / len(first.select(names=names))
+    # average density of neighbor atoms (id2); one density per identifier for partial rdfs
+    if isinstance(id2, str):
+        rho = len(first.select(id=id2)) * inv_volume / n_snapshots
     else:
-        rdf = rdf / len(snapshots) / len(snapshots[0].atoms[snapshots[0].atoms['name'].isin(names)])
-    # volume of unit cell
-    v_unit = np.linalg.det(snapshots[0].cell)  # not sure if correct for non orthogonal vectors
-    # density of neighbor atoms (id2)
-    rho = len(snapshots[0].atoms[snapshots[0].atoms['id'] == id2]) / v_unit
+        rho = np.array([[len(first.select(id=id)) * inv_volume / n_snapshots] for id in id2])
     volume = np.linspace(0.0, cut, nbins + 1)  # array of radii
     volume = 4.0 / 3.0 * np.pi * volume * volume * volume  # volume for each radius
     volume = np.diff(volume)  # difference of volumes to the previous radius
     rdf = rdf / volume / rho  # normalize rdf
     coord = radial_integrate(radius, rdf, rho)
-    print("RDF CALCULATION FINISHED")
     return radius, rdf, coord, rho
 
 
@@ -251,7 +424,7 @@ def radial_calculate(snapshots, id1, id2, cut, nbins, names=None):
 # INPUT
 # ndarray float radius          different radii from radial distribution function calculation
 # ndarray float rdf             radial distribution function corresponding to radii
-# float rho                     overall density of atom type id2 (needed for later integration)
+# float/ndarray float rho       overall density of atom type(s) id2 (needed for later integration)
 #####
 # OUTPUT
 # ndarray float integration     coordination number for different radii
@@ -266,8 +439,9 @@ def radial_integrate(radius, rdf, rho):
 
     Args:
         radius (ndarray[float]): radii used for rdf calculation
-        rdf (ndarray[float]): value of rdf corresponding to these radii
-        rho (float): average atom density of type :data:`id2`
+        rdf (ndarray[float]): value of rdf corresponding to these radii; one row per partial rdf
+        rho (float, ndarray[float]): average atom density of type :data:`id2`; shape (len(:data:`id2`), 1) for
+            partial rdfs
 
     Returns:
         ndarray[float]: value of integration corresponding to the radii
@@ -393,10 +567,10 @@ def radial_peak(radius, rdf):
 # ndarray float rdf             radial distribution function corresponding to radii
 # ndarray float coord           coordination number corresponding to radii
 # str id1                       identifier for atoms used as center (e.g. 'MN', 'H_' or 'O_')
-# str id2                       identifier for atoms used as potential neighbors
+# str/list str id2              identifier(s) for atoms used as potential neighbors
 # float cut                     cutoff distance for search
 # int nbins                     number of bins used to sort the data into a histogram
-# float rho                     overall density of atom type id2 (needed for later integration)
+# float/ndarray float rho       overall density of atom type(s) id2 (needed for later integration)
 # str ext (optional)            extension for the saved file: name = root + ext
 ########################################################################################################################
 def radial_save(root, radius, rdf, coord, snapshots, id1, id2, cut, nbins, rho, ext='.radial'):
@@ -406,15 +580,21 @@ def radial_save(root, radius, rdf, coord, snapshots, id1, id2, cut, nbins, rho,
     Args:
         root (str): root name for saving file
         radius (ndarray[float]): radii used for rdf calculation
-        rdf (ndarray[float]): value of rdf corresponding to these radii
-        coord (ndarray[float]): coordination number obtained from integration of rdf
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the water complexes
+        rdf (ndarray[float]): value of rdf corresponding to these radii; shape (len(:data:`id2`), nbins) for partial
+            rdfs
+        coord (ndarray[float]): coordination number obtained from integration of rdf; same shape as the rdf
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots used for the calculation
         id1 (str): identifier for atoms used as centers (e.g. 'MN', 'O\_')
-        id2 (str): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_')
+        id2 (str, list[str]): identifier for atoms as possible neighbors (e.g. 'O\_', 'H\_'); a list of identifiers
+            for partial rdfs
         cut (float): cutoff distance for radial calculation
         nbins (int): number of radius intervals; influences resolutions together with :data:`cut`
-        rho (float): average atom density of type :data:`id2`
+        rho (float, ndarray[float]): average atom density of type :data:`id2`; one density per identifier for partial
+            rdfs
         ext (str, optional): default ".radial" - extension for the saved file: name = root + ext
+
+    Partial rdfs get one value of **RHO** per identifier and the columns RDF_<id2> and COORD_<id2> for each
+    identifier.
     """
     # open file
     path = root + ext
@@ -429,14 +609,23 @@ def radial_save(root, radius, rdf, coord, snapshots, id1, id2, cut, nbins, rho,
     f.write("%-14s%14.8f\n" % ("T2", snapshots[-1].time))
     f.write("%-14s%14d\n" % ("SNAPSHOTS", len(snapshots)))
     f.write("%-14s%14s\n" % ("ID1", id1))
-    f.write("%-14s%14s\n" % ("ID2", id2))
+    ids = [id2] if isinstance(id2, str) else list(id2)
+    f.write("%-14s" % "ID2" + ("%14s" * len(ids)) % tuple(ids) + "\n")
     f.write("%-14s%14.8f\n" % ("CUT", cut))
     f.write("%-14s%14d\n" % ("NBINS", nbins))
-    f.write("%-14s%14.8f\n" % ("RHO", rho))
+    rho = np.ravel(rho)
+    f.write("%-14s" % "RHO" + ("%14.8f" * len(rho)) % tuple(rho) + "\n")
     f.write("%-14s\n" % "UNIT CELL")
     np.savetxt(f, snapshots[0].cell, fmt="%14.8f")
-    f.write("\n%14s%14s%14s\n" % ("RADIUS", "RDF", "COORDINATION"))
-    data = np.vstack((radius, rdf, coord))
+    tra.tra_cells_write(f, snapshots)
+    if isinstance(id2, str):
+        f.write("\n%14s%14s%14s\n" % ("RADIUS", "RDF", "COORDINATION"))
+        data = np.vstack((radius, rdf, coord))
+    else:
+        # rdf and coordination number of each identifier next to each other
+        columns = ["RADIUS"] + [name % id for id in ids for name in ("RDF_%s", "COORD_%s")]
+        f.write("\n" + " ".join("%14s" % column for column in columns) + "\n")
+        data = np.vstack([radius] + [line for pair in zip(rdf, coord) for line in pair])
     np.savetxt(f, data.T, fmt="%14.8f")
     f.close()
     return
@@ -464,8 +653,10 @@ def radial_load(root, ext='.radial'):
     Returns:
         (tuple): tuple containing:
 
-            - ndarray(float): 2D array containing radii, values of rdf and coordination number
-            - float: average atom density of type :data:`id2`
+            - ndarray(float): 2D array containing radii, values of rdf and coordination number; rdf and coordination
+              number of each identifier for partial rdfs
+            - float: average atom density of type :data:`id2`; ndarray[float] with shape (len(:data:`id2`), 1) for
+              partial rdfs
     """
     # open file
     path = root + ext
@@ -481,9 +672,12 @@ def radial_load(root, ext='.radial'):
         if len(text[i]) > 1:
             # find density rho
             if text[i][0] == 'RHO':
-                rho = float(text[i][1])
+                if len(text[i]) == 2:
+                    rho = float(text[i][1])
+                else:  # one density per identifier of partial rdfs
+                    rho = np.array(text[i][1:], dtype=float).reshape(-1, 1)
             # find beginning beginning of data
-            if text[i] == ['RADIUS', 'RDF', 'COORDINATION']:
+            if text[i][0] == 'RADIUS':
                 data = np.array(text[i+1:], dtype=float)
                 break
     return data, rho
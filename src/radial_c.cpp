@@ -1,67 +1,136 @@
 #include <iostream>
 #include <pybind11/pybind11.h>
 #include <pybind11/numpy.h>
-#include <pybind11/stl.h>
 
+#include "batch_c.h"
 #include "calc_c.h"
+#include "cell_c.h"
+#include "hist_c.h"
 #include "pbc_c.h"
+#include "thread_c.h"
 
 
 using namespace std;
 namespace py = pybind11;
 
-py::array_t<double> radial(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell);
-vector<double> * radial_calculate(const double * array1, int len1, const double * array2, int len2, double cut, const double * cell);
+py::array_t<int64_t> radial(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell,
+        int nbins, py::object types1, py::object types2);
+py::array_t<int64_t> radial_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2, double cut,
+        int nbins, py::object types1, py::object types2);
+void radial_histogram(const double * array1, int len1, const double * array2, int len2, double cut, const double * cell,
+        const Histogram & hist, const int * types1, const int * types2, int n_types1, int n_types2, int64_t * count);
+py::array_t<int64_t> radial_result(vector<int64_t> & count, bool partial, int n_types1, int n_types2, int nbins);
 
 
-/* GET DISTANCES FOR RADIAL DISTRIBUTION FUNCTION CALCULATION */
-py::array_t<double> radial(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell){
+/* HISTOGRAM OF DISTANCES FOR RADIAL DISTRIBUTION FUNCTION CALCULATION */
+py::array_t<int64_t> radial(py::array_t<double> array1, py::array_t<double> array2, double cut, py::array_t<double> cell,
+        int nbins, py::object types1, py::object types2){
     py::buffer_info buf1 = array1.request(), buf2 = array2.request(), buf3 = cell.request();
     // check if given numpy arrays have dimension 1 (are flat)
     if(buf1.ndim != 1 || buf2.ndim != 1 || buf3.ndim != 1)
         throw runtime_error("Number of dimensions must be 1.");
+    if(nbins < 1)
+        throw runtime_error("Number of bins must be positive.");
     // obtain pointer on arrays
     const double * ptr1 = (const double *)buf1.ptr;
     const double * ptr2 = (const double *)buf2.ptr;
     const double * ptr3 = (const double *)buf3.ptr;
-    // obtain distances in array
-    vector<double> * distances = radial_calculate(ptr1, buf1.size / 3, ptr2, buf2.size/3, cut, ptr3);
-    // cast to be compatible with Python
-    py::array_t<double> dist = py::cast(distances);
-    // clean memory
-    distances->clear();
-    return dist;
+    int len1 = buf1.size / 3, len2 = buf2.size / 3;
+    vector<int> type1, type2;
+    int n_types1 = batch_types(types1, len1, type1);
+    int n_types2 = batch_types(types2, len2, type2);
+    // sort distances into histogram
+    vector<int64_t> count((size_t)n_types1 * n_types2 * nbins, 0);
+    Histogram hist;
+    hist_init(hist, 0.0, cut, nbins);
+    {
+        py::gil_scoped_release release;
+        radial_histogram(ptr1, len1, ptr2, len2, cut, ptr3, hist, type1.data(), type2.data(), n_types1, n_types2,
+                         count.data());
+    }
+    return radial_result(count, !types1.is_none() || !types2.is_none(), n_types1, n_types2, nbins);
 }
 
 
-// calculate distances
-vector<double> * radial_calculate(const double * array1, int len1, const double * array2, int len2,
-        double cut, const double * cell){
-    vector<double> * distances = new vector<double>;
-    // apply periodic boundary conditions to obtain 3x3 unit cell
-    double * pbc2 = pbc_apply3x3(array2, len2, cell);
-    double center[3], neighbor[3], dist;
-    // loop through center atoms
-    for(int i = 0; i < len1; i++){
-        center[0] = array1[3 * i];
-        center[1] = array1[3 * i + 1];
-        center[2] = array1[3 * i + 2];
-        // for each center atoms loop through possible neighbor atoms
-        for(int j = 0; j < 27 * len2; j++){
-            neighbor[0] = pbc2[3 * j];
-            neighbor[1] = pbc2[3 * j + 1];
-            neighbor[2] = pbc2[3 * j + 2];
-            // calculate distance
-            double * v = calc_dist_vec(center, neighbor);
-            dist = calc_norm(v);
-            delete [] v;
-            // check if distance is within cutoff and avoid self-interaction
-            if(dist < cut && dist > 0.01){
-                distances->push_back(dist);
+/* HISTOGRAM OF DISTANCES FOR A BLOCK OF SNAPSHOTS */
+py::array_t<int64_t> radial_batch(batch_array pos, batch_array cells, batch_index idx1, batch_index idx2, double cut,
+        int nbins, py::object types1, py::object types2){
+    int n_atoms;
+    int n_frames = batch_frames(pos, cells, n_atoms);
+    batch_check_index(idx1, n_atoms);
+    batch_check_index(idx2, n_atoms);
+    if(nbins < 1)
+        throw runtime_error("Number of bins must be positive.");
+    int len1 = idx1.size(), len2 = idx2.size();
+    vector<int> type1, type2;
+    int n_types1 = batch_types(types1, len1, type1);
+    int n_types2 = batch_types(types2, len2, type2);
+    const double * ptr_pos = pos.data();
+    const double * ptr_cells = cells.data();
+    const int64_t * ptr1 = idx1.data();
+    const int64_t * ptr2 = idx2.data();
+    vector<int64_t> count((size_t)n_types1 * n_types2 * nbins, 0);
+    {
+        // loop through snapshots without the Python interpreter
+        py::gil_scoped_release release;
+        Histogram hist;
+        hist_init(hist, 0.0, cut, nbins);
+        ThreadError error;
+        // distribute snapshots over threads, a single snapshot is distributed over its center atoms instead
+        #pragma omp parallel if(n_frames > 1)
+        {
+            vector<double> array1, array2;
+            vector<int64_t> local(count.size(), 0);
+            #pragma omp for schedule(dynamic)
+            for(int f = 0; f < n_frames; f++){
+                error.run([&](){
+                    const double * frame = ptr_pos + 3 * (size_t)n_atoms * f;
+                    batch_gather(frame, ptr1, len1, array1);
+                    batch_gather(frame, ptr2, len2, array2);
+                    radial_histogram(array1.data(), len1, array2.data(), len2, cut, ptr_cells + 9 * f, hist,
+                                     type1.data(), type2.data(), n_types1, n_types2, local.data());
+                });
             }
+            thread_merge(local, count.data());
         }
+        error.rethrow();
     }
-    return distances;
+    return radial_result(count, !types1.is_none() || !types2.is_none(), n_types1, n_types2, nbins);
+}
+
+
+// sort distances into histogram (partial histogram for each pair of types)
+void radial_histogram(const double * array1, int len1, const double * array2, int len2, double cut, const double * cell,
+        const Histogram & hist, const int * types1, const int * types2, int n_types1, int n_types2, int64_t * count){
+    // sort neighbor atoms into cell list
+    CellList list;
+    cell_list_build(list, array2, len2, cell, cut);
+    // distribute center atoms over threads, each thread sorts into its own histogram
+    #pragma omp parallel if(!thread_active())
+    {
+        vector<int64_t> local((size_t)n_types1 * n_types2 * hist.nbins, 0);
+        #pragma omp for schedule(dynamic, 16)
+        for(int i = 0; i < len1; i++){
+            int64_t * partial = local.data() + (size_t)types1[i] * n_types2 * hist.nbins;
+            // for each center atom loop through neighbor atoms within cutoff and avoid self-interaction
+            cell_list_search(list, array1 + 3 * i, cut, 0.01, [&](int j, const double * neighbor, double dist){
+                int index = hist_index(hist, dist);
+                if(index >= 0){
+                    partial[types2[j] * hist.nbins + index]++;
+                }
+            });
+        }
+        thread_merge(local, count);
+    }
+}
+
+
+// copy histogram to numpy array with shape (nbins) or (n_types1, n_types2, nbins) for partial histograms
+py::array_t<int64_t> radial_result(vector<int64_t> & count, bool partial, int n_types1, int n_types2, int nbins){
+    if(partial){
+        return py::array_t<int64_t>({(py::ssize_t)n_types1, (py::ssize_t)n_types2, (py::ssize_t)nbins}, count.data());
+    }
+    return py::array_t<int64_t>(nbins, count.data());
 }
 
 
@@ -88,36 +157,72 @@ PYBIND11_MODULE(radial_c, m){
         Dependencies:
             :py:mod:`numpy`
             :py:mod:`pybind11`
-            :mod:`calc_c.cpp`
+            :mod:`batch_c.h`
+            :mod:`calc_c.h`
+            :mod:`cell_c.cpp`
+            :mod:`hist_c.h`
             :mod:`pbc_c.cpp`
+            :mod:`thread_c.h`
 
         .. autosummary::
 
             calc_dist_vec_c
             calc_norm_c
-            pbc_apply3x3_c
             radial
-            radial_calculate
+            radial_batch
+            radial_histogram
+            threads
     )pbdoc"; // optional module docstring
 
-    m.def("radial", &radial, py::return_value_policy::move, R"pbdoc(
-            Calculate distances from center atoms to possible neighbor atoms which are smaller than a cutoff distance.
+    m.def("radial", &radial, R"pbdoc(
+            Calculate the histogram of distances from center atoms to possible neighbor atoms which are smaller than a
+            cutoff distance.
 
-            Mostly handles connection to Python code. Actual calculation is performed in :func:`.radial_c.radial_calculate`.
+            Mostly handles connection to Python code. Actual calculation is performed in :func:`.radial_c.radial_histogram`.
 
             Args:
                 array1 (ndarray[float]): atomic positions for central atoms
                 array2 (ndarray[float]): atomic positions for neighbor atoms
                 cut (float): cutoff for distance search
                 cell (ndarray[float]): unit cell of the system for periodic boundary conditions
+                nbins (int): number of bins in [0, cut]
+                types1 (ndarray[int], optional): type (0, 1, ...) of each central atom for partial histograms
+                types2 (ndarray[int], optional): type (0, 1, ...) of each neighbor atom for partial histograms
 
             Returns:
-                ndarray[float]: distances obtained for the calculation of the RDF
-        )pbdoc", py::arg("array1"), py::arg("array2"), py::arg("cut"), py::arg("cell")
+                ndarray[int]: number of distances in each bin (same bins as :py:func:`numpy.histogram`);
+                shape (n_types1, n_types2, nbins) if :data:`types1` or :data:`types2` is given
+
+            Histograms of several snapshots are merged by summation.
+        )pbdoc", py::arg("array1"), py::arg("array2"), py::arg("cut"), py::arg("cell"), py::arg("nbins"),
+        py::arg("types1") = py::none(), py::arg("types2") = py::none()
     );
 
-    m.def("radial_calculate", &radial_calculate, R"pbdoc(
-            Actual calculation of distances.
+    m.def("radial_batch", &radial_batch, R"pbdoc(
+            Calculate the histogram of distances from center atoms to possible neighbor atoms for a block of snapshots.
+
+            The snapshots are processed in parallel without holding the Python global interpreter lock.
+            Actual calculation is performed in :func:`.radial_c.radial_histogram`.
+
+            Args:
+                pos (ndarray[float]): atomic positions of all atoms with shape (n_frames, n_atoms, 3)
+                cells (ndarray[float]): unit cells of the snapshots with shape (n_frames, 3, 3)
+                idx1 (ndarray[int]): rows of the central atoms in pos
+                idx2 (ndarray[int]): rows of the neighbor atoms in pos
+                cut (float): cutoff for distance search
+                nbins (int): number of bins in [0, cut]
+                types1 (ndarray[int], optional): type (0, 1, ...) of each central atom in idx1 for partial histograms
+                types2 (ndarray[int], optional): type (0, 1, ...) of each neighbor atom in idx2 for partial histograms
+
+            Returns:
+                ndarray[int]: number of distances in each bin summed over all snapshots (same bins as
+                :py:func:`numpy.histogram`); shape (n_types1, n_types2, nbins) if :data:`types1` or :data:`types2` is given
+        )pbdoc", py::arg("pos"), py::arg("cells"), py::arg("idx1"), py::arg("idx2"), py::arg("cut"), py::arg("nbins"),
+        py::arg("types1") = py::none(), py::arg("types2") = py::none()
+    );
+
+    m.def("radial_histogram", &radial_histogram, R"pbdoc(
+            Sort distances of a single snapshot into a histogram.
 
             Args:
                 array1 (double *): pointer on array with atomic positions for central atoms
@@ -126,31 +231,32 @@ PYBIND11_MODULE(radial_c, m){
                 len2 (int): number of atoms in array2
                 cut (double): cutoff for distance search
                 cell (double *): pointer on array with unit cell of the system for periodic boundary conditions
-
-            Returns:
-                vector<double> *: pointer on double vector with distances obtained for the calculation of the RDF
+                hist (Histogram): bins of the histogram (see :mod:`hist_c.h`)
+                types1 (int *): pointer on array with type of each central atom
+                types2 (int *): pointer on array with type of each neighbor atom
+                n_types1 (int): number of center types
+                n_types2 (int): number of neighbor types
+                count (int64_t *): pointer on array with counts of each pair of types and bin which is increased
 
             Note:
                 C++ only
-        )pbdoc", py::arg("array1"), py::arg("len1"), py::arg("array2"), py::arg("len2"), py::arg("cut"), py::arg("cell")
+        )pbdoc", py::arg("array1"), py::arg("len1"), py::arg("array2"), py::arg("len2"), py::arg("cut"), py::arg("cell"),
+        py::arg("hist"), py::arg("types1"), py::arg("types2"), py::arg("n_types1"), py::arg("n_types2"), py::arg("count")
     );
 
-    m.def("pbc_apply3x3_c", &pbc_apply3x3, R"pbdoc(
-            Apply periodic boundary conditions to obtain 3x3 unit cell.
+    m.def("threads", &thread_count, R"pbdoc(
+            Number of threads used by the parallel C++ routines.
 
             Args:
-                pos (double *): pointer on array with atomic positions
-                len (int): number of atoms in pos
-                cell (double *): pointer on array with unit cell of the system
+                n (int, optional): default 0 - set the number of threads first if positive; otherwise the environment
+                    variable OMP_NUM_THREADS or the number of cores decides
 
             Returns:
-                double *: pointer on array with atomic position of 3x3 unit cell
+                int: number of threads; 1 if the module was compiled without OpenMP
 
             Note:
-                C++ only.
-
-                Source code in file :mod:`pbc_c.cpp`.
-        )pbdoc", py::arg("pos"), py::arg("len"), py::arg("cell")
+                Source code in file :mod:`thread_c.h`.
+        )pbdoc", py::arg("n") = 0
     );
 
     m.def("calc_dist_vec_c", &calc_dist_vec, R"pbdoc(
@@ -159,15 +265,13 @@ PYBIND11_MODULE(radial_c, m){
             Args:
                 pos1 (double *): pointer on array with position of atom 1
                 pos2 (double *): pointer on array with position of atom 2
-
-            Returns:
-                double *: pointer on array with vector between both positions
+                vec (double *): pointer on array with 3 entries which is filled with the vector from pos1 to pos2
 
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
-        )pbdoc", py::arg("pos1"), py::arg("pos2")
+                Source code in file :mod:`calc_c.h`.
+        )pbdoc", py::arg("pos1"), py::arg("pos2"), py::arg("vec")
     );
 
     m.def("calc_norm_c", &calc_norm, R"pbdoc(
@@ -182,7 +286,7 @@ PYBIND11_MODULE(radial_c, m){
             Note:
                 C++ only.
 
-                Source code in file :mod:`calc_c.cpp`.
+                Source code in file :mod:`calc_c.h`.
         )pbdoc", py::arg("vec")
     );
 
@@ -137,8 +137,10 @@ def scntl_read_tra(text, idx):
         'T1': None,
         'T2': None,
         'N': None,
+        'STRIDE': None,
         'SAVE': None,
-        'LOAD': None
+        'LOAD': None,
+        'FORMAT': None
     }
     for line in text:
         if len(line) > 1:
@@ -153,11 +155,26 @@ def scntl_read_tra(text, idx):
         else:
             tra_dict['SAVE'] = False
 
-    # check for load of snapshots, overwrites arguments T1, T2, N
+    # check for format of saved snapshots
+    if tra_dict['FORMAT'] is not None and tra_dict['FORMAT'].casefold() == 'text':
+        tra_dict['FORMAT'] = 'text'
+    else:
+        tra_dict['FORMAT'] = 'binary'
+
+    # check for load of snapshots, overwrites arguments T1, T2, N, STRIDE
     if tra_dict['LOAD'] is None:
         tra_dict['LOAD'] = False
-        if tra_dict['T1'] is None or tra_dict['T2'] is None or tra_dict['N'] is None:
-            utility.err('scntl_read', 0, ['!TRA'], info="T1 T2 N")
+    else:
+        if tra_dict['LOAD'].casefold() == 'true':
+            tra_dict['LOAD'] = True
+        else:
+            tra_dict['LOAD'] = False
+    # check for necessary arguments if snapshots are not loaded
+    if not tra_dict['LOAD']:
+        if tra_dict['T1'] is None or tra_dict['T2'] is None or (tra_dict['N'] is None and tra_dict['STRIDE'] is None):
+            utility.err('scntl_read', 0, ['!TRA'], info="T1 T2 N (OR STRIDE)")
+        if tra_dict['N'] is not None and tra_dict['STRIDE'] is not None:
+            utility.err('scntl_read', 3, ['!TRA'])
         if tra_dict['T1'].casefold() == 'start':
             tra_dict['T1'] = "START"
         else:
@@ -166,24 +183,12 @@ def scntl_read_tra(text, idx):
             tra_dict['T2'] = "END"
         else:
             tra_dict['T2'] = float(tra_dict['T2'])
-        tra_dict['N'] = int(tra_dict['N'])
-    else:
-        if tra_dict['LOAD'].casefold() == 'true':
-            tra_dict['LOAD'] = True
-        else:
-            tra_dict['LOAD'] = False
-            # check for necessary arguments if snapshots are not loaded
-            if tra_dict['T1'] is None or tra_dict['T2'] is None or tra_dict['N'] is None:
-                utility.err('scntl_read', 0, ['!TRA'], info="T1 T2 N")
-            if tra_dict['T1'].casefold() == 'start':
-                tra_dict['T1'] = 'START'
-            else:
-                tra_dict['T1'] = float(tra_dict['T1'])
-            if tra_dict['T2'].casefold() == 'end':
-                tra_dict['T2'] = "END"
-            else:
-                tra_dict['T2'] = float(tra_dict['T2'])
+        if tra_dict['N'] is not None:
             tra_dict['N'] = int(tra_dict['N'])
+        if tra_dict['STRIDE'] is not None:
+            tra_dict['STRIDE'] = int(tra_dict['STRIDE'])
+            if tra_dict['STRIDE'] < 1:
+                utility.err('scntl_read', 2, [tra_dict['STRIDE']])
     return tra_dict
 
 
@@ -271,7 +276,10 @@ def scntl_read_hbonds(text, idx):
         'CUT1': None,
         'CUT2': None,
         'ANGLE': None,
-        'NAMES': None
+        'NAMES': None,
+        'BONDS': None,
+        'CORRELATION': None,
+        'CENTERS': None
         # USED FOR OLD CRITERION
         # 'OO_MIN': None,
         # 'OO_MAX': None,
@@ -299,6 +307,16 @@ def scntl_read_hbonds(text, idx):
         hbonds_dict['ANGLE'] = 30.0
     else:
         hbonds_dict['ANGLE'] = float(hbonds_dict['ANGLE'])
+    if hbonds_dict['BONDS'] is not None and hbonds_dict['BONDS'].casefold() == 'true':
+        hbonds_dict['BONDS'] = True
+    else:
+        hbonds_dict['BONDS'] = False
+    if hbonds_dict['CORRELATION'] is not None:
+        hbonds_dict['CORRELATION'] = int(hbonds_dict['CORRELATION'])
+    if hbonds_dict['CENTERS'] is not None and hbonds_dict['CENTERS'].casefold() == 'true':
+        hbonds_dict['CENTERS'] = True
+    else:
+        hbonds_dict['CENTERS'] = False
 
     # USED FOR OLD CRITERION
     # if hbonds_dict['OO_MIN'] is None:
@@ -398,6 +416,7 @@ def scntl_read_angle(text, idx):
         'ID2': None,
         'CUT': None,
         'NBINS': None,
+        'SINUS': None,
         'T1': None,
         'T2': None,
         'N': None,
@@ -415,6 +434,10 @@ def scntl_read_angle(text, idx):
         angle_dict['NBINS'] = 1000
     else:
         angle_dict['NBINS'] = int(angle_dict['NBINS'])
+    if angle_dict['SINUS'] is not None and angle_dict['SINUS'].casefold() == 'true':
+        angle_dict['SINUS'] = True
+    else:
+        angle_dict['SINUS'] = False
     if angle_dict['ID1'] is None or angle_dict['ID2'] is None:
         utility.err('scntl_read', 0, ['!RADIAL'], info=" ID1 ID2")
     # check for necessary arguments if snapshots are not loaded
@@ -453,7 +476,11 @@ def scntl_read_scntl(text, idx, delete):
     idx_set = set(range(idx[0] + 1, idx[1])) - set(delete)
     control_dict = {
         'ROOT': None,
-        'PBC_FOLDING': None
+        'PBC_FOLDING': None,
+        'THREADS': None,
+        'WORKERS': None,
+        'TASK': None,
+        'NEIGHBOR_CACHE': None
     }
     text = [text[i] for i in idx_set]
     for line in text:
@@ -469,6 +496,14 @@ def scntl_read_scntl(text, idx, delete):
         control_dict['PBC_FOLDING'] = False
     if control_dict['ROOT'] is None:
         control_dict['ROOT'] = False
+    if control_dict['THREADS'] is not None:
+        control_dict['THREADS'] = int(control_dict['THREADS'])
+    if control_dict['WORKERS'] is not None:
+        control_dict['WORKERS'] = int(control_dict['WORKERS'])
+    if control_dict['TASK'] is not None:
+        control_dict['TASK'] = int(control_dict['TASK'])
+    if control_dict['NEIGHBOR_CACHE'] is not None:
+        control_dict['NEIGHBOR_CACHE'] = int(control_dict['NEIGHBOR_CACHE'])
     return control_dict
 
 
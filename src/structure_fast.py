@@ -13,15 +13,11 @@ Data extraction from trajectory file.
 
 Dependencies:
     :py:mod:`sys`
-    :mod:`.angle`
-    :mod:`.hbonds`
-    :mod:`.ion`
-    :mod:`.pbc`
-    :mod:`.radial`
+    :mod:`.neighbor`
+    :mod:`.pipeline`
     :mod:`.scntl`
     :mod:`.tra`
     :mod:`.utility`
-    :mod:`.water`
 
 .. autosummary::
 
@@ -31,15 +27,11 @@ Dependencies:
 import sys
 
 # MODULES WITHIN PROJECT
-from . import angle
-from . import hbonds
-from . import ion
-from . import pbc
-from . import radial
+from . import neighbor
+from . import pipeline
 from .scntl import scntl_read
 from . import tra
 from . import utility
-from . import water
 
 
 import io
@@ -77,71 +69,27 @@ def main():
     else:
         root = scntl_root
 
+    # number of threads for the C++ routines
+    if scntl['GENERAL']['THREADS'] is not None:
+        numbers = pipeline.pipeline_threads(scntl['GENERAL']['THREADS'])
+        if len(set(numbers)) == 1:
+            print("C++ ROUTINES USE %d THREADS" % numbers[0])
+        else:  # modules compiled with and without OpenMP
+            print("C++ ROUTINES USE %d (angle_c), %d (hbonds_c) AND %d (radial_c) THREADS" % tuple(numbers))
+
+    # share neighbor lists between the analyses
+    if scntl['GENERAL']['NEIGHBOR_CACHE']:
+        neighbor.neighbor_cache(scntl['GENERAL']['NEIGHBOR_CACHE'])
+
+    snapshots = None
     if '!TRA' in scntl.keys():
-        # check for LOAD of <root>.snap file, else read trajectory file
+        # check for LOAD of <root>.snap file, else the snapshots are read by the pipeline
         if scntl['!TRA']['LOAD']:
-            snapshots = tra.tra_load(root)
-        else:
-            snapshots = tra.tra_read(root, scntl['!TRA']['T1'], scntl['!TRA']['T2'], scntl['!TRA']['N'])
-
-        # check if atoms project into unit cell
-        if scntl['GENERAL']['PBC_FOLDING']:
-            # pbc.pbc_folding(snapshots)  non-parallel version
-            snapshots = pbc.pbc_folding_parallel(snapshots)
-
-        # check for saving <root>.snap
-        if scntl['!TRA']['SAVE']:
-            tra.tra_save(root, snapshots)
-
-    # check for ION COMPLEX ANALYSIS
-    if '!ION' in scntl.keys():
-        ion.ion_find_parallel(root, snapshots, scntl['!ION']['ID1'], scntl['!ION']['ID2'],
-                                            scntl['!ION']['ID3'], scntl['!ION']['CUT1'], scntl['!ION']['CUT2'])
-
-    # check for WATER COMPLEX ANALYSIS
-    if '!WATER' in scntl.keys():
-        water.water_find_parallel(root, snapshots, scntl['!WATER']['ID1'], scntl['!WATER']['ID2'],
-                                                  cut=scntl['!WATER']['CUT'])
-
-    # check for HYDROGEN BONDS ANALYSIS
-    if '!HBONDS' in scntl.keys():
-        # USED FOR OLD CRITERION
-        # args = [scntl['!HBONDS']['OO_MIN'], scntl['!HBONDS']['OO_MAX'], scntl['!HBONDS']['G_FACTOR'],
-        #         scntl['!HBONDS']['THRESHOLD']]
-        if 'NAMES' in scntl['!HBONDS'].keys():
-            hbonds.hbonds_find_parallel(root, snapshots, scntl['!HBONDS']['ID1'], scntl['!HBONDS']['ID2'],
-                                    scntl['!HBONDS']['CUT1'], scntl['!HBONDS']['CUT2'], scntl['!HBONDS']['ANGLE'],
-                                        names=scntl['!HBONDS']['NAMES'])
-        else:
-            hbonds.hbonds_find_parallel(root, snapshots, scntl['!HBONDS']['ID1'], scntl['!HBONDS']['ID2'],
-                                        scntl['!HBONDS']['CUT1'], scntl['!HBONDS']['CUT2'], scntl['!HBONDS']['ANGLE'])
-
-    # check for RADIAL DISTRIBUTION FUNCTION ANALYSIS
-    if '!RADIAL' in scntl.keys():
-        if scntl['!RADIAL']['TRA_EXTRACT']:
-            snapshots_r = tra.tra_read(root, scntl['!RADIAL']['T1'], scntl['!RADIAL']['T2'], scntl['!RADIAL']['N'])
-            # check if atoms project into unit cell
-            if scntl['GENERAL']['PBC_FOLDING']:
-                # pbc.pbc_folding(snapshots_r) non-parallel version
-                snapshots_r = pbc.pbc_folding_parallel(snapshots_r)
-        else:
-            snapshots_r = snapshots
-        radius, rdf, coord, rho = radial.radial_calculate(snapshots_r, scntl['!RADIAL']['ID1'], scntl['!RADIAL']['ID2'],
-                                       scntl['!RADIAL']['CUT'], scntl['!RADIAL']['NBINS'])
-        radial.radial_save(root, radius, rdf, coord, snapshots_r, scntl['!RADIAL']['ID1'], scntl['!RADIAL']['ID2'],
-                           scntl['!RADIAL']['CUT'], scntl['!RADIAL']['NBINS'], rho)
-
-    # check for ANGLE DISTRIBUTION FUNCTION ANALYSIS
-    if '!ANGLE' in scntl.keys():
-        if scntl['!ANGLE']['TRA_EXTRACT']:
-            snapshots_r = tra.tra_read(root, scntl['!ANGLE']['T1'], scntl['!ANGLE']['T2'], scntl['!ANGLE']['N'])
-            # check if atoms project into unit cell
-            if scntl['GENERAL']['PBC_FOLDING']:
-                # pbc.pbc_folding(snapshots_r) non-parallel version
-                snapshots_r = pbc.pbc_folding_parallel(snapshots_r)
-        else:
-            snapshots_r = snapshots
-        degree, adf = angle.angle_calculate(snapshots_r, scntl['!ANGLE']['ID1'], scntl['!ANGLE']['ID2'],
-                                                          scntl['!ANGLE']['CUT'], scntl['!ANGLE']['NBINS'])
-        angle.angle_save(root, degree, adf, snapshots_r, scntl['!ANGLE']['ID1'], scntl['!ANGLE']['ID2'],
-                           scntl['!ANGLE']['CUT'], scntl['!ANGLE']['NBINS'])
+            snapshots = tra.tra_load(root, fmt=scntl['!TRA']['FORMAT'], fold=scntl['GENERAL']['PBC_FOLDING'])
+
+    # SAVING OF <root>.snap, ION, WATER, HYDROGEN BONDS, RADIAL AND ANGLE DISTRIBUTION FUNCTION IN A SINGLE PASS
+    pipeline.pipeline_run(root, scntl, snapshots=snapshots)
+
+    # statistics of the shared neighbor lists
+    if neighbor.cache is not None:
+        neighbor.cache.report()
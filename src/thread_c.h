@@ -0,0 +1,64 @@
+#ifndef PAW_STRUCTURE_THREAD_C_H
+#define PAW_STRUCTURE_THREAD_C_H
+
+#include <exception>
+#include <vector>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+
+// number of threads used in parallel regions (1 if compiled without OpenMP)
+// n > 0 sets the number of threads first, otherwise OMP_NUM_THREADS or the number of cores is used
+inline int thread_count(int n){
+#ifdef _OPENMP
+    if(n > 0){
+        omp_set_num_threads(n);
+    }
+    return omp_get_max_threads();
+#else
+    return 1;
+#endif
+}
+
+// true inside of an active parallel region; nested regions are then executed by a single thread
+inline bool thread_active(){
+#ifdef _OPENMP
+    return omp_in_parallel();
+#else
+    return false;
+#endif
+}
+
+// exceptions must not leave a parallel region: keep the first one and rethrow it after the region
+struct ThreadError {
+    std::exception_ptr error = nullptr;
+
+    template<typename Function>
+    void run(Function function){
+        try {
+            function();
+        } catch(...) {
+            #pragma omp critical(thread_error)
+            if(!error){
+                error = std::current_exception();
+            }
+        }
+    }
+
+    void rethrow(){
+        if(error){
+            std::rethrow_exception(error);
+        }
+    }
+};
+
+// add thread-local histogram to the shared one
+template<typename T>
+inline void thread_merge(const std::vector<T> & local, T * total){
+    #pragma omp critical(thread_merge)
+    for(size_t i = 0; i < local.size(); i++){
+        total[i] += local[i];
+    }
+}
+
+#endif //PAW_STRUCTURE_THREAD_C_H
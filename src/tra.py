@@ -11,23 +11,151 @@ Dependencies:
 .. autosummary::
 
       Snap
+      Topology
+      TraBin
+      TraStream
+      TraText
+      tra_bin_atoms
+      tra_bin_form
+      tra_bin_select
+      tra_blocks
+      tra_cell_read
+      tra_cell_write
+      tra_cells
+      tra_cells_load
+      tra_cells_write
+      tra_chunk
       tra_clean
+      tra_clean_mask
       tra_detect_change
       tra_extract
+      tra_form
+      tra_frames
+      tra_idx
+      tra_idx_build
+      tra_idx_load
       tra_index
+      tra_iter
+      tra_iter_union
       tra_load
+      tra_load_bin
+      tra_load_text
+      tra_map
       tra_number_atoms
       tra_read
       tra_save
+      tra_save_bin
+      tra_save_text
+      tra_select
       tra_strc_read
 """
 
+import os
+import shutil
 import numpy as np
 import pandas as pd
 # MODULES WITHIN PROJECT
+from . import pbc
 from . import utility
 
 
+TAU = 2.418884E-05  # converts a.u. (time) into ps
+ANGSTROM = 0.52917721  # converts Bohr radius into Angstrom
+
+IDX_MAGIC = b'PAWTRIDX'  # identifier of the trajectory index file
+IDX_VERSION = 1
+# header of the trajectory index file: trajectory size and modification time are used to detect outdated files
+IDX_HEADER = np.dtype([('magic', 'S8'), ('version', '<i4'), ('n_atoms', '<i4'), ('size', '<i8'), ('mtime', '<i8'),
+                       ('count', '<i8')])
+# one entry per record in the trajectory file
+IDX_FORM = np.dtype([('offset', '<i8'), ('iter', '<i4'), ('time', '<f8'), ('superseded', '<u1')])
+
+SNAP_MAGIC = b'PAWSNAPB'  # identifier of the binary snapshot file
+SNAP_VERSION = 1
+# header of the binary snapshot file: 'name' and 'id' give the length of the stored atom names and identifiers
+SNAP_HEADER = np.dtype([('magic', 'S8'), ('version', '<i4'), ('n_atoms', '<i4'), ('count', '<i8'), ('name', '<i4'),
+                        ('id', '<i4')])
+
+
+########################################################################################################################
+# CLASS FOR ATOM IDENTIFIERS SHARED BY SNAPSHOTS
+########################################################################################################################
+# INPUT
+# pandas DataFrame atoms        atomic information (name, id, index) in the order of the atomic positions
+########################################################################################################################
+class Topology:
+    """
+    Atom identifiers shared by snapshots.
+
+    Args:
+        atoms (pandas DataFrame): atomic information ('name', 'id', 'index') in the order of the atomic positions
+
+    Attributes:
+        name (ndarray[str]): names of the atoms (e.g. 'O\_43')
+        id (ndarray[str]): identifiers of the atom species (e.g. 'O\_')
+        index (ndarray[int]): index of the atoms in the trajectory file
+        species (dict): row numbers of the atoms of each species with the identifier as key
+
+    All arrays are read-only. One topology is shared by all snapshots read from the same trajectory.
+    """
+    __slots__ = ('name', 'id', 'index', 'species', '_frame')
+
+    def __init__(self, atoms):
+        self.name = atoms['name'].values.astype(object)
+        self.id = atoms['id'].values.astype(object)
+        self.index = atoms['index'].values.astype(int)
+        self.species = {}
+        for key in np.unique(self.id):
+            self.species[key] = np.flatnonzero(self.id == key)
+            self.species[key].flags.writeable = False
+        for array in (self.name, self.id, self.index):
+            array.flags.writeable = False
+        self._frame = None
+
+    def __len__(self):
+        return len(self.name)
+
+    @property
+    def frame(self):
+        """
+        pandas DataFrame: atomic information ('name', 'id', 'index'); built on first access
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame(data={'name': self.name, 'id': self.id, 'index': self.index})
+        return self._frame
+
+    def select(self, id=None, names=None):
+        """
+        Get row numbers of selected atoms.
+
+        Args:
+            id (str, list[str], optional): identifier(s) of selected atom species (e.g. 'O\_')
+            names (list[str], optional): names of selected atoms (e.g. 'O\_43'); replaces :data:`id`
+
+        Returns:
+            ndarray[int]: row numbers of the atoms in ascending order; all atoms if nothing is selected
+        """
+        if names is not None:
+            return np.flatnonzero(np.isin(self.name, list(names)))
+        if id is None:
+            return np.arange(len(self))
+        if isinstance(id, str):
+            return self.species.get(id, np.zeros(0, dtype=np.int64))
+        return np.flatnonzero(np.isin(self.id, list(id)))
+
+    def take(self, rows):
+        """
+        Create topology of a subset of atoms.
+
+        Args:
+            rows (ndarray[int]): row numbers of the atoms
+
+        Returns:
+            :class:`.Topology`: topology containing only the selected atoms
+        """
+        return Topology(self.frame.iloc[rows])
+
+
 ########################################################################################################################
 # CLASS FOR INFORMATION STORAGE
 ########################################################################################################################
@@ -35,8 +163,8 @@ from . import utility
 # int iter                      iteration of data
 # float time                    time of data
 # ndarray(3,3) cell             unit cell of data
-# ndarray(3,n) pos              atomic positions of data (select **None** if dataframe is given)
-# dict atoms                    atomic information (name, id, index) (select **None** if dataframe is given)
+# ndarray(n,3) pos              atomic positions of data (select **None** if dataframe is given)
+# Topology atoms                atomic information (name, id, index) (select **None** if dataframe is given)
 # pandas DataFrame dataframe    contains atoms and pos input (selection with 'name', 'id', 'index', 'pos')
 # dict hbonds                   hydrogen bond information
 ########################################################################################################################
@@ -50,8 +178,8 @@ class Snap:
         iter (int): iteration in simulation
         time (float): time [ps] in simulation
         cell (ndarray[float]): 3x3 array containing the unit cell of simulation
-        pos (ndarray[float]): 3xN array containing atomic positions (select **None** if :data:`dataframe` is given)
-        atoms (dict): atomic information (name, id, index) (select **None** if :data:`dataframe` is given)
+        pos (ndarray[float]): Nx3 array containing atomic positions (select **None** if :data:`dataframe` is given)
+        atoms (:class:`.Topology`, pandas DataFrame): atomic information (name, id, index) (select **None** if :data:`dataframe` is given)
         dataframe (pandas DataFrame, optional): contains :data:`atoms` and :data:`pos` input (selection with 'name', 'id', 'index', 'pos')
         hbonds (dict, optional): NOT IN USE; hydrogen bond information
 
@@ -59,20 +187,205 @@ class Snap:
         iter (int): see above
         time (float): see above
         cell (ndarray[float]): see above
-        atoms (pandas DataFrame): combination of :data:`atoms` and :data:`pos` input or equal to :data:`dataframe` input if given
+        pos (ndarray[float]): contiguous Nx3 array of atomic positions
+        topology (:class:`.Topology`): atomic information, shared with other snapshots
+        atoms (pandas DataFrame): combination of :data:`topology` and :data:`pos`; built on access
         hbonds (dict, optional): default is **None**
+
+    Snapshots read together (see :class:`.TraStream`) share one topology and their positions are views into one
+    (n_snapshots, N, 3) array. Assigning a DataFrame to :data:`atoms` replaces topology and positions.
     """
+    __slots__ = ('iter', 'time', 'cell', 'pos', 'topology', 'hbonds')
+
     def __init__(self, iter, time, cell, pos, atoms, dataframe=None, hbonds=None):
         self.iter = iter
         self.time = time
         self.cell = cell
         if dataframe is None:  # initialization with numpy array
-            pos = pd.DataFrame(pos, columns=['pos', 'pos', 'pos'], index=atoms.index)
-            self.atoms = pd.concat([atoms, pos], axis=1, sort=False)
+            self.topology = atoms if isinstance(atoms, Topology) else Topology(atoms)
+            self.pos = np.ascontiguousarray(pos, dtype=np.float64).reshape(len(self.topology), 3)
         else:  # initialization with DataFrame
             self.atoms = dataframe
         self.hbonds = hbonds
 
+    def __len__(self):
+        return len(self.topology)
+
+    @property
+    def atoms(self):
+        pos = pd.DataFrame(self.pos, columns=['pos', 'pos', 'pos'])
+        return pd.concat([self.topology.frame, pos], axis=1, sort=False)
+
+    @atoms.setter
+    def atoms(self, dataframe):
+        self.topology = Topology(dataframe)
+        self.pos = np.ascontiguousarray(dataframe['pos'].values, dtype=np.float64).reshape(len(self.topology), 3)
+
+    def select(self, id=None, names=None):
+        """
+        Get positions of selected atoms (see :meth:`.Topology.select`).
+
+        Returns:
+            ndarray[float]: Nx3 array of atomic positions
+        """
+        return self.pos[self.topology.select(id=id, names=names)]
+
+    def take(self, rows):
+        """
+        Create snapshot of a subset of atoms.
+
+        Args:
+            rows (ndarray[int]): row numbers of the atoms
+
+        Returns:
+            :class:`.Snap`: snapshot containing only the selected atoms
+        """
+        return Snap(self.iter, self.time, self.cell, self.pos[rows], self.topology.take(rows))
+
+
+########################################################################################################################
+# LAZY SEQUENCE OF SNAPSHOTS READ FROM THE TRAJECTORY FILE
+########################################################################################################################
+# INPUT
+# memmap data                   records of the trajectory file from tra_map()
+# ndarray int records           positions of the selected records in data
+# Topology atoms                atom identifiers from tra_strc_read()
+# int chunk (optional)          number of records read at once
+# bool fold (optional)          fold atomic positions into the unit cell after reading
+# function select (optional)    reads iterations, times, cells and positions of records (tra_select() or tra_bin_select())
+########################################################################################################################
+class TraStream:
+    """
+    Lazy sequence of snapshots read from the trajectory file on demand.
+
+    Args:
+        data (ndarray): records of the trajectory file obtained from :func:`.tra_map`
+        records (ndarray[int]): positions of the selected records in :data:`data`
+        atoms (:class:`.Topology`, pandas DataFrame): atom identifiers obtained from :func:`.tra_strc_read`
+        chunk (int, optional): default 1000 - number of records read from the file at once
+        fold (bool, optional): default **False** - fold atomic positions into the unit cell with :func:`.pbc_fold`
+        select (function, optional): default :func:`.tra_select` - reads the records; :func:`.tra_bin_select` for
+            records of the binary snapshot file (see :func:`.tra_load_bin`)
+
+    Iterating yields :class:`.Snap` objects one after another while only :data:`chunk` of them are kept in memory.
+    Length, single snapshots (e.g. first and last) and :meth:`chunks` are available without reading the whole
+    selection. Can be used wherever a list of snapshots is only iterated over.
+    """
+    def __init__(self, data, records, atoms, chunk=1000, fold=False, select=None):
+        self.data = data
+        self.records = np.asarray(records, dtype=np.int64)
+        self.topology = atoms if isinstance(atoms, Topology) else Topology(atoms)
+        self.chunk = chunk
+        self.fold = fold
+        self.select = tra_select if select is None else select
+
+    def __len__(self):
+        return len(self.records)
+
+    def _read(self, records):
+        iters, times, cells, pos = self.select(self.data, records)
+        if self.fold:
+            pbc.pbc_fold(pos, cells)  # whole chunk at once
+        return [Snap(iters[i], times[i], cells[i], pos[i], self.topology) for i in range(len(times))]
+
+    def __getitem__(self, i):
+        return self._read(self.records[[i]])[0]
+
+    def cells(self):
+        """
+        Read iterations, times and unit cells of all snapshots without the atomic positions.
+
+        Returns:
+            (tuple): tuple containing arrays with iterations, times [ps] and Nx3x3 unit cells [Angstrom]
+        """
+        iters, times, cells, _ = self.select(self.data, self.records, pos=False)
+        return iters, times, cells
+
+    def subset(self, mask):
+        """
+        Select a subset of the snapshots without reading them.
+
+        Args:
+            mask (ndarray[bool]): selected snapshots
+
+        Returns:
+            :class:`.TraStream`: snapshots selected by :data:`mask`
+        """
+        return TraStream(self.data, self.records[mask], self.topology, chunk=self.chunk, fold=self.fold,
+                         select=self.select)
+
+    def chunks(self):
+        """
+        Generator over lists of at most :data:`chunk` snapshots.
+        """
+        for start in range(0, len(self.records), self.chunk):
+            yield self._read(self.records[start:start + self.chunk])
+
+    def __iter__(self):
+        for snapshots in self.chunks():
+            yield from snapshots
+
+
+def tra_chunk(snapshots, chunk=1000):
+    """
+    Split snapshots into lists of limited length for incremental processing.
+
+    Args:
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): any iterable of snapshots
+        chunk (int, optional): default 1000 - maximum number of snapshots per list
+
+    Returns:
+        generator: lists of at most :data:`chunk` snapshots; :class:`.TraStream` uses its own chunk size
+    """
+    if isinstance(snapshots, TraStream):
+        yield from snapshots.chunks()
+        return
+    part = []
+    for snap in snapshots:
+        part.append(snap)
+        if len(part) == chunk:
+            yield part
+            part = []
+    if part:
+        yield part
+
+
+########################################################################################################################
+# SPLIT SNAPSHOTS INTO BLOCKS OF ARRAYS FOR THE C++ ROUTINES
+########################################################################################################################
+# INPUT
+# list class Snap snapshots     snapshots (or TraStream)
+# int chunk (optional)          maximum number of snapshots per block
+#####
+# OUTPUT
+# generator                     tuples (snapshots, topology, positions, cells) of consecutive snapshots
+########################################################################################################################
+def tra_blocks(snapshots, chunk=1000):
+    """
+    Split snapshots into blocks of arrays which are processed at once by the C++ routines (e.g. :func:`.radial_batch`).
+
+    Args:
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): any iterable of snapshots
+        chunk (int, optional): default 1000 - maximum number of snapshots per block (see :func:`.tra_chunk`)
+
+    Returns:
+        generator: tuples containing the list of :class:`.Snap` objects, their :class:`.Topology`, Mx(N)x3 array of
+        atomic positions and Mx3x3 array of unit cells
+
+    Consecutive snapshots end up in the same block as long as their atoms are identical.
+    """
+    for part in tra_chunk(snapshots, chunk):
+        start = 0
+        for i in range(1, len(part) + 1):
+            if i < len(part) and (part[i].topology is part[start].topology or
+                                  np.array_equal(part[i].topology.name, part[start].topology.name)):
+                continue
+            block = part[start:i]
+            pos = np.stack([snap.pos for snap in block])
+            cells = np.stack([np.asarray(snap.cell, dtype=np.float64).reshape(3, 3) for snap in block])
+            yield block, block[0].topology, pos, cells
+            start = i
+
 
 ########################################################################################################################
 # READ root.strc_out FILE TO OBTAIN ATOM IDENTIFIERS
@@ -124,67 +437,90 @@ def tra_strc_read(root):
 # FIND INDICES OF SNAPSHOTS CLOSEST TO SELECTED TIMES
 ########################################################################################################################
 # INPUT
-# ndarray times     simulation times
-# float t1          beginning of interval
-# float t2          end of interval
-# int n             number of snapshots
+# ndarray times         simulation times
+# float t1              beginning of interval
+# float t2              end of interval
+# int n                 number of snapshots
+# int stride (optional) select every stride-th step in interval instead of n snapshots
 #####
 # OUTPUT
-# list int idx      index of selected snapshots
+# ndarray int idx       index of selected snapshots
 ########################################################################################################################
-def tra_index(times, t1, t2, n):
+def tra_index(times, t1, t2, n, stride=None):
     """
     Indices of snapshots closest to equally spaced times in a given interval.
 
     Args:
-        times (ndarray[float]): simulation times
+        times (ndarray[float]): simulation times (increasing)
         t1 (float): beginning of interval
         t2 (float): end of interval
-        n (int): number of wanted snapshots
+        n (int): number of wanted snapshots (ignored if :data:`stride` is given)
+        stride (int, optional): select every :data:`stride`-th simulation step within the interval instead
 
     Returns:
-        list[int]: index of the selected snapshots
+        ndarray[int]: index of the selected snapshots
 
-    Todo:
-        Check behaviour for when selected snapshots are really close to each other.
+    For each of the :data:`n` equally spaced times the neighboring simulation steps are found by
+    :py:func:`numpy.searchsorted` and the closer one is selected. Every simulation step is only considered for one
+    snapshot time, in the order of the snapshot times. Selecting the same step twice terminates the program.
     """
     times = np.asarray(times)  # times is array of actual simulation times
     # catch wrong input
-    if n > len(times):
+    if stride is None and n > len(times):
         utility.err('tra_index', 0, [n, len(times)])
+    if stride is not None and stride < 1:
+        utility.err('tra_index', 4, [stride])
     if t2 < t1:
         utility.err('tra_index', 1, [t1, t2])
     if t1 < times[0] or t1 > times[-1]:
         utility.err('tra_index', 2, [t1, t2, times[0], times[-1]])
     if t2 > times[-1] or t2 < times[0]:
         utility.err('tra_index', 2, [t1, t2, times[0], times[-1]])
+    if stride is not None:
+        first = np.searchsorted(times, t1, side='left')
+        last = np.searchsorted(times, t2, side='right')
+        return np.arange(first, last, stride)
     snapshot = np.linspace(t1, t2, n)  # equi-distant array of snapshot times
+    # first simulation step not before each snapshot time
+    step = np.maximum(np.searchsorted(times, snapshot, side='left'), 1)
+    # each simulation step is used at most once: step[i] >= step[i-1] + 1
+    counter = np.arange(len(snapshot))
+    step = np.maximum.accumulate(step - counter) + counter
+    snapshot = snapshot[step < len(times)]
+    step = step[step < len(times)]
     # index of simulation step closest to snapshot times
-    counter = 0
-    idx = []
-    for i in range(1, len(times)):
-        if (times[i] - snapshot[counter]) >= 0:
-            if np.abs(times[i-1] - snapshot[counter]) < (times[i] - snapshot[counter]):
-                idx.append(i - 1)
-                counter += 1
-                if counter == len(snapshot):
-                    break
-            else:
-                idx.append(i)
-                counter += 1
-                if counter == len(snapshot):
-                    break
-    if len(idx) > len(set(idx)):
-        utility.err('tra_index', 3, [n, idx[-1] - idx[0]])
-
-    # inefficient version
-    # idx = [(np.abs(times - snap)).argmin() for snap in snapshot]
+    idx = np.where(np.abs(times[step - 1] - snapshot) < (times[step] - snapshot), step - 1, step)
     # catching double selection
-    # if len(idx) > len(set(idx)):
-    #     utility.err('tra_index', 3, [n, idx[-1] - idx[0]])
+    if len(idx) > 1 and (np.diff(idx) == 0).any():
+        utility.err('tra_index', 3, [n, idx[-1] - idx[0]])
     return idx
 
 
+def tra_form(n_atoms):
+    """
+    Record structure of the trajectory file "_r.tra".
+
+    Args:
+        n_atoms (int): number of atoms per snapshot
+
+    Returns:
+        :py:class:`numpy.dtype`: structured data type of a single record in the trajectory file
+
+    For formatting of the trajectory file please see the manual for the CP-PAW_ code by Peter Blöchl.
+
+    .. _CP-PAW: https://www2.pt.tu-clausthal.de/paw/
+    """
+    return np.dtype([('num', np.int32),
+                     ('iter', np.int32),
+                     ('time', np.float64),
+                     ('len', np.int32),
+                     ('cell', np.float64, (3, 3)),  # TODO: not sure if cell is correctly converted or transpose is necessary
+                     ('pos', np.float64, (n_atoms, 3)),
+                     ('q', np.float64, (n_atoms, 1)),
+                     ('qm', np.float64, (n_atoms, 4)),
+                     ('num2', np.int32)])
+
+
 ########################################################################################################################
 # EXTRACT RAW DATA FROM TRAJECTORY FILE
 ########################################################################################################################
@@ -206,51 +542,153 @@ def tra_extract(root, n_atoms):
     Returns:
         ndarray: data structure containing information
 
-    For formatting of the trajectory file please see the manual for the CP-PAW_ code by Peter Blöchl.
-
-    .. _CP-PAW: https://www2.pt.tu-clausthal.de/paw/
+    For formatting of the trajectory file please see :func:`.tra_form`.
 
     The units are transformed into ps (time) and Angstrom (distance) at this step.
 
+    Note:
+        The whole file is read into memory. Use :func:`.tra_map` for large trajectories.
+
     Todo:
         Unit cell reading not clear if correct or transpose (not relevant for simple cubic).
     """
     path = root + '_r.tra'
-    tau = 2.418884E-05  # converts a.u. (time) into ps
-    angstrom = 0.52917721  # converts Bohr radius into Angstrom
     # define structure for reading data
-    form = np.dtype([('num', np.int32),
-                     ('iter', np.int32),
-                     ('time', np.float64),
-                     ('len', np.int32),
-                     ('cell', np.float64, (3, 3)),  # TODO: not sure if cell is correctly converted or transpose is necessary
-                     ('pos', np.float64, (n_atoms, 3)),
-                     ('q', np.float64, (n_atoms, 1)),
-                     ('qm', np.float64, (n_atoms, 4)),
-                     ('num2', np.int32)])
+    form = tra_form(n_atoms)
     try:
         data = np.fromfile(path, dtype=form, count=-1, offset=0)  # read all of root_r.tra file
     except FileNotFoundError:
         utility.err_file('tra_extract', path)
-    data['time'] = data['time'] * tau  # convert times into ps
-    data['cell'] = data['cell'] * angstrom  # convert unit cell into Angstrom
-    data['pos'] = data['pos'] * angstrom # convert atomic positions into Angstrom
+    data['time'] = data['time'] * TAU  # convert times into ps
+    data['cell'] = data['cell'] * ANGSTROM  # convert unit cell into Angstrom
+    data['pos'] = data['pos'] * ANGSTROM # convert atomic positions into Angstrom
     return data
 
 
+########################################################################################################################
+# MAP TRAJECTORY FILE INTO MEMORY WITHOUT READING IT
+########################################################################################################################
+# INPUT
+# str root          root name of the project
+# int n_atoms       number of atoms per snapshot
+#####
+# OUTPUT
+# memmap data       read-only view on the records in the file (atomic units)
+########################################################################################################################
+def tra_map(root, n_atoms):
+    """
+    Memory-map the trajectory file "_r.tra" without reading it.
+
+    Args:
+        root (str): root name of the trajectory file
+        n_atoms (int): number of atoms per snapshot
+
+    Returns:
+        :py:class:`numpy.memmap`: read-only records of the trajectory file with structure :func:`.tra_form`
+
+    Only the parts of the file that are accessed are read from disk. In contrast to :func:`.tra_extract` the values
+    are kept in atomic units, use :func:`.tra_frames` and :func:`.tra_select` for access in ps and Angstrom.
+
+    Note:
+        Incomplete records at the end of the file (e.g. from a running simulation) are ignored.
+    """
+    path = root + '_r.tra'
+    form = tra_form(n_atoms)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        utility.err_file('tra_map', path)
+    count = size // form.itemsize
+    if count == 0:  # empty files can not be mapped
+        return np.zeros(0, dtype=form)
+    return np.memmap(path, dtype=form, mode='r', shape=(count,))
+
+
+def tra_frames(data):
+    """
+    Extract iteration and time of all records without touching the atomic positions.
+
+    Args:
+        data (ndarray): records obtained from :func:`.tra_map`
+
+    Returns:
+        ndarray: structured array with fields 'iter', 'time' [ps] and 'record' (position in :data:`data`)
+    """
+    frames = np.zeros(len(data), dtype=[('iter', np.int32), ('time', np.float64), ('record', np.int64)])
+    frames['iter'] = data['iter']
+    frames['time'] = data['time'] * TAU  # convert times into ps
+    frames['record'] = np.arange(len(data))
+    return frames
+
+
+def tra_select(data, records, pos=True):
+    """
+    Read unit cell and atomic positions of selected records only.
+
+    Args:
+        data (ndarray): records obtained from :func:`.tra_map`
+        records (ndarray[int]): positions of the selected records in :data:`data`
+        pos (bool, optional): default **True** - read atomic positions; **None** is returned instead if **False**
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: iterations of the selected records
+            - ndarray[float]: times [ps] of the selected records
+            - ndarray[float]: Nx3x3 array with unit cells [Angstrom] of the selected records
+            - ndarray[float]: NxMx3 array with atomic positions [Angstrom] of the selected records
+    """
+    records = np.asarray(records, dtype=np.int64)
+    iters = np.array(data['iter'][records])
+    times = data['time'][records] * TAU
+    cells = data['cell'][records] * ANGSTROM
+    if not pos:
+        return iters, times, cells, None
+    pos = data['pos'][records] * ANGSTROM
+    return iters, times, cells, pos
+
+
+def tra_clean_mask(iters):
+    """
+    Find records of the trajectory file which are not overwritten by a later restart of the simulation.
+
+    Args:
+        iters (ndarray[int]): iteration of each record in the order of the trajectory file
+
+    Returns:
+        ndarray[bool]: **True** for records to be kept
+
+    A record is overwritten if any later record has the same or a smaller iteration ("last writer wins"). This is
+    decided in a single pass from the minimum of all following iterations.
+    """
+    iters = np.asarray(iters, dtype=np.int64)
+    keep = np.ones(len(iters), dtype=bool)
+    if len(iters) < 2:
+        return keep
+    # detect negative iteration jumps
+    jumps = np.where(np.diff(iters) < 1)[0]
+    for jump in jumps:
+        print("NEGATIVE ITERATION JUMP IN DATA DETECTED\nFROM %d TO %d\nREMOVING OVERLAP"
+              % (iters[jump], iters[jump + 1]))
+    # smallest iteration appearing after each record
+    later = np.minimum.accumulate(iters[::-1])[::-1]
+    keep[:-1] = iters[:-1] < later[1:]
+    return keep
+
+
 def tra_clean(data):
     """
     Remove doubled simulation time intervals coming from the trajectory file.
 
     Args:
-        data (ndarray): data structure output from :func:`.tra_extract`
+        data (ndarray): data structure output from :func:`.tra_extract` (or any structured array with field 'iter')
 
     Returns:
         ndarray: data structure without doubled simulation times
 
     Occasions where the iteration changes by a value smaller 1 (also negative) are detected. The interval previous to
-    that point which appears a second time later on is deleted. This procedure is recursive such that the latest
-    simulations interval is kept.
+    that point which appears a second time later on is deleted such that the latest simulation interval is kept.
+    The records to be kept are determined by :func:`.tra_clean_mask` and selected at once.
 
     .. figure:: ../Images/tra_clean.png
         :width: 400
@@ -262,25 +700,207 @@ def tra_clean(data):
 
     Note:
         Positive jumps as in skipping iterations steps are not accounted for.
-
-    Todo:
-        Test if more than one jump and convoluted jumps work.
     """
-    # detect negative iteration jumps
-    shift = np.diff(data['iter'])
-    # find position in array
-    jumps = np.where(shift < 1)
-    # if no jumps are found, return
-    if len(jumps[0]) == 0:
+    keep = tra_clean_mask(data['iter'])
+    if keep.all():
         return data
-    # if some are found
-    else:
-        # find position of double before the jump to determine the interval to be deleted
-        overlap = np.where(data['iter'][:jumps[0][0]] == data['iter'][jumps[0][0] + 1])
-        print("NEGATIVE ITERATION JUMP IN DATA DETECTED\nFROM %d TO %d\nREMOVING OVERLAP"
-              % (data['iter'][jumps[0][0]], data['iter'][jumps[0][0] + 1]))
-        # recursively go through all jumps present
-        return tra_clean(np.delete(data, np.s_[overlap[0][0]:jumps[0][0] + 1], 0))
+    return data[keep]
+
+
+########################################################################################################################
+# BUILD INDEX FILE root_r.tra.idx FOR FAST ACCESS OF THE TRAJECTORY FILE
+########################################################################################################################
+# INPUT
+# str root          root name of the project
+# int n_atoms       number of atoms per snapshot
+#####
+# OUTPUT
+# ndarray index     byte offset, iteration, time and restart flag of each record
+########################################################################################################################
+def tra_idx_build(root, n_atoms):
+    """
+    Build the index file "_r.tra.idx" for the trajectory file "_r.tra".
+
+    Args:
+        root (str): root name of the trajectory file
+        n_atoms (int): number of atoms per snapshot
+
+    Returns:
+        ndarray: structured array with fields 'offset' (bytes), 'iter', 'time' [ps] and 'superseded' for every record
+
+    Records which are overwritten by a later restart of the simulation (see :func:`.tra_clean`) are flagged as
+    'superseded'. Only iterations and times are read from the trajectory file.
+
+    The index is written to disk together with size and modification time of the trajectory file. If writing fails,
+    the index is only returned.
+    """
+    print("BUILDING TRAJECTORY INDEX")
+    path = root + '_r.tra'
+    # size and modification time before mapping, so records appended meanwhile invalidate the index
+    try:
+        stat = os.stat(path)
+    except OSError:
+        utility.err_file('tra_idx_build', path)
+    data = tra_map(root, n_atoms)[:stat.st_size // tra_form(n_atoms).itemsize]
+    frames = tra_frames(data)
+    index = np.zeros(len(frames), dtype=IDX_FORM)
+    index['offset'] = frames['record'] * data.dtype.itemsize
+    index['iter'] = frames['iter']
+    index['time'] = frames['time']
+    index['superseded'] = ~tra_clean_mask(frames['iter'])
+    header = np.array([(IDX_MAGIC, IDX_VERSION, n_atoms, stat.st_size, stat.st_mtime_ns, len(index))], dtype=IDX_HEADER)
+    try:
+        with open(path + '.idx', 'wb') as f:
+            header.tofile(f)
+            index.tofile(f)
+    except IOError:
+        print("COULD NOT WRITE INDEX FILE %s" % (path + '.idx'))
+    return index
+
+
+########################################################################################################################
+# LOAD INDEX FILE root_r.tra.idx IF IT IS STILL VALID
+########################################################################################################################
+# INPUT
+# str root          root name of the project
+# int n_atoms       number of atoms per snapshot
+#####
+# OUTPUT
+# ndarray index     byte offset, iteration, time and restart flag of each record (None if missing or outdated)
+########################################################################################################################
+def tra_idx_load(root, n_atoms):
+    """
+    Load the index file "_r.tra.idx" previously created by :func:`.tra_idx_build`.
+
+    Args:
+        root (str): root name of the trajectory file
+        n_atoms (int): number of atoms per snapshot
+
+    Returns:
+        ndarray: index as described in :func:`.tra_idx_build`; **None** if the index file is missing or outdated
+
+    The index is outdated if size or modification time of the trajectory file changed since it was built.
+    """
+    path = root + '_r.tra'
+    try:
+        stat = os.stat(path)
+        header = np.fromfile(path + '.idx', dtype=IDX_HEADER, count=1)
+    except (IOError, ValueError):
+        return None
+    if len(header) != 1:
+        return None
+    header = header[0]
+    if (header['magic'] != IDX_MAGIC or header['version'] != IDX_VERSION or header['n_atoms'] != n_atoms
+            or header['size'] != stat.st_size or header['mtime'] != stat.st_mtime_ns):
+        return None
+    index = np.fromfile(path + '.idx', dtype=IDX_FORM, offset=IDX_HEADER.itemsize)
+    if len(index) != header['count']:
+        return None
+    return index
+
+
+def tra_idx(root, n_atoms):
+    """
+    Obtain the index of the trajectory file "_r.tra".
+
+    Args:
+        root (str): root name of the trajectory file
+        n_atoms (int): number of atoms per snapshot
+
+    Returns:
+        ndarray: index as described in :func:`.tra_idx_build`
+
+    Loads the index file with :func:`.tra_idx_load` and rebuilds it with :func:`.tra_idx_build` if necessary.
+    """
+    index = tra_idx_load(root, n_atoms)
+    if index is None:
+        index = tra_idx_build(root, n_atoms)
+    return index
+
+
+########################################################################################################################
+# SELECT SNAPSHOTS FROM TRAJECTORY FILE FOR READING ON DEMAND
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# float t1                      beginning of interval
+# float t2                      end of interval
+# int n                         number of snapshots
+# int chunk (optional)          number of records read at once
+# int stride (optional)         select every stride-th step instead of n snapshots
+# bool fold (optional)          fold atomic positions into the unit cell after reading
+#####
+# OUTPUT
+# class TraStream snapshots     lazy sequence of the selected snapshots
+########################################################################################################################
+def tra_iter(root, t1, t2, n, chunk=1000, stride=None, fold=False):
+    """
+    Select snapshots from the trajectory file which are read on demand while iterating.
+
+    Args:
+        root (str): root name of the trajectory file
+        t1 (float, "START"): beginning of interval, can be string "START" to select first time available
+        t2 (float, "END"): end of interval, can be string "END" to select last time available
+        n (int): number of wanted snapshots
+        chunk (int, optional): default 1000 - number of snapshots read from the file at once
+        stride (int, optional): select every :data:`stride`-th simulation step instead of :data:`n` snapshots
+        fold (bool, optional): default **False** - fold atomic positions into the unit cell
+
+    Returns:
+        :class:`.TraStream`: snapshots which are read from the trajectory file while iterating
+
+    The selection is done on the index from :func:`.tra_idx`. In contrast to :func:`.tra_read` at most :data:`chunk`
+    snapshots are held in memory at any time.
+    """
+    return tra_iter_union(root, [(t1, t2, n, stride)], chunk=chunk, fold=fold)[0]
+
+
+########################################################################################################################
+# SELECT UNION OF SEVERAL SELECTIONS OF SNAPSHOTS FROM TRAJECTORY FILE FOR READING ON DEMAND
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# list tuple selections         (t1, t2, n, stride) of each selection (see tra_iter())
+# int chunk (optional)          number of records read at once
+# bool fold (optional)          fold atomic positions into the unit cell after reading
+#####
+# OUTPUT
+# class TraStream snapshots     lazy sequence of all selected snapshots in the order of the trajectory
+# list ndarray bool masks       snapshots belonging to each selection
+########################################################################################################################
+def tra_iter_union(root, selections, chunk=1000, fold=False):
+    """
+    Select snapshots of several selections from the trajectory file such that each of them is read only once.
+
+    Args:
+        root (str): root name of the trajectory file
+        selections (list[tuple]): (t1, t2, n, stride) of each selection with the meaning of the arguments of
+            :func:`.tra_iter`
+        chunk (int, optional): default 1000 - number of snapshots read from the file at once
+        fold (bool, optional): default **False** - fold atomic positions into the unit cell
+
+    Returns:
+        (tuple): tuple containing:
+
+            - :class:`.TraStream`: union of all selected snapshots in the order of the trajectory file
+            - list[ndarray[bool]]: snapshots of the union belonging to each selection (see :meth:`.TraStream.subset`)
+    """
+    atoms = tra_strc_read(root)  # get atom identifiers
+    n_atoms = len(atoms['index'].values)  # get number of atoms
+    data = tra_map(root, n_atoms)  # map trajectory file
+    frames = tra_idx(root, n_atoms)  # obtain index of trajectory file
+    frames = frames[frames['superseded'] == 0]  # removed doubled time intervals
+    picks = []
+    for t1, t2, n, stride in selections:
+        if t1 == 'START':
+            t1 = frames['time'][0]
+        if t2 == 'END':
+            t2 = frames['time'][-1]
+        picks.append(tra_index(frames['time'], t1, t2, n, stride=stride))  # select snapshots for analysis
+    union = np.unique(np.concatenate(picks))
+    masks = [np.isin(union, pick) for pick in picks]
+    snapshots = TraStream(data, frames['offset'][union] // data.dtype.itemsize, atoms, chunk=chunk, fold=fold)
+    return snapshots, masks
 
 
 ########################################################################################################################
@@ -291,11 +911,14 @@ def tra_clean(data):
 # float t1                      beginning of interval
 # float t2                      end of interval
 # int n                         number of atoms per snapshot
+# bool mmap (optional)          map trajectory file instead of reading it completely
+# int stride (optional)         select every stride-th step instead of n snapshots
+# bool fold (optional)          fold atomic positions into the unit cell after reading
 #####
 # OUTPUT
 # list class Snap snapshots     list of data structures, each ones describes one snapshot
 ########################################################################################################################
-def tra_read(root, t1, t2, n):
+def tra_read(root, t1, t2, n, mmap=True, stride=None, fold=False):
     """
     Read the trajectory file and extract relevant information for selected snapshots.
 
@@ -304,11 +927,24 @@ def tra_read(root, t1, t2, n):
         t1 (float, "START"): beginning of interval, can be string "START" to select first time available
         t2 (float, "END"): end of interval, can be string "END" to select last time available
         n (int): number of wanted snapshots
+        mmap (bool, optional): default **True** - map the file with :func:`.tra_map` instead of reading it completely
+        stride (int, optional): select every :data:`stride`-th simulation step instead of :data:`n` snapshots
+        fold (bool, optional): default **False** - fold atomic positions into the unit cell with :func:`.pbc_fold`
 
     Returns:
         list[:class:`.Snap`]: snapshots extracted from the trajectory file
+
+    With :data:`mmap` the selection is done by :func:`.tra_iter` on the index from :func:`.tra_idx` and only atomic
+    positions and unit cells of the selected snapshots are read. Memory consumption then scales with :data:`n` instead
+    of the length of the trajectory.
     """
     print("READING TRAJECTORY FILE")
+    if mmap:
+        snapshots = tra_iter(root, t1, t2, n, stride=stride, fold=fold)
+        print("INITIALIZING DATA STRUCTURES")
+        snapshots = list(snapshots)
+        print("FINISHED READING TRAJECTORY FILE")
+        return snapshots
     atoms = tra_strc_read(root)  # get atom identifiers
     n_atoms = len(atoms['index'].values)  # get number of atoms
     data = tra_extract(root, n_atoms)  # read trajectory file
@@ -317,17 +953,97 @@ def tra_read(root, t1, t2, n):
         t1 = data['time'][0]
     if t2 == 'END':
         t2 = data['time'][-1]
-    select = tra_index(data['time'], t1, t2, n)  # select snapshots for analysis
+    select = tra_index(data['time'], t1, t2, n, stride=stride)  # select snapshots for analysis
     data = data[select]
+    if fold:
+        pbc.pbc_fold(data['pos'], data['cell'])  # all selected snapshots at once
     snapshots = []
     # initialize Snap data structure for each snapshot
     print("INITIALIZING DATA STRUCTURES")
+    topology = Topology(atoms)  # shared by all snapshots
     for i in range(len(data['time'])):
-        snapshots.append(Snap(data['iter'][i], data['time'][i], data['cell'][i], data['pos'][i], atoms))
+        snapshots.append(Snap(data['iter'][i], data['time'][i], data['cell'][i], data['pos'][i], topology))
     print("FINISHED READING TRAJECTORY FILE")
     return snapshots
 
 
+########################################################################################################################
+# TEXT FILE root.snap WRITTEN BLOCK BY BLOCK
+########################################################################################################################
+class TraText:
+    """
+    Text file :ref:`Output_snap` with the selected snapshots.
+
+    Args:
+        root (str): root name for file
+
+    Snapshots are written block by block with :meth:`.write` into a temporary file. :meth:`.close` puts the header in
+    front of them, as the number of snapshots and the time of the last one are only known at the end.
+    """
+    def __init__(self, root):
+        self.path = root + '.snap'
+        try:
+            self.file = open(self.path + '.tmp', 'w+')
+        except IOError:
+            utility.err_file('tra_save_text', self.path)
+        self.first = None
+        self.last = None
+        self.count = 0
+
+    def write(self, part, topology, pos, cells):
+        """
+        Append a block of snapshots (see :func:`.tra_blocks`).
+
+        Args:
+            part (list[:class:`.Snap`]): snapshots of the block
+            topology (:class:`.Topology`): atom identifiers of the snapshots
+            pos (ndarray): Mx(N)x3 array of atomic positions
+            cells (ndarray): Mx3x3 array of unit cells
+        """
+        if not part:
+            return
+        if self.first is None:
+            self.first = part[0]
+        self.last = part[-1]
+        self.count += len(part)
+        for snap in part:
+            self.file.write("-" * 84 + "\n")
+            # time and iteration of snapshot
+            self.file.write("%-14s%-14.8f%-14s%-14d\n" % ("TIME", snap.time, "ITERATION", snap.iter))
+            tra_cell_write(self.file, snap.cell)
+            # atomic information
+            self.file.write("%-14s%-14s%-14s%14s%14s%14s\n" % ('NAME', 'ID', 'INDEX', 'X', 'Y', 'Z'))
+            np.savetxt(self.file, snap.atoms.values, fmt="%-14s%-14s%-14d%14.8f%14.8f%14.8f")
+
+    def close(self):
+        """
+        Write the header followed by all snapshots to the final file.
+        """
+        if self.first is None:
+            self.file.close()
+            os.remove(self.path + '.tmp')
+            return
+        try:
+            f = open(self.path, 'w')
+        except IOError:
+            utility.err_file('tra_save_text', self.path)
+        # write header
+        f.write(utility.write_header())
+        f.write("SELECTED SNAPSHOTS FROM TRAJECTORY FILE\n")
+        f.write("%-14s%14.8f\n" % ("T1", self.first.time))  # start time
+        f.write("%-14s%14.8f\n" % ("T2", self.last.time))  # end time
+        f.write("%-14s%14d\n" % ("SNAPSHOTS", self.count))  # number of snapshots
+        f.write("%-14s%14d\n" % ("ATOMS", len(self.first)))  # atoms per snapshot
+        f.write("%-14s\n" % ("UNIT CELL"))  # unit cell
+        np.savetxt(f, self.first.cell, fmt="%14.8f")
+        # information for different time steps
+        self.file.seek(0)
+        shutil.copyfileobj(self.file, f)
+        f.close()
+        self.file.close()
+        os.remove(self.path + '.tmp')
+
+
 ########################################################################################################################
 # SAVE INFORMATION OF SELECTED SNAPSHOTS TO FILE root.snap
 ########################################################################################################################
@@ -335,64 +1051,41 @@ def tra_read(root, t1, t2, n):
 # str root                      root name of project
 # list class Snap snapshots     data for every selected snapshot
 ########################################################################################################################
-# TODO: losing information about unit cell size for each time step (only constant unit cell works)
-def tra_save(root, snapshots):
+def tra_save_text(root, snapshots):
     """
-    Save information of selected snapshots to file :ref:`Output_snap`.
+    Save information of selected snapshots to the text file :ref:`Output_snap`.
 
     Args:
         root (str): root name for file
-        snapshots (list[:class:`.Snap`]): snapshots to be saved
-
-    Note:
-        Not suitable for dynamic / changing unit cells.
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots to be saved
 
-    Todo:
-        Implement variable unit cell.
+    The unit cell of every snapshot is written in the line following its time (see :func:`.tra_cell_write`).
     """
-    # open file
-    path = root + '.snap'
-    try:
-        f = open(path, 'w')
-    except IOError:
-        utility.err_file('tra_save', path)
-    # write header
-    f.write(utility.write_header())
-    f.write("SELECTED SNAPSHOTS FROM TRAJECTORY FILE\n")
-    f.write("%-14s%14.8f\n" % ("T1", snapshots[0].time))  # start time
-    f.write("%-14s%14.8f\n" % ("T2", snapshots[-1].time))  # end time
-    f.write("%-14s%14d\n" % ("SNAPSHOTS", len(snapshots)))  # number of snapshots
-    f.write("%-14s%14d\n" % ("ATOMS", len(snapshots[0].atoms)))  # atoms per snapshot
-    f.write("%-14s\n" % ("UNIT CELL"))  # unit cell
-    np.savetxt(f, snapshots[0].cell, fmt="%14.8f")
-    # write information for different time steps
-    for snap in snapshots:
-        f.write("-" * 84 + "\n")
-        # time and iteration of snapshot
-        f.write("%-14s%-14.8f%-14s%-14d\n" % ("TIME", snap.time, "ITERATION", snap.iter))
-        # atomic information
-        f.write("%-14s%-14s%-14s%14s%14s%14s\n" % ('NAME', 'ID', 'INDEX', 'X', 'Y', 'Z'))
-        np.savetxt(f, snap.atoms.values, fmt="%-14s%-14s%-14d%14.8f%14.8f%14.8f")
-    f.close()
+    output = TraText(root)
+    for block in tra_blocks(snapshots):
+        output.write(*block)
+    output.close()
 
 
 ########################################################################################################################
-# LOAD root.snap FILE PRODUCED BY tra.save()
-# WARNING: READING IS LINE SENSITIVE! ONLY USE ON UNCHANGED FILES WRITTEN BY tra_save()
+# LOAD root.snap FILE PRODUCED BY tra_save_text()
+# WARNING: READING IS LINE SENSITIVE! ONLY USE ON UNCHANGED FILES WRITTEN BY tra_save_text()
 # TODO: remove line sensitivity
 ########################################################################################################################
 # INPUT
 # str root                      root name of project
+# bool fold (optional)          fold atomic positions into the unit cell
 #####
 # OUTPUT
 # list class Snap snapshots     data for every selected snapshot
 ########################################################################################################################
-def tra_load(root):
+def tra_load_text(root, fold=False):
     """
-    Load information from the :ref:`Output_snap` file previously created by :func:`.tra_save`.
+    Load information from the :ref:`Output_snap` file previously created by :func:`.tra_save_text`.
 
     Args:
         root (root): root name of file
+        fold (bool, optional): default **False** - fold atomic positions into the unit cell with :func:`.pbc_folding`
 
     Returns:
         list[:class:`.Snap`]: snapshots loaded from file
@@ -407,11 +1100,12 @@ def tra_load(root):
     try:
         f = open(path, 'r')
     except IOError:
-        utility.err_file('tra_load', path)
+        utility.err_file('tra_load_text', path)
     text = f.readlines()  # read text as lines
     for i in range(len(text)):
         text[i] = text[i].split()  # split each line into list with strings as elements
     snapshots = []  # storage list
+    topology = None
     for i in range(len(text)):
         if len(text[i]) > 1:
             if text[i][0] == "ATOMS":
@@ -421,17 +1115,386 @@ def tra_load(root):
             if text[i][0] == "TIME":  # search for trigger of new snapshot
                 iter = int(text[i][3])
                 time = float(text[i][1])
-                test = np.array(text[i+2:i+2+n_atoms])
+                cell, start = tra_cell_read(text, i, cell)
+                test = np.array(text[start:start+n_atoms])
                 atoms = {}
                 atoms['name'] = test[:, 0]
                 atoms['id'] = test[:, 1]
                 atoms['index'] = np.array(test[:, 2], dtype=int)
-                df = pd.DataFrame(data=atoms)
+                # share topology between snapshots with identical atoms
+                if topology is None or not np.array_equal(topology.name, atoms['name']):
+                    topology = Topology(pd.DataFrame(data=atoms))
                 # save information as class Snap
-                snapshots.append(Snap(iter, time, cell, np.array(test[:, 3:6], dtype=np.float64), df))
+                snapshots.append(Snap(iter, time, cell, np.array(test[:, 3:6], dtype=np.float64), topology))
+    if fold:
+        pbc.pbc_folding(snapshots)
     return snapshots
 
 
+########################################################################################################################
+# BINARY FILE root.snapbin WRITTEN BLOCK BY BLOCK
+########################################################################################################################
+class TraBin:
+    """
+    Binary file :ref:`Output_snapbin` with the selected snapshots.
+
+    Args:
+        root (str): root name for file
+        ext (str, optional): default ".snapbin" - extension of the file
+
+    The file consists of a header (:data:`SNAP_HEADER`), the topology and one record per snapshot with the structure
+    of :func:`.tra_bin_form`. All snapshots need to contain the same atoms. Snapshots are written block by block with
+    :meth:`.write` into a temporary file. :meth:`.close` completes the header and replaces an existing file.
+    """
+    def __init__(self, root, ext='.snapbin'):
+        self.path = root + ext
+        self.file = None
+        self.topology = None
+        self.header = None
+        self.form = None
+
+    def _open(self, topology):
+        n_atoms = len(topology)
+        self.topology = topology
+        self.header = np.zeros(1, dtype=SNAP_HEADER)
+        self.header['magic'] = SNAP_MAGIC
+        self.header['version'] = SNAP_VERSION
+        self.header['n_atoms'] = n_atoms
+        names = np.array(topology.name, dtype=bytes)
+        ids = np.array(topology.id, dtype=bytes)
+        self.header['name'] = names.dtype.itemsize
+        self.header['id'] = ids.dtype.itemsize
+        atoms = np.zeros(n_atoms, dtype=tra_bin_atoms(self.header[0]))
+        atoms['name'] = names
+        atoms['id'] = ids
+        atoms['index'] = topology.index
+        self.form = tra_bin_form(n_atoms)
+        try:
+            self.file = open(self.path + '.tmp', 'wb')
+        except IOError:
+            utility.err_file('tra_save_bin', self.path)
+        self.header.tofile(self.file)
+        atoms.tofile(self.file)
+
+    def write(self, part, topology, pos, cells):
+        """
+        Append a block of snapshots (see :func:`.tra_blocks`).
+
+        Args:
+            part (list[:class:`.Snap`]): snapshots of the block
+            topology (:class:`.Topology`): atom identifiers of the snapshots
+            pos (ndarray): Mx(N)x3 array of atomic positions
+            cells (ndarray): Mx3x3 array of unit cells
+        """
+        if not part:
+            return
+        if self.file is None:
+            self._open(topology)
+        elif topology is not self.topology and not np.array_equal(topology.name, self.topology.name):
+            self.file.close()
+            os.remove(self.path + '.tmp')
+            utility.err('tra_save_bin', 0, [part[0].time])
+        data = np.zeros(len(part), dtype=self.form)
+        data['iter'] = [snap.iter for snap in part]
+        data['time'] = [snap.time for snap in part]
+        data['cell'] = cells
+        data['pos'] = pos
+        data.tofile(self.file)
+        self.header['count'] += len(part)
+
+    def close(self):
+        """
+        Complete the header and move the file to its final name.
+        """
+        if self.file is None:
+            return
+        self.file.seek(0)
+        self.header.tofile(self.file)
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)  # files still mapped by tra_load_bin() stay valid
+
+
+########################################################################################################################
+# SAVE INFORMATION OF SELECTED SNAPSHOTS TO BINARY FILE root.snapbin
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# list class Snap snapshots     data for every selected snapshot
+# str ext (optional)            extension of the file
+########################################################################################################################
+def tra_save_bin(root, snapshots, ext='.snapbin'):
+    """
+    Save information of selected snapshots to the binary file :ref:`Output_snapbin` (see :class:`.TraBin`).
+
+    Args:
+        root (str): root name for file
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots to be saved
+        ext (str, optional): default ".snapbin" - extension of the file
+    """
+    output = TraBin(root, ext=ext)
+    for block in tra_blocks(snapshots):
+        output.write(*block)
+    output.close()
+
+
+########################################################################################################################
+# LOAD root.snapbin FILE PRODUCED BY tra_save_bin()
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# str ext (optional)            extension of the file
+# int chunk (optional)          number of snapshots read at once
+# bool fold (optional)          fold atomic positions into the unit cell
+#####
+# OUTPUT
+# class TraStream snapshots     lazy sequence of the stored snapshots
+########################################################################################################################
+def tra_load_bin(root, ext='.snapbin', chunk=1000, fold=False):
+    """
+    Load information from the :ref:`Output_snapbin` file previously created by :func:`.tra_save_bin`.
+
+    Args:
+        root (str): root name of file
+        ext (str, optional): default ".snapbin" - extension of the file
+        chunk (int, optional): default 1000 - number of snapshots read from the file at once
+        fold (bool, optional): default **False** - fold atomic positions into the unit cell
+
+    Returns:
+        :class:`.TraStream`: snapshots which are read from the file while iterating
+
+    Only header and topology are read. The snapshots are memory-mapped, so loading takes the same time for any size
+    of the file.
+    """
+    path = root + ext
+    try:
+        header = np.fromfile(path, dtype=SNAP_HEADER, count=1)
+    except IOError:
+        utility.err_file('tra_load_bin', path)
+    if len(header) == 0 or header['magic'][0] != SNAP_MAGIC or header['version'][0] != SNAP_VERSION:
+        utility.err('tra_load_bin', 0, [path])
+    header = header[0]
+    n_atoms = int(header['n_atoms'])
+    count = int(header['count'])
+    form = tra_bin_atoms(header)
+    atoms = np.fromfile(path, dtype=form, count=n_atoms, offset=SNAP_HEADER.itemsize)
+    offset = SNAP_HEADER.itemsize + n_atoms * form.itemsize
+    if os.path.getsize(path) < offset + count * tra_bin_form(n_atoms).itemsize:
+        utility.err('tra_load_bin', 1, [path])
+    topology = Topology(pd.DataFrame(data={'name': np.char.decode(atoms['name']),
+                                           'id': np.char.decode(atoms['id']),
+                                           'index': atoms['index']}))
+    if count == 0:  # empty files can not be mapped
+        data = np.zeros(0, dtype=tra_bin_form(n_atoms))
+    else:
+        data = np.memmap(path, dtype=tra_bin_form(n_atoms), mode='r', offset=offset, shape=(count,))
+    return TraStream(data, np.arange(count), topology, chunk=chunk, fold=fold, select=tra_bin_select)
+
+
+def tra_bin_atoms(header):
+    """
+    Structure of the topology in the binary snapshot file.
+
+    Args:
+        header (ndarray): header of the file with structure :data:`SNAP_HEADER`
+
+    Returns:
+        :py:class:`numpy.dtype`: structured data type of a single atom
+    """
+    return np.dtype([('name', 'S%d' % header['name']), ('id', 'S%d' % header['id']), ('index', '<i8')])
+
+
+def tra_bin_form(n_atoms):
+    """
+    Record structure of a single snapshot in the binary snapshot file.
+
+    Args:
+        n_atoms (int): number of atoms per snapshot
+
+    Returns:
+        :py:class:`numpy.dtype`: structured data type with 'iter', 'time' [ps], 'cell' and 'pos' [Angstrom]
+    """
+    return np.dtype([('iter', '<i4'),
+                     ('time', '<f8'),
+                     ('cell', '<f8', (3, 3)),
+                     ('pos', '<f8', (n_atoms, 3))])
+
+
+def tra_bin_select(data, records, pos=True):
+    """
+    Read selected records of the binary snapshot file (counterpart of :func:`.tra_select`).
+
+    Args:
+        data (ndarray): records obtained from :func:`.tra_load_bin`
+        records (ndarray[int]): positions of the selected records in :data:`data`
+        pos (bool, optional): default **True** - read atomic positions; **None** is returned instead if **False**
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: iterations of the selected records
+            - ndarray[float]: times [ps] of the selected records
+            - ndarray[float]: Nx3x3 array with unit cells [Angstrom] of the selected records
+            - ndarray[float]: NxMx3 array with atomic positions [Angstrom] of the selected records
+    """
+    records = np.asarray(records, dtype=np.int64)
+    return (np.array(data['iter'][records]), np.array(data['time'][records]), np.array(data['cell'][records]),
+            np.array(data['pos'][records]) if pos else None)
+
+
+########################################################################################################################
+# SAVE SNAPSHOTS IN SELECTED FORMAT
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# list class Snap snapshots     data for every selected snapshot
+# str fmt (optional)            'binary' (cache) or 'text' (export)
+########################################################################################################################
+def tra_save(root, snapshots, fmt='binary'):
+    """
+    Save information of selected snapshots.
+
+    Args:
+        root (str): root name for file
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots to be saved
+        fmt (str, optional): default "binary" - "binary" for :func:`.tra_save_bin` or "text" for :func:`.tra_save_text`
+    """
+    if fmt == 'text':
+        tra_save_text(root, snapshots)
+    else:
+        tra_save_bin(root, snapshots)
+
+
+########################################################################################################################
+# LOAD SNAPSHOTS IN SELECTED FORMAT
+########################################################################################################################
+# INPUT
+# str root                      root name of project
+# str fmt (optional)            'binary' (cache) or 'text' (export)
+# bool fold (optional)          fold atomic positions into the unit cell
+#####
+# OUTPUT
+# list class Snap snapshots     data for every selected snapshot
+########################################################################################################################
+def tra_load(root, fmt='binary', fold=False):
+    """
+    Load information of snapshots previously saved by :func:`.tra_save`.
+
+    Args:
+        root (str): root name of file
+        fmt (str, optional): default "binary" - "binary" for :func:`.tra_load_bin` or "text" for :func:`.tra_load_text`
+        fold (bool, optional): default **False** - fold atomic positions into the unit cell
+
+    Returns:
+        list[:class:`.Snap`], :class:`.TraStream`: snapshots loaded from file
+    """
+    if fmt == 'text':
+        return tra_load_text(root, fold=fold)
+    return tra_load_bin(root, fold=fold)
+
+
+########################################################################################################################
+# UNIT CELLS OF SNAPSHOTS IN OUTPUT FILES
+########################################################################################################################
+def tra_cells(snapshots):
+    """
+    Get iterations, times and unit cells of snapshots.
+
+    Args:
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[int]: iterations of the snapshots
+            - ndarray[float]: times [ps] of the snapshots
+            - ndarray[float]: Nx3x3 array with the unit cells [Angstrom] of the snapshots
+
+    Atomic positions of a :class:`.TraStream` are not read.
+    """
+    if isinstance(snapshots, TraStream):
+        return snapshots.cells()
+    iters = np.array([snap.iter for snap in snapshots], dtype=int)
+    times = np.array([snap.time for snap in snapshots], dtype=float)
+    cells = np.array([snap.cell for snap in snapshots], dtype=float).reshape(len(snapshots), 3, 3)
+    return iters, times, cells
+
+
+def tra_cell_write(f, cell):
+    """
+    Write the unit cell of a single snapshot as one line starting with "CELL".
+
+    Args:
+        f (file): opened output file
+        cell (ndarray[float]): 3x3 unit cell
+    """
+    f.write(("%-14s" + "%14.8f" * 9 + "\n") % (("CELL",) + tuple(np.ravel(cell))))
+
+
+def tra_cell_read(text, i, cell):
+    """
+    Read the unit cell of a single snapshot written by :func:`.tra_cell_write`.
+
+    Args:
+        text (list[list[str]]): lines of the file split into words
+        i (int): line with the time of the snapshot
+        cell (ndarray[float]): unit cell used if the snapshot has no own unit cell (files of older versions)
+
+    Returns:
+        (tuple): tuple containing:
+
+            - ndarray[float]: 3x3 unit cell of the snapshot
+            - int: line at which the atomic information starts
+    """
+    if i + 1 < len(text) and len(text[i + 1]) == 10 and text[i + 1][0] == "CELL":
+        return np.array(text[i + 1][1:], dtype=float).reshape(3, 3), i + 3
+    return cell, i + 2
+
+
+def tra_cells_write(f, snapshots):
+    """
+    Write the unit cells of all snapshots as a block (one line per snapshot).
+
+    Args:
+        f (file): opened output file
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots used for the calculation
+
+    The block starts with a line "CELLS" followed by the number of snapshots. Each line contains iteration, time and
+    the nine elements of the unit cell.
+    """
+    iters, times, cells = tra_cells(snapshots)
+    f.write("%-14s%14d\n" % ("CELLS", len(iters)))
+    data = np.column_stack((iters, times, cells.reshape(len(iters), 9)))
+    np.savetxt(f, data, fmt="%14d%14.8f" + "%14.8f" * 9)
+
+
+def tra_cells_load(root, ext):
+    """
+    Load the unit cells written by :func:`.tra_cells_write` from an output file.
+
+    Args:
+        root (str): root name for the file to be loaded
+        ext (str): extension for the file to be loaded (e.g. ".radial", ".angle", ".hbonds_c")
+
+    Returns:
+        (tuple): tuple containing arrays with iterations, times [ps] and Nx3x3 unit cells [Angstrom]; empty if the
+        file contains no unit cells per snapshot
+    """
+    path = root + ext
+    try:
+        f = open(path, 'r')
+    except IOError:
+        utility.err_file('tra_cells_load', path)
+    text = f.readlines()
+    f.close()
+    for i in range(len(text)):
+        words = text[i].split()
+        if len(words) == 2 and words[0] == "CELLS":
+            n = int(words[1])
+            data = np.array([line.split() for line in text[i + 1:i + 1 + n]], dtype=float).reshape(n, 11)
+            return data[:, 0].astype(int), data[:, 1], data[:, 2:].reshape(n, 3, 3)
+    return np.zeros(0, dtype=int), np.zeros(0), np.zeros((0, 3, 3))
+
+
 def tra_number_atoms(snapshots):
     """
     Get atom number, time and iteration from multiple snapshots.
@@ -451,7 +1514,7 @@ def tra_number_atoms(snapshots):
     iterations = []
     # loop through snapshots and save information to list
     for i in range(len(snapshots)):
-        atoms.append(len(snapshots[i].atoms))
+        atoms.append(len(snapshots[i]))
         times.append(snapshots[i].time)
         iterations.append(snapshots[i].iter)
     return atoms, times, iterations
@@ -470,12 +1533,12 @@ def tra_detect_change(snapshots):
     idx_change = []
     for i in range(len(snapshots) - 1):
         # check if atom number changes
-        if len(snapshots[i].atoms['name'].values) != len(snapshots[i + 1].atoms['name'].values):
+        if len(snapshots[i]) != len(snapshots[i + 1]):
             idx_change.append(i)
             idx_change.append(i + 1)
         # check if atom names change
         else:
-            if not (snapshots[i].atoms['name'].values == snapshots[i + 1].atoms['name'].values).all():
+            if not (snapshots[i].topology.name == snapshots[i + 1].topology.name).all():
                 idx_change.append(i)
                 idx_change.append(i + 1)
     return np.unique(idx_change)
\ No newline at end of file
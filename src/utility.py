@@ -135,6 +135,24 @@ def err(func, id, arg, info=''):
         return ("INVALID NUMBER OF SNAPSHOTS FOR INTERVAL\n%-24s%d\n%-24s%d"
                 % ("SELECTED NUMBER N:", args[0], "STEPS IN INTERVAL:", args[1]))
 
+    def _err_tra_index_5(args):
+        return "INVALID STRIDE\n%-24s%d" % ("SELECTED STRIDE:", args[0])
+
+    def _err_tra_save_bin(args):
+        return ("ATOMS CHANGE BETWEEN SNAPSHOTS\n%-24s%.8f\nUSE TEXT FORMAT INSTEAD" % ("SNAPSHOT AT TIME:", args[0]))
+
+    def _err_tra_load_bin1(args):
+        return "NOT A VALID SNAPSHOT FILE\n%s" % args[0]
+
+    def _err_tra_load_bin2(args):
+        return "SNAPSHOT FILE IS INCOMPLETE\n%s" % args[0]
+
+    def _err_hbonds_load_bin1(args):
+        return "NOT A VALID HYDROGEN BOND FILE\n%s" % args[0]
+
+    def _err_hbonds_load_bin2(args):
+        return "HYDROGEN BOND FILE IS INCOMPLETE\n%s" % args[0]
+
     def _err_pbc_apply3x3(args):
         return "INVALID ARGUMENTS\nEITHER SELECTION BY ID OR NAME, NOT BOTH"
 
@@ -167,6 +185,12 @@ def err(func, id, arg, info=''):
     def _err_scntl_read2(args):
         return "PLEASE PROVIDE BLOCK !TRA IN %s.scntl" % args[0]
 
+    def _err_scntl_read3(args):
+        return "%s\n%-24s%d" % ("STRIDE NEEDS TO BE AT LEAST 1", "SELECTED STRIDE:", args[0])
+
+    def _err_scntl_read4(args):
+        return "N AND STRIDE GIVEN IN %s\nPLEASE PROVIDE ONLY ONE OF THEM" % args[0]
+
     def _err_argcheck1(args):
         return "WRONG NUMBER OF ARGUMENTS GIVEN\n%-12s%d\n%-12s%d" % ("EXPECTED:", 1, "GIVEN:", args[0])
 
@@ -175,13 +199,16 @@ def err(func, id, arg, info=''):
 
     # store functions in dictionary (function name = key, id = position in list)
     error = {
-        'tra_index': [_err_tra_index_1, _err_tra_index_2, _err_tra_index_3, _err_tra_index_4],
+        'tra_index': [_err_tra_index_1, _err_tra_index_2, _err_tra_index_3, _err_tra_index_4, _err_tra_index_5],
+        'tra_save_bin': [_err_tra_save_bin],
+        'tra_load_bin': [_err_tra_load_bin1, _err_tra_load_bin2],
         'pbc_apply3x3': [_err_pbc_apply3x3],
         'ion_single': [_err_ion_single1, _err_ion_single2],
         'water_single': [_err_water_single],
         'hbonds_load': [_err_hbonds_load1, _err_hbonds_load2],
+        'hbonds_load_bin': [_err_hbonds_load_bin1, _err_hbonds_load_bin2],
         'scntl_text': [_err_scntl_text1, _err_scntl_text2],
-        'scntl_read': [_err_scntl_read1, _err_scntl_read2],
+        'scntl_read': [_err_scntl_read1, _err_scntl_read2, _err_scntl_read3, _err_scntl_read4],
         'argcheck': [_err_argcheck1, _err_argcheck2],
         'structure_water': [_err_hbonds_load1, _err_hbonds_load2]
     }
@@ -381,7 +408,8 @@ def structure_angle_input():
     parser = argparse.ArgumentParser()
     parser.add_argument("angle", nargs="*", type=str, help="give path of angle data file\nproduced by structure_fast.py")
     parser.add_argument("-fwhm", "--fwhm", action="store_true", help="peak analysis")
-    parser.add_argument("-sin", "--sinus", action="store_true", help="multiply angle distribution with sin(angle)")
+    parser.add_argument("-sin", "--sinus", action="store_true",
+                        help="multiply angle distribution with sin(angle)\nfiles saved with SINUS TRUE are already weighted")
     parser.add_argument("-p", "--plot", action="store_true", help="show graph of angle distribution function")
     parser.add_argument("-k", "--key", action="store_true", help="plot key/legend in the graph")
     parser.add_argument("-x", "--xlim", nargs=2, metavar=('xmin', 'xmax'), type=float, help="select range for x axis")
@@ -8,29 +8,32 @@ Find configurations that deviate from the normal molecule structure.
 Main routine is :func:`water_find_parallel`.
 
 Dependencies:
-    :py:mod:`functools`
-    :py:mod:`miniutils`
     :py:mod:`numpy`
     :py:mod:`pandas`
     :mod:`.neighbor`
+    :mod:`.pool`
     :mod:`.utility`
     :class:`.Snap`
+    :func:`.tra_cell_read`
+    :func:`.tra_cell_write`
 
 .. autosummary::
 
       water_find_parallel
       water_load
+      water_rows
       water_save
       water_single
 """
 
 import numpy as np
 import pandas as pd
-from functools import partial
-import miniutils.progress_bar as progress
 # MODULES WITHIN PROJECT
 from . import neighbor
+from . import pool
 from .tra import Snap
+from .tra import tra_cell_read
+from .tra import tra_cell_write
 from . import utility
 
 
@@ -59,39 +62,45 @@ def water_single(snap, id1, id2, cut):
     Returns:
         :class:`.Snap`: snapshot containing water complexes
 
+    The atoms of the complexes are found by :func:`.water_rows`.
+    """
+    return snap.take(water_rows(snap, id1, id2, cut))
+
+
+def water_rows(snap, id1, id2, cut):
+    """
+    Find the atoms of water complexes of a single snapshot of atomic positions.
+
+    Args:
+        snap (:class:`.Snap`): single snapshot containing the atomic information
+        id1 (str): identifier for atom used as center (e.g. 'O\_')
+        id2 (str): identifier for atoms as possible neighbors (e.g. 'H\_')
+        cut (float): cutoff distance for neighbor search
+
+    Returns:
+        ndarray[int]: row numbers of the atoms of the water complexes in :data:`snap`
+
+    An atom with identifier :data:`id1` belongs to a complex if it has more or less than two neighbors or if it
+    shares a neighbor with another atom of identifier :data:`id1`; its neighbors belong to the complex as well. Both
+    criteria are evaluated with :py:func:`numpy.bincount` on the neighbor list of :func:`.neighbor_rows`.
+
     Todo:
         Refine detection criteria. Find single hydrogen atoms which are not near oxygen?
     """
     if id1 == id2:
         utility.err('water_single', 0, [id1, id2])
-    next = neighbor.neighbor_name(snap, id1, id2, cut)
-    atoms = []
-    # next1 = neighbor.neighbor_name(snap, id2, id1, cut)
-    for i in range(len(next)):
-        # TODO: determine criterion for water complex detection
-        # if oxygen has more or less than 2 hydrogen neighbors
-        if len(next[i]) != 3:
-            atoms.append(next[i])
-        # if two oxygen atoms share a hydrogen atom
-        for j in range(i+1, len(next)):
-            if set(next[i][1:]) & set(next[j][1:]):
-                atoms.append(next[i])
-                atoms.append(next[j])
-    # for i in range(len(next1)):
-    #     if len(next1[i]) > 2:
-    #         atoms.append(next1[i])
-
-    # formatting necessary because of function np.unique
-    if len(atoms) < 2:
-        atoms = np.unique(atoms).tolist()  # structured list
-    elif len(np.unique([len(i) for i in atoms])) == 1:
-        atoms = np.unique(atoms).tolist()  # structured list
-    else:
-        atoms = np.unique(atoms).tolist()  # structured list
-        atoms = [x for y in atoms for x in y]  # flatten list
-        atoms = np.unique(atoms).tolist()  # unique names
-    atoms = snap.atoms.loc[snap.atoms['name'].isin(atoms)]  # select parts of DataFrame
-    return Snap(snap.iter, snap.time, snap.cell, None, None, dataframe=atoms)
+    rows1, offsets, next = neighbor.neighbor_rows(snap, id1, id2, cut)
+    count = np.diff(offsets)
+    # TODO: determine criterion for water complex detection
+    # if oxygen has more or less than 2 hydrogen neighbors
+    member = count != 2
+    # if two oxygen atoms share a hydrogen atom; periodic images of the same pair count once
+    owner = np.repeat(np.arange(len(rows1)), count)
+    pairs = np.unique(owner * len(snap.topology) + next)
+    shared = np.bincount(pairs % len(snap.topology), minlength=len(snap.topology)) > 1
+    member[owner[shared[next]]] = True
+    # atoms of the complexes: selected oxygen atoms and their hydrogen neighbors
+    return np.unique(np.concatenate((rows1[member], next[member[owner]])))
 
 
 ########################################################################################################################
@@ -138,7 +147,8 @@ def water_save(root, snapshots, id1, id2, cut, ext='.water'):
     for i in range(len(snapshots)):
         f.write("-" * 84 + "\n")
         f.write("%-14s%-14.8f%-14s%-14d%-14s%-14d\n" %
-                ("TIME", snapshots[i].time, "ITERATION", snapshots[i].iter, "ATOMS", len(snapshots[i].atoms)))
+                ("TIME", snapshots[i].time, "ITERATION", snapshots[i].iter, "ATOMS", len(snapshots[i])))
+        tra_cell_write(f, snapshots[i].cell)
         f.write("%-14s%-14s%-14s%14s%14s%14s\n" % ('NAME', 'ID', 'INDEX', 'X', 'Y', 'Z'))
         np.savetxt(f, snapshots[i].atoms, fmt="%-14s%-14s%-14d%14.8f%14.8f%14.8f")
     f.close()
@@ -192,12 +202,13 @@ def water_load(root, ext='.water'):
                 iteration = int(text[i][3])
                 time = float(text[i][1])
                 n_atoms = int(text[i][5])
+                cell, start = tra_cell_read(text, i, cell)
                 # TODO: check read and write functions for compatibility for empty input
                 if n_atoms == 0:
                     df = pd.DataFrame(columns=['name', 'id', 'index', 'pos', 'pos', 'pos'])
                     snapshots.append(Snap(iteration, time, cell, None, None, dataframe=df))
                 else:
-                    test = np.array(text[i + 2:i + 2 + n_atoms])
+                    test = np.array(text[start:start + n_atoms])
                     atoms = {}
                     atoms['name'] = test[:, 0]
                     atoms['id'] = test[:, 1]
@@ -249,27 +260,33 @@ def water_load(root, ext='.water'):
 # OUTPUT
 # list class Snap ion_comp      list of water complexes found
 ########################################################################################################################
-def water_find_parallel(root, snapshots, id1, id2, cut=1.4):
+def water_find_parallel(root, snapshots, id1, id2, cut=1.4, chunk=1000, workers=None, task=None):
     """
     Find water complexes for multiple snapshots of atomic configurations.
 
     Args:
         root (str): root name of the files
-        snapshots (list[:class:`.Snap`]): list of snapshots containing the atomic information
+        snapshots (list[:class:`.Snap`], :class:`.TraStream`): snapshots containing the atomic information
         id1 (str): identifier for atom used as center (e.g. 'O\_')
         id2 (str): identifier for atoms as possible neighbors (e.g. 'H\_')
         cut (float): cutoff distance for neighbor search
+        chunk (int, optional): default 1000 - number of snapshots processed at once
+        workers (int, optional): default **None** - number of worker processes; **None** uses all cores
+        task (int, optional): default **None** - number of snapshots per task (see :func:`.pool_map`)
 
     Returns:
         list[:class:`.Snap`]: list of snapshots containing water complexes
 
-    Parallelization based on :py:mod:`multiprocessing`.
+    Parallelization based on :func:`.pool_map`: the workers share the atomic positions and only return the rows of
+    the complexes (see :func:`.water_rows`).
+    Snapshots are read and processed in blocks of :data:`chunk` (see :func:`.pool_blocks`).
     """
     print("WATER COMPLEX DETECTION IN PROGRESS")
-    # set other arguments (necessary for parallel computing)
-    multi_one = partial(water_single, id1=id1, id2=id2, cut=cut)
-    # run data extraction
-    complex = progress.parallel_progbar(multi_one, snapshots)
+    # run data extraction chunk by chunk
+    complex = []
+    for part, rows in pool.pool_blocks(water_rows, snapshots, chunk=chunk, workers=workers, task=task, id1=id1, id2=id2,
+                                       cut=cut):
+        complex += [snap.take(r) for snap, r in zip(part, rows)]
     # create output file
     water_save(root, complex, id1, id2, cut)
     print("WATER COMPLEX DETECTION FINISHED")